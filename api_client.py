@@ -0,0 +1,99 @@
+"""
+Client for the headless API service in ``api_server.py``.
+
+When ATS_API_URL is set, the Streamlit UI sends its LLM-bound operations
+through this client instead of calling Gemini itself.
+"""
+import json
+import os
+import time
+
+API_TIMEOUT = float(os.environ.get("ATS_API_CLIENT_TIMEOUT", 180))
+CONNECT_TIMEOUT = 5
+# A busy (429) response is retried after the server's Retry-After delay at most this many times.
+MAX_RETRIES = int(os.environ.get("ATS_API_CLIENT_RETRIES", 3))
+MAX_RETRY_DELAY = 10.0
+
+
+class ApiError(RuntimeError):
+    """Raised for non-200 API responses; ``retry_after`` is set when the server is busy."""
+
+    def __init__(self, status, message, retry_after=None):
+        super().__init__(f"API error {status}: {message}")
+        self.status = status
+        self.message = message
+        self.retry_after = retry_after
+
+
+class ApiClient:
+    def __init__(self, base_url, timeout=API_TIMEOUT, max_retries=MAX_RETRIES):
+        import requests
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.max_retries = max_retries
+        # One pooled session per process keeps connections to the service alive.
+        self._session = requests.Session()
+
+    def _post(self, operation, payload, stream=False):
+        for attempt in range(self.max_retries + 1):
+            try:
+                return self._post_once(operation, payload, stream)
+            except ApiError as e:
+                if e.status != 429 or attempt == self.max_retries:
+                    raise
+                time.sleep(min(e.retry_after or 1.0, MAX_RETRY_DELAY) * (attempt + 1))
+
+    def _post_once(self, operation, payload, stream):
+        response = self._session.post(
+            f"{self.base_url}/v1/{operation}", json=payload,
+            timeout=(CONNECT_TIMEOUT, self.timeout), stream=stream,
+        )
+        if response.status_code != 200:
+            try:
+                message = response.json().get("error", response.reason)
+            except ValueError:
+                message = response.text or response.reason
+            retry_after = response.headers.get("Retry-After")
+            raise ApiError(response.status_code, message, float(retry_after) if retry_after else None)
+        return response
+
+    def call(self, operation, **payload):
+        """
+        Run ``operation`` and return its JSON result.
+        """
+        return self._post(operation, payload).json()
+
+    def stream(self, operation, **payload):
+        """
+        Run ``operation`` in streaming mode and yield the text as it arrives.
+        Raises ApiError if the server reports an error mid-stream or the
+        stream ends without its end frame, so a truncated text is never
+        taken for a complete result.
+        """
+        import requests
+        payload["stream"] = True
+        response = self._post(operation, payload, stream=True)
+        try:
+            lines = response.iter_lines()
+            for line in lines:
+                if not line:
+                    continue
+                frame = json.loads(line)
+                if "text" in frame:
+                    yield frame["text"]
+                elif frame.get("done"):
+                    # Read the terminating chunk too, so the connection goes back to the pool.
+                    for _ in lines:
+                        pass
+                    return
+                elif "error" in frame:
+                    raise ApiError(frame.get("status", 500), frame["error"])
+        except (requests.RequestException, ValueError) as e:
+            raise ApiError(502, f"Stream interrupted: {e}")
+        finally:
+            response.close()
+        raise ApiError(502, "Stream ended before completion")
+
+    def health(self):
+        response = self._session.get(f"{self.base_url}/readyz", timeout=(CONNECT_TIMEOUT, 10))
+        return response.status_code == 200
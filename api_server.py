@@ -0,0 +1,474 @@
+"""
+Headless HTTP API for the resume operations.
+
+Runs analysis, boosting, custom updates, resume creation and document
+conversion outside of Streamlit so that LLM-bound workers can be scaled
+independently of the UI (point the UI at it with ATS_API_URL). Requests are
+executed on a bounded worker pool; once every worker is busy and the wait
+queue is full, new requests are rejected with 429 and a Retry-After header.
+Each request has a deadline (504 when it passes), and /healthz and /readyz
+serve liveness and readiness probes.
+
+Usage:
+    python api_server.py [--host 0.0.0.0] [--port 8600] [--workers 8] [--queue-size 32]
+
+Endpoints (JSON bodies; analyze/boost/custom-update/create accept
+``"stream": true`` to receive the text as it is generated, as a chunked
+stream of JSON lines: ``{"text": ...}`` frames, then ``{"done": true}`` or
+``{"error": ..., "status": ...}``; a stream without either is incomplete):
+    POST /v1/analyze          {resume_text, jd_text, structured?, cascade?}
+    POST /v1/analyze-section  {section_name, section_text, jd_text}
+    POST /v1/analyze-many     {resume_text, jds: [{text, id?, title?}], max_analyzed?}
+    POST /v1/boost            {resume_text, jd_text, analysis_report, variant?}
+    POST /v1/custom-update    {resume_text, instructions}
+    POST /v1/create           {form_data}
+    POST /v1/render           {markdown, format: "docx" | "html"}
+    POST /v1/extract          {file_name, content_base64}
+LLM-bound operations accept ``"priority": "batch"`` to yield Gemini quota to
+interactive requests; while Gemini is failing they answer 503 with Retry-After.
+    GET  /healthz, /readyz, /metrics
+"""
+import argparse
+import base64
+import binascii
+import contextvars
+import json
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# This process runs the operations itself; it must never forward them to another API.
+os.environ.pop("ATS_API_URL", None)
+
+import app
+from extraction import docx_parser_name, extract_docx_text, extract_pdf_text, pdf_parser_name
+from extraction_cache import cached_extract
+from model_registry import registry
+from scheduler import LANES, CircuitOpen, lane, scheduler
+from scheduler import DeadlineExceeded as SchedulerDeadline
+from structured_output import StructuredOutputError
+from telemetry import increment, register_gauges, render_prometheus
+from telemetry import request as trace_request
+
+HOST = os.environ.get("ATS_API_HOST", "127.0.0.1")
+PORT = int(os.environ.get("ATS_API_PORT", 8600))
+WORKERS = int(os.environ.get("ATS_API_WORKERS", 8))
+QUEUE_SIZE = int(os.environ.get("ATS_API_QUEUE_SIZE", 32))
+REQUEST_TIMEOUT = float(os.environ.get("ATS_API_TIMEOUT", 120))
+MAX_BODY_BYTES = int(os.environ.get("ATS_API_MAX_BODY_BYTES", 25 * 1024 * 1024))
+RETRY_AFTER_SECONDS = 2
+# Idle keep-alive connections are closed after this many seconds.
+KEEPALIVE_TIMEOUT = float(os.environ.get("ATS_API_KEEPALIVE_TIMEOUT", 60))
+
+_DONE = object()
+
+
+class ApiError(Exception):
+    """An error answered with ``status`` and a JSON ``{"error": message}`` body."""
+
+    def __init__(self, status, message, headers=None):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+        self.headers = headers or {}
+
+
+def _require(payload, *names):
+    missing = [name for name in names if not payload.get(name) or not str(payload[name]).strip()]
+    if missing:
+        raise ApiError(400, f"Missing or empty field(s): {', '.join(missing)}")
+
+
+def _use_cache(payload):
+    return bool(payload.get("use_cache", True))
+
+
+def analyze(payload, stream=False):
+    if stream:
+        return app.analyze_resume_stream(payload["resume_text"], payload["jd_text"], use_cache=_use_cache(payload))
+    structured = payload.get("structured")
+    if payload.get("cascade"):
+        return app.analyze_resume_cascade(payload["resume_text"], payload["jd_text"], use_cache=_use_cache(payload),
+                                          structured=structured)
+    if app.STRUCTURED_ANALYSIS if structured is None else structured:
+        result = app.analyze_resume_structured(payload["resume_text"], payload["jd_text"], use_cache=_use_cache(payload))
+        return dict(result, ats_score=result["analysis"]["overall_score"])
+    report = app.analyze_resume(payload["resume_text"], payload["jd_text"], use_cache=_use_cache(payload),
+                                structured=False)
+    return {"report": report, "ats_score": app.extract_ats_score(report)}
+
+
+def analyze_section(payload, stream=False):
+    report = app.analyze_section(payload["section_name"], payload["section_text"], payload["jd_text"],
+                                 use_cache=_use_cache(payload))
+    return {"report": report, "ats_score": app.extract_ats_score(report)}
+
+
+def analyze_many(payload, stream=False):
+    return app.analyze_resume_against_jds(payload["resume_text"], payload["jds"], use_cache=_use_cache(payload),
+                                          max_analyzed=payload.get("max_analyzed"))
+
+
+def boost(payload, stream=False):
+    args = (payload["resume_text"], payload["jd_text"], payload["analysis_report"])
+    kwargs = {"use_cache": _use_cache(payload), "variant": payload.get("variant")}
+    if stream:
+        return app.boost_resume_md_stream(*args, **kwargs)
+    return {"boosted_resume": app.boost_resume_md(*args, **kwargs)}
+
+
+def custom_update(payload, stream=False):
+    args = (payload["resume_text"], payload["instructions"])
+    if stream:
+        return app.custom_update_resume_stream(*args, use_cache=_use_cache(payload))
+    return {"updated_resume": app.custom_update_resume(*args, use_cache=_use_cache(payload))}
+
+
+def create(payload, stream=False):
+    form_data = payload["form_data"]
+    if stream:
+        return app.create_resume_from_form_stream(form_data, use_cache=_use_cache(payload))
+    return {"resume": app.create_resume_from_form(form_data, use_cache=_use_cache(payload))}
+
+
+def render(payload, stream=False):
+    output_format = payload.get("format", "docx")
+    if output_format not in app.DOCUMENT_RENDERERS:
+        raise ApiError(400, f"Unsupported format: {output_format}")
+    content = app.rendered(payload["markdown"], output_format)
+    if isinstance(content, str):
+        content = content.encode("utf-8")
+    return {"format": output_format, "content_base64": base64.b64encode(content).decode("ascii")}
+
+
+def extract(payload, stream=False):
+    try:
+        file_bytes = base64.b64decode(payload["content_base64"], validate=True)
+    except (binascii.Error, ValueError):
+        raise ApiError(400, "content_base64 is not valid base64")
+    file_name = payload["file_name"].lower()
+    if file_name.endswith((".txt", ".tex")):
+        text = file_bytes.decode("utf-8", errors="replace")
+    elif file_name.endswith(".pdf"):
+        text = cached_extract(file_bytes, pdf_parser_name(), extract_pdf_text)
+    elif file_name.endswith(".docx"):
+        text = cached_extract(file_bytes, docx_parser_name(), extract_docx_text)
+    else:
+        raise ApiError(415, "Supported file types are pdf, docx, txt and tex")
+    if not text.strip():
+        raise ApiError(422, "No text could be extracted from the document")
+    return {"text": text}
+
+
+# name -> (handler, required fields, supports streaming)
+OPERATIONS = {
+    "analyze": (analyze, ("resume_text", "jd_text"), True),
+    "analyze-section": (analyze_section, ("section_name", "section_text", "jd_text"), False),
+    "analyze-many": (analyze_many, ("resume_text", "jds"), False),
+    "boost": (boost, ("resume_text", "jd_text", "analysis_report"), True),
+    "custom-update": (custom_update, ("resume_text", "instructions"), True),
+    "create": (create, ("form_data",), True),
+    "render": (render, ("markdown",), False),
+    "extract": (extract, ("file_name", "content_base64"), False),
+}
+
+
+def validate(name, payload):
+    _require(payload, *OPERATIONS[name][1])
+    if name == "create" and (not isinstance(payload["form_data"], dict) or not payload["form_data"].get("name")):
+        raise ApiError(400, "form_data must be an object with at least a name")
+    if name == "analyze-many" and (not isinstance(payload["jds"], list) or not all(
+            isinstance(jd, dict) and str(jd.get("text") or "").strip() for jd in payload["jds"])):
+        raise ApiError(400, "jds must be a list of objects with a non-empty text")
+    if name == "analyze-many" and payload.get("max_analyzed") is not None and (
+            isinstance(payload["max_analyzed"], bool) or not isinstance(payload["max_analyzed"], int)
+            or payload["max_analyzed"] < 0):
+        raise ApiError(400, "max_analyzed must be a non-negative integer")
+    if name == "extract" and (not isinstance(payload["file_name"], str) or not payload["file_name"].strip()):
+        raise ApiError(400, "file_name must be a non-empty string")
+    if payload.get("priority", "interactive") not in LANES:
+        raise ApiError(400, f"priority must be one of: {', '.join(LANES)}")
+
+
+class WorkerPool:
+    """
+    Fixed-size thread pool with a bounded wait queue; ``submit`` raises a 429
+    ApiError instead of queueing once ``workers + queue_size`` requests are pending.
+    """
+
+    def __init__(self, workers=WORKERS, queue_size=QUEUE_SIZE):
+        self.workers = workers
+        self.capacity = workers + queue_size
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ats-api")
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._stats = {"accepted": 0, "rejected": 0, "timeouts": 0, "failed": 0}
+        self.draining = False
+
+    def submit(self, fn, *args):
+        with self._lock:
+            if self.draining or self._pending >= self.capacity:
+                self._stats["rejected"] += 1
+                raise ApiError(429, "Server is busy, retry later", {"Retry-After": str(RETRY_AFTER_SECONDS)})
+            self._pending += 1
+            self._stats["accepted"] += 1
+        context = contextvars.copy_context()
+        future = self._executor.submit(context.run, fn, *args)
+        future.add_done_callback(self._release)
+        return future
+
+    def _release(self, future):
+        with self._lock:
+            self._pending -= 1
+            if not future.cancelled() and future.exception() is not None:
+                self._stats["failed"] += 1
+
+    def record_timeout(self):
+        with self._lock:
+            self._stats["timeouts"] += 1
+
+    def saturated(self):
+        with self._lock:
+            return self._pending >= self.capacity
+
+    def shutdown(self):
+        with self._lock:
+            self.draining = True
+        self._executor.shutdown(wait=True)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["pending"] = self._pending
+            stats["capacity"] = self.capacity
+            stats["workers"] = self.workers
+            return stats
+
+
+def _run_operation(name, payload):
+    handler = OPERATIONS[name][0]
+    with trace_request(f"api.{name}"), lane(_priority(payload)):
+        return handler(payload)
+
+
+def _run_stream(name, payload, chunks, cancelled):
+    # Runs on a worker: relays the generated text to the handler thread through ``chunks``.
+    handler = OPERATIONS[name][0]
+    try:
+        with trace_request(f"api.{name}"), lane(_priority(payload)):
+            for chunk in handler(payload, stream=True):
+                if cancelled.is_set():
+                    break
+                chunks.put(chunk)
+    except BaseException as e:
+        chunks.put(e)
+    finally:
+        chunks.put(_DONE)
+
+
+def _error_status(error):
+    # HTTP status and message for an exception raised by an operation.
+    if isinstance(error, ApiError):
+        return error.status, error.message
+    if isinstance(error, CircuitOpen):
+        return 503, str(error)
+    if isinstance(error, SchedulerDeadline):
+        return 504, str(error)
+    if isinstance(error, StructuredOutputError):
+        # Gemini answered, but not with a valid analysis even after repair.
+        return 502, f"Invalid structured analysis: {error}"
+    return 500, f"{type(error).__name__}: {error}"
+
+
+def _priority(payload):
+    return LANES[payload.get("priority", "interactive")]
+
+
+def _deadline(payload):
+    timeout = payload.get("timeout")
+    if isinstance(timeout, (int, float)) and timeout > 0:
+        return min(float(timeout), REQUEST_TIMEOUT)
+    return REQUEST_TIMEOUT
+
+
+def _model_configured():
+    return bool(os.environ.get("GEMINI_API_KEY") or os.environ.get("GOOGLE_API_KEY")
+                or registry._model_factory is not None)
+
+
+class ApiHandler(BaseHTTPRequestHandler):
+    server_version = "ATSOptimizerAPI/1.0"
+    # Keep-alive, so that clients reuse their pooled connections, and chunked streaming.
+    protocol_version = "HTTP/1.1"
+    timeout = KEEPALIVE_TIMEOUT
+
+    @property
+    def pool(self):
+        return self.server.pool
+
+    def _send_json(self, status, body, headers=None):
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        if self.path == "/healthz":
+            self._send_json(200, {"status": "ok"})
+        elif self.path == "/readyz":
+            checks = {
+                "accepting": not self.pool.draining and not self.pool.saturated(),
+                "model_configured": _model_configured(),
+                "circuit_closed": scheduler.describe(app.MODEL_ID)["state"] != "open",
+            }
+            self._send_json(200 if all(checks.values()) else 503,
+                            {"ready": all(checks.values()), "checks": checks, "pool": self.pool.stats()})
+        elif self.path == "/metrics":
+            payload = render_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+        else:
+            self._send_json(404, {"error": "Not found"})
+
+    def do_POST(self):
+        name = self.path[len("/v1/"):] if self.path.startswith("/v1/") else None
+        try:
+            if name not in OPERATIONS:
+                # The unread body would be taken for the next request on this connection.
+                self.close_connection = True
+                raise ApiError(404, "Not found")
+            payload = self._read_json()
+            validate(name, payload)
+            if payload.get("stream") and OPERATIONS[name][2]:
+                self._stream(name, payload)
+                return
+            future = self.pool.submit(_run_operation, name, payload)
+            try:
+                result = future.result(timeout=_deadline(payload))
+            except FutureTimeout:
+                # A running call cannot be interrupted; a queued one is dropped.
+                future.cancel()
+                self.pool.record_timeout()
+                raise ApiError(504, "Request timed out")
+            self._send_json(200, result)
+        except Exception as e:
+            status, message = _error_status(e)
+            headers = None
+            if isinstance(e, ApiError):
+                headers = e.headers
+            elif isinstance(e, CircuitOpen):
+                headers = {"Retry-After": str(max(int(e.retry_after), 1))}
+            increment(f"api_errors_total|status={status}")
+            self._send_json(status, {"error": message}, headers)
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > MAX_BODY_BYTES:
+            self.close_connection = True
+            raise ApiError(413, "Request body too large")
+        try:
+            payload = json.loads(self.rfile.read(length) or b"{}")
+        except (UnicodeDecodeError, json.JSONDecodeError):
+            raise ApiError(400, "Request body must be JSON")
+        if not isinstance(payload, dict):
+            raise ApiError(400, "Request body must be a JSON object")
+        return payload
+
+    def _stream(self, name, payload):
+        chunks = queue.Queue()
+        cancelled = threading.Event()
+        self.pool.submit(_run_stream, name, payload, chunks, cancelled)
+        # One deadline for the whole stream, not one per chunk.
+        deadline = time.monotonic() + _deadline(payload)
+        try:
+            first = self._next_chunk(chunks, deadline)
+            if isinstance(first, BaseException):
+                raise first
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson; charset=utf-8")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            self._relay(first, chunks, deadline)
+        finally:
+            cancelled.set()
+
+    def _relay(self, chunk, chunks, deadline):
+        try:
+            try:
+                while chunk is not _DONE:
+                    if isinstance(chunk, BaseException):
+                        raise chunk
+                    self._write_frame({"text": chunk})
+                    chunk = self._next_chunk(chunks, deadline)
+                frame = {"done": True}
+            except OSError:
+                raise
+            except Exception as e:
+                # The 200 status is already sent; the error travels as the stream's last frame.
+                status, message = _error_status(e)
+                increment(f"api_errors_total|status={status}")
+                frame = {"error": message, "status": status}
+            self._write_frame(frame)
+            self.wfile.write(b"0\r\n\r\n")
+            self.wfile.flush()
+        except OSError:
+            # The client went away mid-stream.
+            self.close_connection = True
+
+    def _write_frame(self, frame):
+        data = (json.dumps(frame) + "\n").encode("utf-8")
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+    def _next_chunk(self, chunks, deadline):
+        try:
+            return chunks.get(timeout=max(deadline - time.monotonic(), 0))
+        except queue.Empty:
+            self.pool.record_timeout()
+            raise ApiError(504, "Request timed out")
+
+
+def make_server(host=HOST, port=PORT, workers=WORKERS, queue_size=QUEUE_SIZE):
+    server = ThreadingHTTPServer((host, port), ApiHandler)
+    server.daemon_threads = True
+    server.pool = WorkerPool(workers, queue_size)
+    register_gauges("api_pool", server.pool.stats)
+    return server
+
+
+def main(argv=None):
+    global REQUEST_TIMEOUT
+    parser = argparse.ArgumentParser(description="Serve the resume operations over HTTP.")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--workers", type=int, default=WORKERS, help="Concurrent operations")
+    parser.add_argument("--queue-size", type=int, default=QUEUE_SIZE, help="Requests allowed to wait for a worker")
+    parser.add_argument("--timeout", type=float, default=REQUEST_TIMEOUT, help="Per-request deadline in seconds")
+    args = parser.parse_args(argv)
+    REQUEST_TIMEOUT = args.timeout
+    server = make_server(args.host, args.port, args.workers, args.queue_size)
+    print(f"Serving on http://{args.host}:{args.port} ({args.workers} workers, queue {args.queue_size})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.pool.draining = True
+        server.shutdown()
+        server.server_close()
+        server.pool.shutdown()
+
+
+if __name__ == "__main__":
+    main()
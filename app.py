@@ -3,25 +3,88 @@ if not hasattr(inspect, 'getargspec'):
     inspect.getargspec = inspect.getfullargspec
 
 import streamlit as st
-import tempfile
+from streamlit import runtime
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 import os
 import base64
+import json
 import re
-import requests
+import time
+import uuid
 
-# Import google generative AI (Gemini)
-import google.generativeai as genai
+from api_client import ApiClient
+from artifacts import ArtifactRef, artifact_store
+from boost_pipeline import evaluate_boosted, run_boost_pipeline
+from cascade import (CASCADE_ENABLED, FULL, QUICK_BUDGET_TOKENS, QUICK_MAX_OUTPUT_TOKENS, cascade_stats,
+                     run_cascade)
+from extraction import docx_parser_name, extract_docx_text, extract_pdf_text, pdf_parser_name
+from extraction_cache import cached_extract, content_key, extraction_cache
+from model_registry import registry
+from multi_jd import MAX_ANALYZED, analyze_many
+from near_duplicates import MODE as NEAR_DUP_MODE, analysis_reuse
+from prompt_budget import budget_stats, count_tokens, fit_prompt_inputs
+from llm_cache import CACHE_DISABLED, get_response_cache, make_cache_key
+from scoring import score_resume
+from rendering import markdown_to_docx, markdown_to_html, render, render_cache
+from scheduler import EXPECTED_OUTPUT_TOKENS, scheduler
+from structured_output import GENERATION_CONFIG as ANALYSIS_GENERATION_CONFIG
+from structured_output import is_valid_analysis, parse_analysis, report_from_analysis
+from taxonomy import PhraseMatcher, skill_summary
+from section_analysis import analyze_incremental, section_cache
+from singleflight import single_flight
+from telemetry import increment, record_usage, register_gauges, render_prometheus, recent_traces, snapshot, span, traced
+from jobs import job_key, job_manager
+from history import KINDS as HISTORY_KINDS, get_history_store, record as record_history
 
 # Define a custom GeminiModel to wrap the Gemini API
 class GeminiModel:
-    def __init__(self, id):
+    def __init__(self, id, system_instruction=None):
         self.id = id
-        # Uncomment and update the API key if required:
-        # genai.configure(api_key="YOUR_GEMINI_API_KEY")
-    def generate_content(self, prompt):
-        model = genai.GenerativeModel(self.id)
-        response = model.generate_content(prompt)
+        # Stable context sent once per model object instead of in every prompt.
+        self.system_instruction = system_instruction
+        # The API key is read from GEMINI_API_KEY / GOOGLE_API_KEY by the model registry.
+    def _cost(self, prompt):
+        # Estimated tokens reserved against the TPM quota; settled from usage metadata afterwards.
+        return count_tokens(prompt) + count_tokens(self.system_instruction) + EXPECTED_OUTPUT_TOKENS
+    def generate_content(self, prompt, generation_config=None):
+        # Calls are admitted, retried and failed fast by the rate-limit-aware scheduler;
+        # the underlying GenerativeModel is shared process-wide and the slot caps concurrent calls.
+        cost = self._cost(prompt)
+        with span("gemini"):
+            response = scheduler.call(self.id, lambda timeout: self._generate(prompt, timeout, generation_config), cost)
+        record_usage(self.id, response)
+        scheduler.settle(self.id, cost, total_tokens(response))
         return response
+    def _generate(self, prompt, timeout, generation_config=None):
+        with registry.slot(self.id):
+            model = registry.get_model(self.id, self.system_instruction)
+            return model.generate_content(prompt, generation_config=generation_config, request_options={"timeout": timeout})
+    def generate_content_stream(self, prompt):
+        # Yield the response text chunk by chunk as Gemini produces it.
+        cost = self._cost(prompt)
+        with span("gemini_stream"):
+            yield from scheduler.stream(self.id, lambda timeout: self._open_stream(prompt, timeout, cost), cost)
+    def _open_stream(self, prompt, timeout, cost):
+        with registry.slot(self.id):
+            model = registry.get_model(self.id, self.system_instruction)
+            yield from self._stream_chunks(model.generate_content(prompt, stream=True, request_options={"timeout": timeout}), cost)
+    def _stream_chunks(self, response, cost):
+        chunk = None
+        for chunk in response:
+            try:
+                text = chunk.text
+            except ValueError:
+                # Chunks without text parts (e.g. a final safety/usage chunk).
+                continue
+            if text:
+                yield text
+        # Usage metadata arrives with the final chunk.
+        record_usage(self.id, chunk)
+        scheduler.settle(self.id, cost, total_tokens(chunk))
+
+def total_tokens(response):
+    usage = getattr(response, "usage_metadata", None)
+    return getattr(usage, "total_token_count", 0) or 0
 
 # Attempt to import phi.agent; if not found, define a dummy Agent class.
 try:
@@ -37,112 +100,506 @@ except ModuleNotFoundError:
         def print_response(self, prompt_text):
             response = self.model.generate_content(prompt_text)
             return response.text
+        def stream_response(self, prompt_text):
+            return self.model.generate_content_stream(prompt_text)
+
+check_list = """Checklist for ATS Score Calculation and Improvement  
+
+1. Resume Parsing  
+   - Extract text content and preserve formatting (headings, bullet points, etc.).  
+   - Identify key sections: Work Experience, Education, Skills, Certifications.  
+
+2. Job Description Analysis  
+   - Extract required keywords and phrases from the job description.  
+   - Identify critical skills, certifications, and experience requirements.  
+   - Highlight industry-specific terminology.  
+
+3. Keyword Matching  
+   - Compare keywords from the job description to those found in the resume.  
+   - Count the frequency of keyword occurrences.  
+   - Ensure keywords are detected in context (e.g., within relevant sections).  
+
+4. Contextual and Relevance Evaluation  
+   - Assess if keywords appear in appropriate sections.  
+   - Evaluate context for meaningful usage rather than repetition.  
+
+5. Formatting and Structure Assessment  
+   - Check for ATS-friendly formatting (clear headings, bullet points, simple layout).  
+   - Verify that the resume avoids excessive graphics, tables, or unusual elements.  
+
+6. Scoring Algorithm  
+   - Define weighting for each component (keyword match, context, structure).  
+   - Aggregate scores to generate an overall ATS score with a detailed breakdown.  
+   - Provide a breakdown of scores for different sections.  
+
+7. Detailed Improvement Report  
+   - Highlight missing or underrepresented keywords.  
+   - Provide recommendations to enhance keyword placement and formatting.  
+
+8. Error Handling and Validation  
+   - Ensure accurate text extraction without loss of key formatting.  
+   - Handle parsing errors gracefully with user-friendly messages.  
+
+9. Testing and Refinement  
+   - Test the application with diverse resume formats and job descriptions.  
+   - Regularly update the application to handle new resume trends and ATS criteria.
+"""
 
 # --- Define Agents using GeminiModel ---
-analysis_agent = Agent(
-    name="Analysis Agent",
-    model=GeminiModel(id="gemini-1.5-flash"),
-    instructions=["Provide a detailed ATS analysis comparing the resume with the job description using the checklist."],
-    show_tool_calls=True,
-    markdown=True,
-)
+# Agents are built on first use and then shared by the whole process through the
+# model registry, rather than on every script rerun; the Gemini SDK itself is
+# only imported when the first model is requested.
+AGENT_SPECS = {
+    "analysis": ("Analysis Agent", "Provide a detailed ATS analysis comparing the resume with the job description using the checklist."),
+    "boost": ("Boost Agent", "Revise the resume to improve its ATS compatibility based on the provided analysis report. Preserve details and improve formatting."),
+    "section": ("Section Analysis Agent", "Assess a single resume section against the job description using the checklist."),
+    "multi_jd": ("Multi-JD Analysis Agent", "Assess the resume against each of several job descriptions independently using the checklist."),
+    "quick": ("Quick Screening Agent", "Give a brief ATS fit verdict for the resume against the job description."),
+    "repair": ("JSON Repair Agent", "Correct the JSON you are given so that it matches the requested schema. Return only JSON."),
+    "custom": ("Custom Update Agent", "Update the resume strictly following the custom instructions provided. Ensure professional tone and formatting."),
+    "create": ("Create Resume Agent", "Generate a professional resume in Markdown format using the provided information."),
+}
+MODEL_ID = os.environ.get("ATS_GEMINI_MODEL", "gemini-1.5-flash")
+# Analyses are requested as schema-constrained JSON and rendered to a report,
+# rather than scraping the score out of free text.
+STRUCTURED_ANALYSIS = os.environ.get("ATS_STRUCTURED_ANALYSIS", "1").lower() in ("1", "true", "yes")
 
-boost_agent = Agent(
-    name="Boost Agent",
-    model=GeminiModel(id="gemini-1.5-flash"),
-    instructions=["Revise the resume to improve its ATS compatibility based on the provided analysis report. Preserve details and improve formatting."],
-    show_tool_calls=True,
-    markdown=True,
-)
+# The analysis checklist is the same for every request, so it travels as the
+# analysis model's system instruction (cached context where supported).
+SYSTEM_INSTRUCTIONS = {"analysis": check_list, "section": check_list, "multi_jd": check_list}
 
-custom_agent = Agent(
-    name="Custom Update Agent",
-    model=GeminiModel(id="gemini-1.5-flash"),
-    instructions=["Update the resume strictly following the custom instructions provided. Ensure professional tone and formatting."],
-    show_tool_calls=True,
-    markdown=True,
-)
+def get_agent(kind):
+    name, instruction = AGENT_SPECS[kind]
+    return registry.get_resource(
+        ("agent", kind, MODEL_ID),
+        lambda: Agent(
+            name=name,
+            model=GeminiModel(id=MODEL_ID, system_instruction=SYSTEM_INSTRUCTIONS.get(kind)),
+            instructions=[instruction],
+            show_tool_calls=True,
+            markdown=True,
+        ),
+    )
 
-create_agent = Agent(
-    name="Create Resume Agent",
-    model=GeminiModel(id="gemini-1.5-flash"),
-    instructions=["Generate a professional resume in Markdown format using the provided information."],
-    show_tool_calls=True,
-    markdown=True,
-)
+# With ATS_API_URL set the UI is a thin client: LLM-bound operations run on
+# the API service (api_server.py) instead of in this process.
+API_URL = os.environ.get("ATS_API_URL") or None
 
-def call_agent(prompt_text, agent):
+def api_client():
+    return registry.get_resource(("api_client", API_URL), lambda: ApiClient(API_URL))
+
+def __getattr__(name):
+    # Keeps the old module-level agent names (e.g. app.analysis_agent) working.
+    if name.endswith("_agent") and name[:-len("_agent")] in AGENT_SPECS:
+        return get_agent(name[:-len("_agent")])
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def agent_cache_key(agent, prompt_text, generation_config=None):
+    # The model's system instruction and any response schema are part of the request, so part of the key.
+    instructions = list(agent.instructions or [])
+    system_instruction = getattr(agent.model, "system_instruction", None)
+    if system_instruction:
+        instructions.append(system_instruction)
+    if generation_config:
+        instructions.append(json.dumps(generation_config, sort_keys=True))
+    return make_cache_key(agent.model.id, instructions, prompt_text)
+
+def call_agent(prompt_text, agent, use_cache=True, generation_config=None, cacheable=None):
     # Helper function to call a specified agent and return its response text.
-    return agent.print_response(prompt_text)
+    # Identical (model, instructions, prompt) triples are served from the response cache,
+    # and identical requests already in flight in any session share a single Gemini call.
+    # ``generation_config`` (e.g. JSON mode with a response schema) goes straight to the model,
+    # and responses for which ``cacheable(response)`` is false are not stored.
+    key = agent_cache_key(agent, prompt_text, generation_config)
+    cache = None
+    if use_cache and not CACHE_DISABLED:
+        cache = get_response_cache()
+        cached = cache.get(key)
+        if cached is not None:
+            increment("llm_cache_hits_total")
+            return cached
+        increment("llm_cache_misses_total")
+
+    def fetch():
+        if generation_config:
+            response = agent.model.generate_content(prompt_text, generation_config=generation_config).text
+        else:
+            response = agent.print_response(prompt_text)
+        if cache is not None and response and (cacheable is None or cacheable(response)):
+            cache.set(key, response, model_id=agent.model.id)
+        return response
+    return single_flight.do(f"{agent.name}:{key}", fetch)
+
+def stream_agent(prompt_text, agent, use_cache=True):
+    # Streaming counterpart of call_agent: yields the response text in chunks.
+    # A cached response is yielded in one piece; a completed stream is cached.
+    # Concurrent identical streams share one Gemini stream.
+    key = agent_cache_key(agent, prompt_text)
+    cache = None
+    if use_cache and not CACHE_DISABLED:
+        cache = get_response_cache()
+        cached = cache.get(key)
+        if cached is not None:
+            increment("llm_cache_hits_total")
+            yield cached
+            return
+        increment("llm_cache_misses_total")
+
+    def generate():
+        if hasattr(agent, "stream_response"):
+            chunks = agent.stream_response(prompt_text)
+        else:
+            chunks = agent.model.generate_content_stream(prompt_text)
+        parts = []
+        for chunk in chunks:
+            parts.append(chunk)
+            yield chunk
+        response = "".join(parts)
+        if cache is not None and response:
+            cache.set(key, response, model_id=agent.model.id)
+    yield from single_flight.stream(f"{agent.name}:{key}", generate)
 
 # --- Helper Functions ---
+PLACEHOLDER_PATTERNS = [
+    "add relevant experience",
+    "add your experience here",
+    "placeholder",
+]
+# All placeholder phrases are removed in one scan, by the skills taxonomy's matcher.
+PLACEHOLDER_MATCHER = PhraseMatcher(PLACEHOLDER_PATTERNS)
+
+def _strip_placeholders(text, final=True):
+    return PLACEHOLDER_MATCHER.remove(text, final=final)
+
+@traced("clean_placeholder_text")
 def clean_placeholder_text(text):
     """
     Remove common placeholder phrases from the text.
     """
-    placeholders = [
-        r"add relevant experience",
-        r"add your experience here",
-        r"placeholder",
-    ]
-    for ph in placeholders:
-        text = re.sub(ph, "", text, flags=re.IGNORECASE)
-    return text
+    return _strip_placeholders(text)
+
+class PlaceholderFilter:
+    """
+    Streaming version of clean_placeholder_text. Holds back just enough of the
+    tail of the stream that a placeholder split across chunks is still removed.
+    """
+    def __init__(self):
+        self.hold = max(len(ph) for ph in PLACEHOLDER_PATTERNS)
+        self.buffer = ""
+    def feed(self, chunk):
+        # Matches touching the end of the buffer wait for the next chunk.
+        self.buffer = _strip_placeholders(self.buffer + chunk, final=False)
+        cut = len(self.buffer) - self.hold
+        # Never split a word, so the held tail is matched with its word boundaries intact.
+        while cut > 0 and self.buffer[cut - 1].isalnum() and self.buffer[cut].isalnum():
+            cut -= 1
+        if cut <= 0:
+            return ""
+        ready, self.buffer = self.buffer[:cut], self.buffer[cut:]
+        return ready
+    def flush(self):
+        ready, self.buffer = _strip_placeholders(self.buffer), ""
+        return ready
 
+def stream_clean(chunks):
+    # Apply PlaceholderFilter to a stream of text chunks.
+    placeholder_filter = PlaceholderFilter()
+    for chunk in chunks:
+        ready = placeholder_filter.feed(chunk)
+        if ready:
+            yield ready
+    tail = placeholder_filter.flush()
+    if tail:
+        yield tail
+
+@traced("render_docx")
 def generate_docx_from_markdown(markdown_text):
     """
     Convert Markdown text to a DOCX binary using python-docx.
-    A simple parser is used to create headings, bullet lists, and paragraphs.
+    Headings, nested bullet/numbered lists and inline bold, italic, code and
+    links are converted in a single pass (see rendering.py).
     """
-    from docx import Document
-    document = Document()
-    lines = markdown_text.splitlines()
-    for line in lines:
-        line = line.strip()
-        if not line:
-            document.add_paragraph("")
-        elif line.startswith("#"):
-            level = len(line) - len(line.lstrip('#'))
-            heading_text = line.lstrip('#').strip()
-            if level == 1:
-                document.add_heading(heading_text, level=1)
-            elif level == 2:
-                document.add_heading(heading_text, level=2)
-            else:
-                document.add_heading(heading_text, level=3)
-        elif line.startswith("- ") or line.startswith("* "):
-            document.add_paragraph(line[2:].strip(), style='List Bullet')
-        else:
-            document.add_paragraph(line)
-    f = BytesIO()
-    document.save(f)
-    f.seek(0)
-    return f.read()
-
-def analyze_resume(resume_text, jd_text):
-    prompt = (f"""Analyze the following resume with respect to the job description below.
-Use the following checklist for guidance:
-{check_list}
+    return markdown_to_docx(markdown_text)
+
+@traced("render_html")
+def generate_html_from_markdown(markdown_text):
+    return markdown_to_html(markdown_text)
+
+DOCUMENT_RENDERERS = {"docx": generate_docx_from_markdown, "html": generate_html_from_markdown}
+
+def rendered(markdown_text, output_format):
+    # Rendered documents are memoized by content hash and format across reruns and sessions.
+    return render(markdown_text, output_format, DOCUMENT_RENDERERS[output_format])
+
+ATS_SCORE_LINE = re.compile(r"ATS Score\s*:?\s*\**\s*([0-9]+(?:\.[0-9]+)?)", re.IGNORECASE)
+
+@traced("score_parse")
+def extract_ats_score(analysis_text):
+    """
+    Parse the "ATS Score : <score>" line of an analysis report; returns 0.0 if it is missing.
+    """
+    match = ATS_SCORE_LINE.search(analysis_text or "")
+    if not match:
+        return 0.0
+    return min(float(match.group(1)), 100.0)
+
+def skill_match_block(resume_text, jd_text):
+    # Skills found locally by the taxonomy matcher, as a compact hint for the model.
+    summary = skill_summary(resume_text, jd_text)
+    return f"Skill match (from the skills taxonomy):\n{summary}\n\n" if summary else ""
+
+@traced("prompt_build")
+def build_analysis_prompt(resume_text, jd_text):
+    # The checklist is the analysis model's system instruction, not part of the prompt.
+    skills = skill_match_block(resume_text, jd_text)
+    resume_text, jd_text, _, _ = fit_prompt_inputs(resume_text, jd_text)
+    return (f"""Analyze the following resume with respect to the job description below.
+Use the ATS checklist from your instructions for guidance.
 Provide the ATS score (0 to 100) as a floating point number with a breakdown of scores per section, and a detailed improvement report.
 Return the output in the following format:
 
 ATS Score : <ATS SCORE>
 Detailed Report: <DETAILED REPORT>
 
-Resume:
+{skills}Resume:
 {resume_text}
 
 Job Description:
 {jd_text}""")
-    analysis = call_agent(prompt, analysis_agent)
+
+def analyze_resume(resume_text, jd_text, use_cache=True, structured=None):
+    if API_URL:
+        return api_client().call("analyze", resume_text=resume_text, jd_text=jd_text, use_cache=use_cache,
+                                 structured=structured)["report"]
+    if STRUCTURED_ANALYSIS if structured is None else structured:
+        return analyze_resume_structured(resume_text, jd_text, use_cache=use_cache)["report"]
+    reused = reused_analysis(resume_text, jd_text, "report", use_cache)
+    if reused is not None:
+        return reused
+    prompt = build_analysis_prompt(resume_text, jd_text)
+    analysis = call_agent(prompt, get_agent("analysis"), use_cache=use_cache)
     analysis = clean_placeholder_text(analysis)
+    remember_analysis(resume_text, jd_text, analysis, "report")
     return analysis
 
-def boost_resume_md(resume_text, jd_text, analysis_report):
-    prompt = (
+def reused_analysis(resume_text, jd_text, kind, use_cache=True):
+    # In "auto" mode a near-duplicate resume's prior analysis against the same JD replaces the model call.
+    if NEAR_DUP_MODE != "auto" or not use_cache:
+        return None
+    match = analysis_reuse.find(resume_text, jd_text, kind)
+    return match["result"] if match else None
+
+def remember_analysis(resume_text, jd_text, result, kind):
+    # A report cut off before its score and detailed report is never offered for reuse.
+    if NEAR_DUP_MODE != "off" and (kind != "report" or is_complete_report(result)):
+        analysis_reuse.remember(resume_text, jd_text, result, kind)
+
+def is_complete_report(report):
+    return bool(ATS_SCORE_LINE.search(report or "")) and "detailed report" in report.lower()
+
+def analyze_resume_stream(resume_text, jd_text, use_cache=True):
+    # Streaming variant of analyze_resume; yields cleaned chunks of the report.
+    if API_URL:
+        return api_client().stream("analyze", resume_text=resume_text, jd_text=jd_text, use_cache=use_cache)
+    prompt = build_analysis_prompt(resume_text, jd_text)
+    return stream_clean(stream_agent(prompt, get_agent("analysis"), use_cache=use_cache))
+
+@traced("prompt_build")
+def build_structured_analysis_prompt(resume_text, jd_text):
+    skills = skill_match_block(resume_text, jd_text)
+    resume_text, jd_text, _, _ = fit_prompt_inputs(resume_text, jd_text)
+    return (f"""Analyze the following resume with respect to the job description below.
+Use the ATS checklist from your instructions for guidance.
+Score the resume overall and per section (0 to 100), list the job description keywords missing from the resume,
+and give concise, actionable recommendations. Answer in JSON following the response schema.
+
+{skills}Resume:
+{resume_text}
+
+Job Description:
+{jd_text}""")
+
+def analyze_resume_structured(resume_text, jd_text, use_cache=True):
+    """
+    Analyze the resume in JSON mode. Returns ``{"analysis": <validated result>,
+    "report": <Markdown report>}``; raises StructuredOutputError if the answer is
+    still invalid after the repair attempts.
+    """
+    if API_URL:
+        result = api_client().call("analyze", resume_text=resume_text, jd_text=jd_text, use_cache=use_cache,
+                                   structured=True)
+        return {"analysis": result["analysis"], "report": result["report"]}
+    reused = reused_analysis(resume_text, jd_text, "structured", use_cache)
+    if reused is not None:
+        return reused
+    prompt = build_structured_analysis_prompt(resume_text, jd_text)
+    answer = call_agent(prompt, get_agent("analysis"), use_cache=use_cache,
+                        generation_config=ANALYSIS_GENERATION_CONFIG, cacheable=is_valid_analysis)
+    with span("score_parse"):
+        analysis = parse_analysis(answer, repair=lambda repair: call_agent(
+            repair, get_agent("repair"), use_cache=use_cache,
+            generation_config=ANALYSIS_GENERATION_CONFIG, cacheable=is_valid_analysis))
+    result = {"analysis": analysis, "report": clean_placeholder_text(report_from_analysis(analysis))}
+    remember_analysis(resume_text, jd_text, result, "structured")
+    return result
+
+@traced("prompt_build")
+def build_quick_analysis_prompt(resume_text, jd_text):
+    # Cascade middle tier: compacted inputs and a three-line answer, no checklist.
+    skills = skill_match_block(resume_text, jd_text)
+    resume_text, jd_text, _, _ = fit_prompt_inputs(resume_text, jd_text, budget=QUICK_BUDGET_TOKENS)
+    return (f"""Briefly assess how well the resume below fits the job description.
+Return the output in the following format and nothing else:
+
+ATS Score : <ATS SCORE from 0 to 100>
+Detailed Report: <the strongest match, the biggest gap and a one-line verdict, as three short bullet points>
+
+{skills}Resume:
+{resume_text}
+
+Job Description:
+{jd_text}""")
+
+def analyze_resume_quick(resume_text, jd_text, use_cache=True):
+    prompt = build_quick_analysis_prompt(resume_text, jd_text)
+    report = call_agent(prompt, get_agent("quick"), use_cache=use_cache,
+                        generation_config={"max_output_tokens": QUICK_MAX_OUTPUT_TOKENS})
+    return clean_placeholder_text(report)
+
+def analyze_resume_cascade(resume_text, jd_text, use_cache=True, structured=None, full=None):
+    """
+    Analyze through the scoring cascade: a local relevance score decides between
+    an instant screened-out verdict, the quick prompt and the full analysis
+    (``full(resume_text, jd_text)`` overrides how the full tier is run).
+    Returns ``{"tier", "relevance", "report", "analysis", "ats_score", "local_score"}``;
+    ``analysis`` is only set for a structured full analysis.
+    """
+    if API_URL:
+        return api_client().call("analyze", resume_text=resume_text, jd_text=jd_text, use_cache=use_cache,
+                                 structured=structured, cascade=True)
+    structured = STRUCTURED_ANALYSIS if structured is None else structured
+    full_result = {}
+
+    def full_analysis(resume_text, jd_text):
+        if full is not None:
+            return full(resume_text, jd_text)
+        if structured:
+            full_result.update(analyze_resume_structured(resume_text, jd_text, use_cache=use_cache))
+            return full_result["report"]
+        return analyze_resume(resume_text, jd_text, use_cache=use_cache, structured=False)
+
+    result = run_cascade(resume_text, jd_text,
+                         quick=lambda r, j: analyze_resume_quick(r, j, use_cache=use_cache), full=full_analysis)
+    local = result.pop("local")
+    analysis = full_result.get("analysis")
+    result.update(
+        analysis=analysis,
+        ats_score=analysis["overall_score"] if analysis else extract_ats_score(result["report"]),
+        local_score=local["score"],
+    )
+    return result
+
+@traced("prompt_build")
+def build_section_prompt(section_name, section_text, jd_text):
+    section_text, jd_text, _, _ = fit_prompt_inputs(section_text, jd_text)
+    return (f"""Analyze only the "{section_name}" section of a resume with respect to the job description below.
+Use the ATS checklist from your instructions, applying only the items relevant to this section.
+Provide the section's ATS score (0 to 100) as a floating point number and concise, actionable findings.
+Return the output in the following format:
+
+ATS Score : <SECTION SCORE>
+Findings: <FINDINGS>
+
+Section:
+{section_text}
+
+Job Description:
+{jd_text}""")
+
+def analyze_section(section_name, section_text, jd_text, use_cache=True):
+    if API_URL:
+        return api_client().call("analyze-section", section_name=section_name, section_text=section_text,
+                                 jd_text=jd_text, use_cache=use_cache)["report"]
+    prompt = build_section_prompt(section_name, section_text, jd_text)
+    return clean_placeholder_text(call_agent(prompt, get_agent("section"), use_cache=use_cache))
+
+def analyze_resume_incremental(resume_text, jd_text, use_cache=True):
+    """
+    Analyze the resume section by section, re-analyzing only sections whose
+    content changed since they were last seen; returns a merged report in the
+    same format as analyze_resume.
+    """
+    result = analyze_incremental(
+        resume_text, jd_text,
+        analyze_section=lambda name, body, jd: analyze_section(name, body, jd, use_cache=use_cache),
+        parse_score=extract_ats_score,
+        model_id=MODEL_ID,
+        use_cache=use_cache,
+    )
+    return result["report"]
+
+def reanalyzer(use_cache=True, incremental=True):
+    # The analysis callable used to score boosted candidates.
+    if incremental:
+        return lambda r, j: analyze_resume_incremental(r, j, use_cache=use_cache)
+    return lambda r, j: analyze_resume(r, j, use_cache=use_cache)
+
+def build_multi_jd_prompt(resume_text, labelled_jds):
+    # The resume is sent once for every job description in the batch.
+    jd_blocks = "\n\n".join(f"JD {label}:\n{jd_text}" for label, jd_text in labelled_jds)
+    return (f"""Analyze the following resume with respect to each of the {len(labelled_jds)} job descriptions below.
+Use the ATS checklist from your instructions for guidance and assess each job description independently.
+For every job description, in order, return exactly one block in the following format and nothing else:
+
+JD <NUMBER>
+ATS Score : <ATS SCORE>
+Matched: <comma-separated requirements the resume meets>
+Missing: <comma-separated missing keywords and requirements>
+Summary: <one sentence on the overall fit>
+
+Resume:
+{resume_text}
+
+Job Descriptions:
+{jd_blocks}""")
+
+def analyze_resume_against_jds(resume_text, jds, use_cache=True, max_analyzed=None):
+    """
+    Rank job descriptions (dicts with ``text`` and optional ``id`` / ``title``)
+    by how well the resume matches them, packing several into each prompt.
+    ``max_analyzed`` sends only that many, best skill overlap first, to the model.
+    Returns the result of ``multi_jd.analyze_many``.
+    """
+    if API_URL:
+        return api_client().call("analyze-many", resume_text=resume_text, jds=jds, use_cache=use_cache,
+                                 max_analyzed=max_analyzed)
+    return analyze_many(
+        resume_text, jds,
+        build_prompt=build_multi_jd_prompt,
+        call_model=lambda prompt: clean_placeholder_text(call_agent(prompt, get_agent("multi_jd"), use_cache=use_cache)),
+        analyze_single=lambda r, j: analyze_resume(r, j, use_cache=use_cache),
+        parse_score=extract_ats_score,
+        overhead_tokens=count_tokens(check_list),
+        max_analyzed=max_analyzed,
+    )
+
+# Instruction variants tried concurrently by the boost pipeline; None is the default prompt.
+BOOST_VARIANTS = [
+    None,
+    "Prioritize working the job description's missing keywords naturally into the Experience and Skills sections.",
+    "Prioritize concise, quantified achievement bullets that mirror the job description's responsibilities.",
+]
+
+@traced("prompt_build")
+def build_boost_prompt(resume_text, jd_text, analysis_report, variant=None):
+    focus = f"\nAdditional focus: {variant}" if variant else ""
+    # The boosted resume replaces the user's, so only the JD and the report are compacted.
+    resume_text, jd_text, analysis_report, _ = fit_prompt_inputs(resume_text, jd_text, analysis_report or "",
+                                                                 keep_resume=True)
+    return (
         f"""You are a highly skillful tool that boosts and enhances resumes by integrating recommendations from an analysis report.
 Revise the resume to improve its ATS score, compatibility, and formatting while preserving its details and style.
-Return the updated resume in Markdown format with proper headings, bullet points, and styling.
+Return the updated resume in Markdown format with proper headings, bullet points, and styling.{focus}
 
 ATS Analysis Report:
 {analysis_report}
@@ -156,12 +613,54 @@ Job Description:
 Return only the updated resume in Markdown format.
 Strict guideline: Return only the updated resume text in a professional tone."""
     )
-    boosted_md = call_agent(prompt, boost_agent)
+
+def boost_resume_md(resume_text, jd_text, analysis_report, use_cache=True, variant=None):
+    if API_URL:
+        return api_client().call("boost", resume_text=resume_text, jd_text=jd_text, analysis_report=analysis_report,
+                                 variant=variant, use_cache=use_cache)["boosted_resume"]
+    prompt = build_boost_prompt(resume_text, jd_text, analysis_report, variant)
+    boosted_md = call_agent(prompt, get_agent("boost"), use_cache=use_cache)
     boosted_md = clean_placeholder_text(boosted_md)
     return boosted_md
 
-def custom_update_resume(resume_text, custom_prompt):
-    prompt = (
+def boost_resume_md_stream(resume_text, jd_text, analysis_report, use_cache=True, variant=None):
+    # Streaming variant of boost_resume_md; yields cleaned chunks of the boosted resume.
+    if API_URL:
+        return api_client().stream("boost", resume_text=resume_text, jd_text=jd_text, analysis_report=analysis_report,
+                                   variant=variant, use_cache=use_cache)
+    prompt = build_boost_prompt(resume_text, jd_text, analysis_report, variant)
+    return stream_clean(stream_agent(prompt, get_agent("boost"), use_cache=use_cache))
+
+def boost_resume_pipeline(resume_text, jd_text, analysis_report, variants=(None,), use_cache=True, incremental=True):
+    """
+    Boost the resume with each instruction variant concurrently, re-analyze
+    every candidate as soon as it is ready, and return the best one.
+    With ``incremental`` the candidates are re-analyzed section by section, and
+    so is the original resume, so that before and after scores are comparable.
+    """
+    return run_boost_pipeline(
+        resume_text, jd_text, analysis_report,
+        boost=lambda r, j, a, v: boost_resume_md(r, j, a, use_cache=use_cache, variant=v),
+        analyze=reanalyzer(use_cache, incremental),
+        parse_score=extract_ats_score,
+        variants=variants,
+        rescore_original=incremental,
+    )
+
+def evaluate_boosted_resume(boosted_resume, resume_text, jd_text, use_cache=True, incremental=True):
+    """
+    Re-analyze and locally score an already boosted (e.g. streamed) resume concurrently.
+    """
+    return evaluate_boosted(
+        boosted_resume, resume_text, jd_text,
+        analyze=reanalyzer(use_cache, incremental),
+        parse_score=extract_ats_score,
+        rescore_original=incremental,
+    )
+
+@traced("prompt_build")
+def build_custom_update_prompt(resume_text, custom_prompt):
+    return (
         f"""You are a professional resume editor. 
 Using the following resume, update it strictly according to the custom instructions provided.
 Resume:
@@ -172,12 +671,27 @@ Custom Instructions:
 
 Return only the updated resume in Markdown format in a professional tone."""
     )
-    updated_resume = call_agent(prompt, custom_agent)
+
+def custom_update_resume(resume_text, custom_prompt, use_cache=True):
+    if API_URL:
+        return api_client().call("custom-update", resume_text=resume_text, instructions=custom_prompt,
+                                 use_cache=use_cache)["updated_resume"]
+    prompt = build_custom_update_prompt(resume_text, custom_prompt)
+    updated_resume = call_agent(prompt, get_agent("custom"), use_cache=use_cache)
     updated_resume = clean_placeholder_text(updated_resume)
     return updated_resume
 
-def create_resume_from_form(form_data):
-    prompt = (
+def custom_update_resume_stream(resume_text, custom_prompt, use_cache=True):
+    # Streaming variant of custom_update_resume.
+    if API_URL:
+        return api_client().stream("custom-update", resume_text=resume_text, instructions=custom_prompt,
+                                   use_cache=use_cache)
+    prompt = build_custom_update_prompt(resume_text, custom_prompt)
+    return stream_clean(stream_agent(prompt, get_agent("custom"), use_cache=use_cache))
+
+@traced("prompt_build")
+def build_create_prompt(form_data):
+    return (
         f"""Based on the following information, create a professional resume in Markdown format.
 Use clear headings, bullet points, and a professional tone. Include all mandatory details and incorporate optional sections as provided.
 
@@ -210,55 +724,407 @@ Hobbies (Optional):
 
 Return only the resume in Markdown format."""
     )
-    new_resume = call_agent(prompt, create_agent)
+
+def create_resume_from_form(form_data, use_cache=True):
+    if API_URL:
+        return api_client().call("create", form_data=form_data, use_cache=use_cache)["resume"]
+    prompt = build_create_prompt(form_data)
+    new_resume = call_agent(prompt, get_agent("create"), use_cache=use_cache)
     new_resume = clean_placeholder_text(new_resume)
     return new_resume
 
+def create_resume_from_form_stream(form_data, use_cache=True):
+    # Streaming variant of create_resume_from_form.
+    if API_URL:
+        return api_client().stream("create", form_data=form_data, use_cache=use_cache)
+    prompt = build_create_prompt(form_data)
+    return stream_clean(stream_agent(prompt, get_agent("create"), use_cache=use_cache))
+
+def note_truncated_pdf(file_bytes, pages):
+    # Kept with the extraction cache entry, so the warning is shown again on cached reruns.
+    extraction_cache.note_truncated(content_key(file_bytes, pdf_parser_name()), pages)
+
+@traced("extract_pdf")
 def extract_text_from_pdf(file_bytes):
     text = ""
     try:
-        if pdfminer_extract_text:
-            with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as tmp:
-                tmp.write(file_bytes)
-                tmp_filename = tmp.name
-            text = pdfminer_extract_text(tmp_filename)
-            os.remove(tmp_filename)
-        else:
-            pdf_reader = PyPDF2.PdfReader(BytesIO(file_bytes))
-            for page in pdf_reader.pages:
-                text += page.extract_text() or ""
+        text = extract_pdf_text(file_bytes, on_truncate=lambda pages: note_truncated_pdf(file_bytes, pages))
     except Exception as e:
+        increment("errors_total|stage=extract_pdf")
         st.error(f"Error extracting text from PDF: {e}")
     return text
 
+@traced("extract_docx")
 def extract_text_from_docx(file_bytes):
     text = ""
     try:
-        with tempfile.NamedTemporaryFile(suffix=".docx", delete=False) as tmp:
-            tmp.write(file_bytes)
-            tmp_filename = tmp.name
-        # Check if 'mammoth' exists in globals() and use it if available.
-        if 'mammoth' in globals() and mammoth is not None:
-            with open(tmp_filename, "rb") as docx_file:
-                result = mammoth.convert_to_markdown(docx_file)
-                text = result.value
-        else:
-            doc = docx.Document(tmp_filename)
-            for para in doc.paragraphs:
-                text += para.text + "\n"
-        os.remove(tmp_filename)
+        text = extract_docx_text(file_bytes)
     except Exception as e:
+        increment("errors_total|stage=extract_docx")
         st.error(f"Error extracting formatted text from DOCX: {e}")
     return text
 
-st.set_page_config(
-    page_title="Resume ATS Optimizer Pro",
-    page_icon="📄",
-    layout="wide",
-    initial_sidebar_state="expanded"
+register_gauges("llm_cache", lambda: {} if CACHE_DISABLED else get_response_cache().stats())
+register_gauges("extraction_cache", extraction_cache.stats)
+register_gauges("gemini", registry.stats)
+register_gauges("prompt_budget", lambda: dict(budget_stats))
+register_gauges("section_cache", section_cache.stats)
+register_gauges("jobs", job_manager.stats)
+register_gauges("single_flight", single_flight.stats)
+register_gauges("render_cache", render_cache.stats)
+register_gauges("scheduler", scheduler.stats)
+register_gauges("near_duplicates", analysis_reuse.stats)
+register_gauges("artifacts", artifact_store.stats)
+register_gauges("cascade", cascade_stats.stats)
+register_gauges("history", lambda: {} if get_history_store() is None else get_history_store().stats())
+
+# --- Background jobs ---
+# Agent calls run on the job manager; these functions run in its worker threads
+# and report progress and partial output through ``job``.
+JOB_POLL_SECONDS = float(os.environ.get("ATS_JOB_POLL_SECONDS", 0.5))
+
+def record_job_result(job, kind, result, resume_text=None, jd_text=None, **fields):
+    # Queued for the history store's writer thread; never blocks the job.
+    record_history(kind, result, resume_text=resume_text, jd_text=jd_text, model_id=MODEL_ID,
+                   latency=job.elapsed(), **fields)
+
+def stream_analysis_job(job, resume_text, jd_text, use_cache=True):
+    # Free-text analysis streamed into the job's partial output.
+    report = None if API_URL else reused_analysis(resume_text, jd_text, "report", use_cache)
+    if report is None:
+        report = job.stream(analyze_resume_stream(resume_text, jd_text, use_cache=use_cache))
+        if not API_URL:
+            remember_analysis(resume_text, jd_text, report, "report")
+    return report
+
+def analyze_job(job, resume_text, jd_text, use_cache=True, structured=False, cascade=False):
+    job.set_progress("Analyzing resume")
+    if cascade:
+        result = analyze_resume_cascade(
+            resume_text, jd_text, use_cache=use_cache, structured=structured,
+            full=None if structured else lambda r, j: stream_analysis_job(job, r, j, use_cache=use_cache))
+        report, score = result["report"], result["ats_score"]
+    elif structured:
+        result = analyze_resume_structured(resume_text, jd_text, use_cache=use_cache)
+        report, score = result["report"], result["analysis"]["overall_score"]
+    else:
+        result = stream_analysis_job(job, resume_text, jd_text, use_cache=use_cache)
+        report, score = result, extract_ats_score(result)
+    record_job_result(job, "analysis", report, resume_text, jd_text, ats_score=score,
+                      local_score=score_resume(resume_text, jd_text)["score"])
+    return result
+
+def boost_job(job, resume_text, jd_text, analysis_report, variants, use_cache=True, incremental=True):
+    if len(variants) == 1:
+        # A single candidate is streamed; re-analysis and rendering then run concurrently.
+        job.set_progress("Boosting resume")
+        boosted = job.stream(boost_resume_md_stream(resume_text, jd_text, analysis_report,
+                                                    use_cache=use_cache, variant=variants[0]))
+        job.set_progress("Scoring the boosted resume")
+        result = evaluate_boosted_resume(boosted, resume_text, jd_text, use_cache=use_cache, incremental=incremental)
+    else:
+        job.set_progress(f"Generating {len(variants)} boost candidates")
+        result = boost_resume_pipeline(resume_text, jd_text, analysis_report, variants=variants,
+                                       use_cache=use_cache, incremental=incremental)
+    record_job_result(job, "boost", result["boosted_resume"], resume_text, jd_text,
+                      ats_score=result["ats_score"], local_score=result["local_score"]["score"])
+    return result
+
+def custom_update_job(job, resume_text, custom_prompt, use_cache=True):
+    job.set_progress("Updating resume")
+    updated = job.stream(custom_update_resume_stream(resume_text, custom_prompt, use_cache=use_cache))
+    record_job_result(job, "custom_update", updated, resume_text)
+    return updated
+
+def create_job(job, form_data, use_cache=True):
+    job.set_progress("Creating resume")
+    new_resume = job.stream(create_resume_from_form_stream(form_data, use_cache=use_cache))
+    record_job_result(job, "create", new_resume, candidate=form_data.get("name"))
+    return new_resume
+
+def multi_jd_job(job, resume_text, jds, use_cache=True, max_analyzed=None):
+    job.set_progress(f"Matching the resume against {len(jds)} job descriptions")
+    return analyze_resume_against_jds(resume_text, jds, use_cache=use_cache, max_analyzed=max_analyzed)
+
+def start_job(slot, fn, *args, **kwargs):
+    """
+    Submit ``fn`` as a background job and remember it in this session under ``slot``.
+    Identical in-flight jobs (same slot and inputs) are shared rather than duplicated,
+    with this session as one of the job's subscribers.
+    """
+    job = job_manager.submit(slot, job_key(slot, args, kwargs), fn, *args, subscriber=artifact_session(), **kwargs)
+    st.session_state.jobs[slot] = job.id
+    return job
+
+@st.fragment(run_every=JOB_POLL_SECONDS)
+def job_progress(slot, title):
+    # Re-runs on its own every JOB_POLL_SECONDS; hands back to a full rerun once the job ends.
+    job = job_manager.get(st.session_state.jobs.get(slot))
+    if job is None or job.done:
+        st.rerun()
+    info = job.snapshot()
+    status_col, cancel_col = st.columns([4, 1])
+    with status_col:
+        st.caption(f"⏳ {info['progress'] or title} ({info['status']}, {info['elapsed']:.1f}s elapsed)")
+    with cancel_col:
+        if st.button("Cancel", key=f"cancel_{slot}", use_container_width=True):
+            if not job.cancel(artifact_session()):
+                # Other sessions still wait for this job; only this session stops following it.
+                st.session_state.jobs.pop(slot, None)
+            st.rerun()
+    if info["text"]:
+        with st.expander(f"Live {title}", expanded=True):
+            st.markdown(info["text"])
+
+# Streamlit before 1.50 needs the file contents up front; 1.50 and later accept a
+# callable and only render the document when the button is clicked.
+DEFERRED_DOWNLOADS = tuple(int(part) for part in re.findall(r"\d+", st.__version__)[:2]) >= (1, 50)
+
+def download_data(markdown_text, output_format):
+    if DEFERRED_DOWNLOADS:
+        return lambda: rendered(markdown_text, output_format)
+    return rendered(markdown_text, output_format)
+
+DOWNLOAD_FORMATS = (
+    ("md", "Markdown", "text/markdown"),
+    ("html", "HTML", "text/html"),
+    ("docx", "Word Document", "application/vnd.openxmlformats-officedocument.wordprocessingml.document"),
 )
 
-st.markdown("""
+def render_download_buttons(label, markdown_text, file_stem):
+    col1, col2, col3 = st.columns(3)
+    for col, (output_format, format_name, mime) in zip((col1, col2, col3), DOWNLOAD_FORMATS):
+        with col:
+            try:
+                data = markdown_text if output_format == "md" else download_data(markdown_text, output_format)
+                st.download_button(
+                    f"📥 Download {label} as {format_name}",
+                    data=data,
+                    file_name=f"{file_stem}.{output_format}",
+                    mime=mime,
+                    key=f"download_{file_stem}_{output_format}",
+                    use_container_width=True,
+                )
+            except Exception as e:
+                st.error(f"Conversion to {format_name} failed: {e}")
+
+def format_report(report):
+    # The score is shown in the gauge above, so its line is dropped from a free-text report.
+    report = re.sub(r"^\W*ATS Score\b.*$\n?", "", report, count=1, flags=re.IGNORECASE | re.MULTILINE)
+    return re.sub(r"^\W*Detailed Report\W*:", "**Detailed Report:**", report, count=1, flags=re.IGNORECASE | re.MULTILINE)
+
+def render_structured_analysis(analysis):
+    if analysis["section_scores"]:
+        st.markdown("**Section scores**")
+        st.dataframe(
+            [{"Section": entry["section"], "Score": entry["score"], "Notes": entry["notes"]}
+             for entry in analysis["section_scores"]],
+            hide_index=True,
+            use_container_width=True,
+        )
+    if analysis["missing_keywords"]:
+        st.markdown("**Missing keywords:** " + ", ".join(analysis["missing_keywords"]))
+    if analysis["recommendations"]:
+        st.markdown("**Recommendations**")
+        st.markdown("\n".join(f"{i}. {item}" for i, item in enumerate(analysis["recommendations"], 1)))
+
+def show_job(slot, title, apply_result):
+    """
+    Show the live progress of this session's ``slot`` job, or apply its result
+    with ``apply_result(result)`` once it has finished (on any later rerun).
+    """
+    job = job_manager.get(st.session_state.jobs.get(slot))
+    if job is None:
+        st.session_state.jobs.pop(slot, None)
+        return
+    if not job.done:
+        job_progress(slot, title)
+        return
+    del st.session_state.jobs[slot]
+    if job.status == "done":
+        apply_result(job.result)
+    elif job.status == "failed":
+        st.error(f"{title} failed: {job.error}")
+    else:
+        st.info(f"{title} was cancelled.")
+
+def artifact_session():
+    # The Streamlit session id, so the artifact store can ask the runtime whether the session is still live.
+    if "artifact_session" not in st.session_state:
+        ctx = get_script_run_ctx()
+        st.session_state.artifact_session = ctx.session_id if ctx else uuid.uuid4().hex
+    return st.session_state.artifact_session
+
+def streamlit_session_live(session):
+    return runtime.exists() and runtime.get_instance().is_active_session(session)
+
+artifact_store.is_live = streamlit_session_live
+
+# Session state derived from each artifact, cleared with it if the artifact has been evicted.
+ARTIFACT_DEPENDENTS = {
+    "analysis_report": ("ats_score", "structured_analysis", "analysis_tier"),
+    "boosted_resume": ("boosted_ats_score", "boosted_ats_score_before", "boosted_local_score"),
+}
+
+def set_artifact(name, value):
+    # Large results live in the shared, compressed artifact store; the session keeps a reference.
+    session = artifact_session()
+    previous = st.session_state.get(name)
+    st.session_state[name] = artifact_store.put(value, session)
+    artifact_store.release(previous, session)
+
+def get_artifact(name):
+    ref = st.session_state.get(name)
+    value = artifact_store.get(ref)
+    if value is None and isinstance(ref, ArtifactRef):
+        # Evicted while the session was idle; drop the stale scores that went with it.
+        for key in (name,) + ARTIFACT_DEPENDENTS.get(name, ()):
+            st.session_state[key] = None
+        st.warning("A previous result expired while this tab was idle. Please run it again.")
+    return value
+
+def near_duplicate_offer(resume_text, jd_text, kind):
+    # Looked up once per resume, JD and kind rather than on every rerun, which would inflate the lookup counters.
+    key = content_key("\0".join((resume_text, jd_text)).encode("utf-8"), kind)
+    offer = st.session_state.get("near_duplicate_offer")
+    if offer is None or offer[0] != key:
+        offer = (key, analysis_reuse.find(resume_text, jd_text, kind))
+        st.session_state.near_duplicate_offer = offer
+    return offer[1]
+
+def apply_analysis(result):
+    # Structured and cascade analyses arrive as dicts with a "report", free-text ones as the report itself.
+    if isinstance(result, dict):
+        set_artifact("analysis_report", result["report"])
+        st.session_state.structured_analysis = result["analysis"]
+        st.session_state.ats_score = (result["analysis"]["overall_score"] if result["analysis"]
+                                      else extract_ats_score(result["report"]))
+        st.session_state.analysis_tier = result.get("tier")
+    else:
+        set_artifact("analysis_report", result)
+        st.session_state.structured_analysis = None
+        st.session_state.ats_score = extract_ats_score(result)
+        st.session_state.analysis_tier = None
+
+def apply_boost(boost_result):
+    set_artifact("boosted_resume", boost_result["boosted_resume"])
+    st.session_state.boosted_ats_score = boost_result["ats_score"]
+    # Section-merged scores are only compared with the original scored the same way.
+    before = boost_result.get("ats_score_before")
+    st.session_state.boosted_ats_score_before = st.session_state.ats_score if before is None else before
+    st.session_state.boosted_local_score = boost_result["local_score"]
+    st.session_state.local_score = boost_result["local_score_before"]
+    for error in boost_result["errors"]:
+        st.warning(f"A boost variant failed: {error}")
+
+HISTORY_PAGE_SIZE = int(os.environ.get("ATS_HISTORY_PAGE_SIZE", 20))
+
+def apply_history_record(record_id):
+    # Restore a recorded result into this session instead of re-running it.
+    record = get_history_store().get(record_id)
+    if record is None:
+        return
+    if record["kind"] == "analysis":
+        set_artifact("analysis_report", record["result"])
+        st.session_state.structured_analysis = None
+        st.session_state.analysis_tier = None
+        st.session_state.ats_score = record["ats_score"]
+    elif record["kind"] == "boost":
+        set_artifact("boosted_resume", record["result"])
+        st.session_state.boosted_ats_score = record["ats_score"]
+        st.session_state.boosted_ats_score_before = None
+    elif record["kind"] == "custom_update":
+        set_artifact("custom_updated_resume", record["result"])
+    elif record["kind"] == "create":
+        set_artifact("new_resume", record["result"])
+
+def history_page(filters):
+    """
+    Show the current page of history records for ``filters`` with Previous / Next
+    buttons; page cursors are kept in the session and reset when filters change.
+    """
+    store = get_history_store()
+    if st.session_state.get("history_filters") != filters:
+        st.session_state.history_filters = filters
+        st.session_state.history_cursors = [None]
+    cursors = st.session_state.history_cursors
+    rows, next_cursor = store.history(cursor=cursors[-1], limit=HISTORY_PAGE_SIZE, **filters)
+    if not rows:
+        st.info("No recorded results match these filters.")
+        return []
+    st.dataframe(
+        [{
+            "ID": row["id"],
+            "Recorded": time.strftime("%Y-%m-%d %H:%M", time.localtime(row["created_at"])),
+            "Type": row["kind"],
+            "Candidate": row["candidate"],
+            "Job": row["jd_title"],
+            "ATS Score": row["ats_score"],
+            "Local Score": row["local_score"],
+            "Model": row["model_id"],
+            "Latency (s)": None if row["latency_ms"] is None else round(row["latency_ms"] / 1000, 1),
+        } for row in rows],
+        hide_index=True,
+        use_container_width=True,
+    )
+    previous_col, page_col, next_col = st.columns([1, 2, 1])
+    with previous_col:
+        if st.button("◀ Previous", disabled=len(cursors) == 1, key="history_previous"):
+            cursors.pop()
+            st.rerun()
+    with page_col:
+        st.caption(f"Page {len(cursors)}")
+    with next_col:
+        if st.button("Next ▶", disabled=next_cursor is None, key="history_next"):
+            cursors.append(next_cursor)
+            st.rerun()
+    return rows
+
+def apply_multi_jd(result):
+    st.session_state.multi_jd_result = result
+
+def apply_custom_update(updated_resume):
+    set_artifact("custom_updated_resume", updated_resume)
+
+def apply_new_resume(new_resume):
+    set_artifact("new_resume", new_resume)
+
+def collect_job_descriptions(files, pasted_text):
+    """
+    Build the job description list for multi-JD matching from uploaded files
+    and pasted text (several descriptions separated by lines of ``---``).
+    """
+    jds = []
+    for file in files or []:
+        text = extract_uploaded_text(file.name, file.getvalue())
+        if text and text.strip():
+            jds.append({"id": file.name, "title": os.path.splitext(file.name)[0], "text": text})
+    for text in re.split(r"^\s*-{3,}\s*$", pasted_text or "", flags=re.MULTILINE):
+        if text.strip():
+            jds.append({"id": f"pasted-{len(jds) + 1}", "text": text.strip()})
+    return jds
+
+def extract_uploaded_text(file_name, file_bytes):
+    """
+    Return the text of an uploaded document, or None if its type is not supported.
+    Parsed results are cached by content hash and parser, so reruns and other
+    sessions uploading the same file do not parse it again.
+    """
+    lower = file_name.lower()
+    if lower.endswith(".tex") or lower.endswith(".txt"):
+        return file_bytes.decode("utf-8")
+    if lower.endswith(".pdf"):
+        text = cached_extract(file_bytes, pdf_parser_name(), extract_text_from_pdf)
+        pages = extraction_cache.truncated_pages(content_key(file_bytes, pdf_parser_name()))
+        if pages:
+            st.warning(f"Only the first {pages} pages of {file_name} were read (ATS_EXTRACT_MAX_PAGES); "
+                       "the rest of the document is not analyzed.")
+        return text
+    if lower.endswith(".docx"):
+        return cached_extract(file_bytes, docx_parser_name(), extract_text_from_docx)
+    return None
+
+PAGE_CSS = """
 <style>
     .main {
         padding: 2rem 3rem;
@@ -336,51 +1202,50 @@ st.markdown("""
         padding-left: 10px;
     }
 </style>
-""", unsafe_allow_html=True)
-
-check_list = """Checklist for ATS Score Calculation and Improvement  
-
-1. Resume Parsing  
-   - Extract text content and preserve formatting (headings, bullet points, etc.).  
-   - Identify key sections: Work Experience, Education, Skills, Certifications.  
-
-2. Job Description Analysis  
-   - Extract required keywords and phrases from the job description.  
-   - Identify critical skills, certifications, and experience requirements.  
-   - Highlight industry-specific terminology.  
-
-3. Keyword Matching  
-   - Compare keywords from the job description to those found in the resume.  
-   - Count the frequency of keyword occurrences.  
-   - Ensure keywords are detected in context (e.g., within relevant sections).  
-
-4. Contextual and Relevance Evaluation  
-   - Assess if keywords appear in appropriate sections.  
-   - Evaluate context for meaningful usage rather than repetition.  
-
-5. Formatting and Structure Assessment  
-   - Check for ATS-friendly formatting (clear headings, bullet points, simple layout).  
-   - Verify that the resume avoids excessive graphics, tables, or unusual elements.  
-
-6. Scoring Algorithm  
-   - Define weighting for each component (keyword match, context, structure).  
-   - Aggregate scores to generate an overall ATS score with a detailed breakdown.  
-   - Provide a breakdown of scores for different sections.  
+"""
 
-7. Detailed Improvement Report  
-   - Highlight missing or underrepresented keywords.  
-   - Provide recommendations to enhance keyword placement and formatting.  
 
-8. Error Handling and Validation  
-   - Ensure accurate text extraction without loss of key formatting.  
-   - Handle parsing errors gracefully with user-friendly messages.  
+def render_debug_panel():
+    # Waterfall of the most recent traced requests, plus the metrics export.
+    traces = recent_traces()
+    if not traces:
+        st.caption("No requests traced yet.")
+    for trace in traces:
+        total = trace["duration"] or 1e-6
+        st.markdown(
+            f"**{trace['name']}** · {total:.2f}s · tokens in/out "
+            f"{trace['tokens']['prompt']}/{trace['tokens']['output']}"
+            + (f" · ⚠️ {trace['error']}" if trace["error"] else "")
+        )
+        bars = []
+        for item in trace["spans"]:
+            left = min(100.0 * item["offset"] / total, 100.0)
+            width = max(min(100.0 * item["duration"] / total, 100.0 - left), 0.5)
+            color = "#e53935" if item["error"] else "#1E88E5"
+            bars.append(
+                f'<div style="font-size:0.7rem;">{item["name"]} ({item["duration"] * 1000:.0f} ms)</div>'
+                f'<div style="margin-left:{left:.1f}%;width:{width:.1f}%;height:6px;'
+                f'background:{color};border-radius:3px;margin-bottom:4px;"></div>'
+            )
+        st.markdown("".join(bars), unsafe_allow_html=True)
+    st.download_button("Download metrics (Prometheus)", render_prometheus(), file_name="metrics.prom",
+                       mime="text/plain", use_container_width=True)
+    st.download_button("Download metrics (JSON)", json.dumps(snapshot(), indent=2, default=str),
+                       file_name="metrics.json", mime="application/json", use_container_width=True)
 
-9. Testing and Refinement  
-   - Test the application with diverse resume formats and job descriptions.  
-   - Regularly update the application to handle new resume trends and ATS criteria.
-"""
+def setup_page():
+    # Page configuration lives here rather than at import time so the helpers
+    # above can be imported by headless tools without touching Streamlit.
+    st.set_page_config(
+        page_title="Resume ATS Optimizer Pro",
+        page_icon="📄",
+        layout="wide",
+        initial_sidebar_state="expanded"
+    )
+    st.markdown(PAGE_CSS, unsafe_allow_html=True)
 
 def main():
+    setup_page()
     if 'analysis_report' not in st.session_state:
         st.session_state.analysis_report = None
     if 'boosted_resume' not in st.session_state:
@@ -389,15 +1254,93 @@ def main():
         st.session_state.ats_score = 0.0
     if 'boosted_ats_score' not in st.session_state:
         st.session_state.boosted_ats_score = 0.0
+    if 'boosted_ats_score_before' not in st.session_state:
+        st.session_state.boosted_ats_score_before = None
     if 'custom_updated_resume' not in st.session_state:
         st.session_state.custom_updated_resume = None
     if 'new_resume' not in st.session_state:
         st.session_state.new_resume = None
+    if 'structured_analysis' not in st.session_state:
+        st.session_state.structured_analysis = None
+    if 'analysis_tier' not in st.session_state:
+        st.session_state.analysis_tier = None
+    if 'multi_jd_result' not in st.session_state:
+        st.session_state.multi_jd_result = None
+    if 'jobs' not in st.session_state:
+        # Background job ids by slot ("analyze", "boost", "custom_update", "create").
+        st.session_state.jobs = {}
+    if 'local_score' not in st.session_state:
+        st.session_state.local_score = None
+    if 'boosted_local_score' not in st.session_state:
+        st.session_state.boosted_local_score = None
+    artifact_store.touch(artifact_session())
+
+    with st.sidebar:
+        st.markdown("### Settings")
+        bypass_cache = st.checkbox("Bypass response cache", value=False, key="bypass_llm_cache",
+                                   help="Always send a fresh request to Gemini instead of reusing a cached answer.")
+        if not CACHE_DISABLED:
+            cache_stats = get_response_cache().stats()
+            st.caption(
+                f"Response cache: {cache_stats['hits']} hits / {cache_stats['misses']} misses, "
+                f"{cache_stats['entries']} entries ({cache_stats['bytes'] / 1024:.0f} KB)"
+            )
+        if budget_stats["prompts"]:
+            saved = budget_stats["tokens_before"] - budget_stats["tokens_after"]
+            st.caption(f"Prompt budget: {budget_stats['compacted']} of {budget_stats['prompts']} prompts compacted, "
+                       f"~{saved} input tokens saved")
+        section_stats = section_cache.stats()
+        if section_stats["hits"] or section_stats["misses"]:
+            st.caption(f"Section cache: {section_stats['hits']} sections reused, "
+                       f"{section_stats['misses']} re-analyzed")
+        flight_stats = single_flight.stats()
+        if flight_stats["coalesced"]:
+            st.caption(f"Coalesced {flight_stats['coalesced']} duplicate in-flight requests")
+        if API_URL:
+            st.caption(f"Backend: API service at {API_URL}")
+        session_storage = artifact_store.session_stats(artifact_session())
+        if session_storage["artifacts"]:
+            st.caption(f"Session storage: {session_storage['artifacts']} results, "
+                       f"{session_storage['bytes'] / 1024:.0f} KB ({session_storage['stored_bytes'] / 1024:.0f} KB compressed)")
+        model_stats = registry.stats()
+        st.caption(
+            f"Gemini: {model_stats['calls']} calls, {model_stats['models_created']} model objects built, "
+            f"{model_stats['model_reuses']} reused"
+            + (f", {model_stats['connection_reuses']} of {model_stats['http_requests']} requests on kept-alive "
+               "connections" if model_stats["http_requests"] else "")
+        )
+        schedule = scheduler.describe(MODEL_ID)
+        if schedule["state"] != "closed":
+            st.warning(f"Gemini is failing; new requests are paused (circuit {schedule['state'].replace('_', '-')}, "
+                       f"retry in {schedule['retry_in']:.0f}s)")
+        scheduler_stats = scheduler.stats()
+        if scheduler_stats["retries"] or scheduler_stats["throttled"]:
+            st.caption(f"Rate limits: {scheduler_stats['throttled']} throttled, {scheduler_stats['retries']} retried, "
+                       f"{scheduler_stats['wait_seconds']:.1f}s queued")
+        cascade = st.checkbox("Cascade mode", value=CASCADE_ENABLED, key="cascade_mode",
+                              help="Score relevance locally first: unrelated pairs get an instant verdict, borderline "
+                                   "ones a short prompt, and only promising ones the full analysis.")
+        if cascade:
+            tiers = cascade_stats.stats()
+            st.caption(f"Cascade (floor {tiers['floor']:.0f}, full from {tiers['full_threshold']:.0f}): "
+                       f"{tiers['screened_out']} screened out, {tiers['quick']} quick, {tiers['full']} full")
+        structured = st.checkbox("Structured analysis (JSON)", value=STRUCTURED_ANALYSIS, key="structured_mode",
+                                 help="Ask for a schema-validated JSON analysis instead of streaming a free-text report.")
+        incremental = st.checkbox("Incremental re-analysis", value=False, key="incremental_analysis",
+                                  help="Score boosted resumes section by section, re-analyzing only sections that changed. "
+                                       "The first boost analyzes every section of the original resume too.")
+        boost_variants = st.slider("Boost candidates", 1, len(BOOST_VARIANTS), 1,
+                                   help="Number of boost variants generated concurrently; the best-scoring one is kept.")
+        if st.checkbox("Show debug panel", value=os.environ.get("ATS_DEBUG_PANEL", "") == "1", key="show_debug"):
+            with st.expander("Recent requests", expanded=True):
+                render_debug_panel()
+    use_cache = not bypass_cache
 
     st.markdown('<div class="logo-text">Resume ATS Optimizer Pro</div>', unsafe_allow_html=True)
     st.markdown('<p style="text-align: center; margin-bottom: 3rem;">Boost your resume\'s chances of getting past Applicant Tracking Systems</p>', unsafe_allow_html=True)
     
-    tab1, tab2, tab3, tab4 = st.tabs(["📝 Upload & Analyze", "✏️ Custom Update", "🆕 Create New Resume", "📊 Results & Downloads"])
+    tab1, tab2, tab3, tab4, tab5 = st.tabs(["📝 Upload & Analyze", "✏️ Custom Update", "🆕 Create New Resume",
+                                            "📊 Results & Downloads", "🗂️ History"])
     
     with tab1:
         resume_text = ""
@@ -411,16 +1354,12 @@ def main():
                 resume_file = st.file_uploader("Choose your resume file", type=["pdf", "tex", "txt", "docx"], key="resume_uploader")
                 if resume_file is not None:
                     st.success(f"✅ Uploaded: {resume_file.name}")
-                    file_details = resume_file.name.lower()
-                    file_content = resume_file.read()
                     try:
-                        if file_details.endswith(".tex") or file_details.endswith(".txt"):
-                            resume_text = file_content.decode("utf-8")
-                        elif file_details.endswith(".pdf"):
-                            resume_text = extract_text_from_pdf(file_content)
-                        elif file_details.endswith(".docx"):
-                            resume_text = extract_text_from_docx(file_content)
-                        else:
+                        with span("file_read"):
+                            resume_file_bytes = resume_file.getvalue()
+                        resume_text = extract_uploaded_text(resume_file.name, resume_file_bytes)
+                        if resume_text is None:
+                            resume_text = ""
                             st.warning("Unsupported file type for resume")
                     except Exception as e:
                         st.error(f"Error processing file: {e}")
@@ -438,16 +1377,12 @@ def main():
                 jd_file = st.file_uploader("Choose job description file", type=["txt", "pdf", "docx"], key="jd_uploader")
                 if jd_file is not None:
                     st.success(f"✅ Uploaded: {jd_file.name}")
-                    jd_details = jd_file.name.lower()
-                    jd_file_content = jd_file.read()
                     try:
-                        if jd_details.endswith(".txt"):
-                            jd_text = jd_file_content.decode("utf-8")
-                        elif jd_details.endswith(".pdf"):
-                            jd_text = extract_text_from_pdf(jd_file_content)
-                        elif jd_details.endswith(".docx"):
-                            jd_text = extract_text_from_docx(jd_file_content)
-                        else:
+                        with span("file_read"):
+                            jd_file_bytes = jd_file.getvalue()
+                        jd_text = extract_uploaded_text(jd_file.name, jd_file_bytes)
+                        if jd_text is None:
+                            jd_text = ""
                             st.warning("Unsupported file type for job description")
                     except Exception as e:
                         st.error(f"Error processing file: {e}")
@@ -464,18 +1399,92 @@ def main():
         
         with st.container():
             st.markdown('<h3 class="section-title">Analyze Your Resume</h3>', unsafe_allow_html=True)
+            if resume_text and jd_text:
+                local_result = score_resume(resume_text, jd_text)
+                st.session_state.local_score = local_result
+                st.metric("Instant ATS Score (local)", f"{local_result['score']:.1f}")
+                with st.expander("Local score breakdown"):
+                    st.write(local_result["breakdown"])
+                    st.write("Keyword coverage by section:", local_result["sections"])
+                    if local_result["missing_keywords"]:
+                        st.write("Missing keywords: " + ", ".join(local_result["missing_keywords"]))
+                    if local_result["matched_skills"]:
+                        st.write("Matched skills: " + ", ".join(local_result["matched_skills"]))
+                    if local_result["missing_skills"]:
+                        st.write("Missing skills: " + ", ".join(local_result["missing_skills"]))
             analyze_col, boost_col = st.columns(2)
+            # Finished jobs are collected before the buttons are drawn so that,
+            # e.g., Boost is enabled as soon as an analysis result is available.
+            with st.container():
+                show_job("analyze", "Analysis", apply_analysis)
+                show_job("boost", "Boosted Resume", apply_boost)
+            if NEAR_DUP_MODE == "offer" and use_cache and resume_text and jd_text and "analyze" not in st.session_state.jobs:
+                match = near_duplicate_offer(resume_text, jd_text, "structured" if structured else "report")
+                prior = match and (match["result"]["report"] if structured else match["result"])
+                if prior and prior != get_artifact("analysis_report"):
+                    st.info(f"A resume {match['similarity']:.0%} similar to this one was already analyzed "
+                            "against this job description.")
+                    st.button("♻️ Use Previous Analysis", use_container_width=True,
+                              on_click=apply_analysis, args=(match["result"],))
             with analyze_col:
-                analyze_button = st.button("📊 Analyze Resume", use_container_width=True, disabled=not (resume_text and jd_text))
+                st.button("📊 Analyze Resume", use_container_width=True, disabled=not (resume_text and jd_text),
+                          on_click=start_job, args=("analyze", analyze_job, resume_text, jd_text),
+                          kwargs={"use_cache": use_cache, "structured": structured, "cascade": cascade})
+            # In cascade mode only pairs routed to the full analysis are boosted.
+            analysis_tier = st.session_state.analysis_tier
             with boost_col:
-                boost_button = st.button("🚀 Boost Resume", use_container_width=True, disabled=(st.session_state.analysis_report is None))
-            if analyze_button:
-                st.session_state.analysis_report = analyze_resume(resume_text, jd_text)
-                st.session_state.ats_score = extract_ats_score(st.session_state.analysis_report)
-            if boost_button:
-                st.session_state.boosted_resume = boost_resume_md(resume_text, jd_text, st.session_state.analysis_report)
-                boosted_analysis = analyze_resume(st.session_state.boosted_resume, jd_text)
-                st.session_state.boosted_ats_score = extract_ats_score(boosted_analysis)
+                st.button("🚀 Boost Resume", use_container_width=True,
+                          disabled=get_artifact("analysis_report") is None or analysis_tier not in (None, FULL),
+                          on_click=start_job,
+                          args=("boost", boost_job, resume_text, jd_text, get_artifact("analysis_report"),
+                                BOOST_VARIANTS[:boost_variants]),
+                          kwargs={"use_cache": use_cache, "incremental": incremental})
+            if analysis_tier not in (None, FULL):
+                st.caption(f"Cascade: this pair was routed to the {analysis_tier.replace('_', ' ')} tier, so it was not "
+                           "fully analyzed and cannot be boosted. Turn off cascade mode for a full analysis.")
+    
+        with st.container():
+            st.markdown('<h3 class="section-title">Match Against Multiple Job Descriptions</h3>', unsafe_allow_html=True)
+            multi_jd_files = st.file_uploader("Choose job description files", type=["txt", "pdf", "docx"],
+                                              accept_multiple_files=True, key="multi_jd_uploader")
+            multi_jd_input = st.text_area("Or, paste several job descriptions separated by a line containing only ---",
+                                          height=150, key="multi_jd_text")
+            jds = collect_job_descriptions(multi_jd_files, multi_jd_input)
+            max_analyzed = 0
+            if len(jds) > 2:
+                max_analyzed = st.slider("Analyze only the best matches by skill overlap (0 = all)",
+                                         0, len(jds), min(MAX_ANALYZED, len(jds)), key="multi_jd_max_analyzed")
+            show_job("multi_jd", "Job Description Ranking", apply_multi_jd)
+            st.button(f"🎯 Rank {len(jds)} Job Descriptions" if jds else "🎯 Rank Job Descriptions",
+                      use_container_width=True, disabled=not (resume_text and jds),
+                      on_click=start_job, args=("multi_jd", multi_jd_job, resume_text, jds),
+                      kwargs={"use_cache": use_cache, "max_analyzed": max_analyzed})
+            multi_jd_result = st.session_state.get("multi_jd_result")
+            if multi_jd_result and "multi_jd" not in st.session_state.jobs:
+                st.dataframe(
+                    [{
+                        "Rank": row["rank"],
+                        "Job": row["title"],
+                        "ATS Score": row["ats_score"],
+                        "Local Score": row["local_score"],
+                        "Skill Overlap": f"{row['skill_overlap']:.0%}",
+                        "Missing Skills": row["missing_skills"],
+                        "Missing": row["missing"],
+                        "Summary": row["summary"],
+                    } for row in multi_jd_result["rows"]],
+                    hide_index=True,
+                    use_container_width=True,
+                )
+                for row in multi_jd_result["rows"]:
+                    if row.get("error"):
+                        st.warning(f"{row['title']} could not be analyzed: {row['error']}")
+                st.caption(
+                    f"{len(multi_jd_result['rows'])} job descriptions analyzed in {multi_jd_result['prompts']} prompts "
+                    f"({multi_jd_result['fallbacks']} single-JD fallbacks), ~{multi_jd_result['tokens_batched']} input "
+                    f"tokens instead of ~{multi_jd_result['tokens_separate']} one at a time"
+                    + (f"; {multi_jd_result['prefiltered']} ranked locally by skill overlap"
+                       if multi_jd_result.get("prefiltered") else "")
+                )
     
     with tab2:
         st.markdown('<h3 class="section-title">Custom Update Your Resume</h3>', unsafe_allow_html=True)
@@ -483,16 +1492,12 @@ def main():
         uploaded_file = st.file_uploader("Upload your resume for custom update", type=["pdf", "tex", "txt", "docx"], key="custom_resume")
         if uploaded_file is not None:
             st.success(f"✅ Uploaded: {uploaded_file.name}")
-            details = uploaded_file.name.lower()
-            content = uploaded_file.read()
             try:
-                if details.endswith(".tex") or details.endswith(".txt"):
-                    custom_resume_text = content.decode("utf-8")
-                elif details.endswith(".pdf"):
-                    custom_resume_text = extract_text_from_pdf(content)
-                elif details.endswith(".docx"):
-                    custom_resume_text = extract_text_from_docx(content)
-                else:
+                with span("file_read"):
+                    uploaded_file_bytes = uploaded_file.getvalue()
+                custom_resume_text = extract_uploaded_text(uploaded_file.name, uploaded_file_bytes)
+                if custom_resume_text is None:
+                    custom_resume_text = ""
                     st.warning("Unsupported file type")
             except Exception as e:
                 st.error(f"Error processing file: {e}")
@@ -504,13 +1509,16 @@ def main():
                                      height=150)
         if st.button("Apply Custom Update"):
             if custom_resume_text and custom_prompt.strip():
-                st.session_state.custom_updated_resume = custom_update_resume(custom_resume_text, custom_prompt)
+                start_job("custom_update", custom_update_job, custom_resume_text, custom_prompt, use_cache=use_cache)
             else:
                 st.error("Please upload a resume and enter update instructions.")
+        show_job("custom_update", "Custom Update", apply_custom_update)
         
-        if st.session_state.get("custom_updated_resume"):
+        updated_resume = get_artifact("custom_updated_resume")
+        if updated_resume and "custom_update" not in st.session_state.jobs:
             st.markdown("### Custom Updated Resume")
-            st.markdown(st.session_state.custom_updated_resume)
+            st.markdown(updated_resume)
+            render_download_buttons("Updated Resume", updated_resume, "updated_resume")
     
     with tab3:
         st.markdown('<h3 class="section-title">Create a New Resume from Scratch</h3>', unsafe_allow_html=True)
@@ -548,14 +1556,17 @@ def main():
                         "achievements": achievements,
                         "hobbies": hobbies,
                     }
-                    st.session_state.new_resume = create_resume_from_form(form_data)
+                    start_job("create", create_job, form_data, use_cache=use_cache)
+        show_job("create", "New Resume", apply_new_resume)
         
-        if st.session_state.get("new_resume"):
+        new_resume = get_artifact("new_resume")
+        if new_resume and "create" not in st.session_state.jobs:
             st.markdown("### Newly Created Resume")
-            st.markdown(st.session_state.new_resume)
+            st.markdown(new_resume)
+            render_download_buttons("New Resume", new_resume, "new_resume")
     
     with tab4:
-        if st.session_state.get('analysis_report') is not None:
+        if get_artifact("analysis_report") is not None:
             with st.container():
                 st.markdown('<h3 class="section-title">Analysis Results</h3>', unsafe_allow_html=True)
                 score = st.session_state.ats_score
@@ -572,16 +1583,19 @@ def main():
                 )
                 with st.expander("📋 View Detailed Analysis Report", expanded=True):
                     st.markdown('<div class="results-container">', unsafe_allow_html=True)
-                    formatted_report = st.session_state.analysis_report.replace("ATS Score :", "").replace("Detailed Report:", "**Detailed Report:**")
-                    st.markdown(formatted_report)
+                    structured_analysis = st.session_state.get("structured_analysis")
+                    if structured_analysis:
+                        render_structured_analysis(structured_analysis)
+                    else:
+                        st.markdown(format_report(get_artifact("analysis_report")))
                     st.markdown('</div>', unsafe_allow_html=True)
             
-            if st.session_state.get('boosted_resume') is not None:
+            if get_artifact("boosted_resume") is not None:
                 with st.container():
                     st.markdown('<h3 class="section-title">Optimized Resume</h3>', unsafe_allow_html=True)
                     with st.expander("📝 View Optimized Resume", expanded=True):
                         st.markdown('<div class="results-container">', unsafe_allow_html=True)
-                        st.markdown(st.session_state.boosted_resume)
+                        st.markdown(get_artifact("boosted_resume"))
                         st.markdown('</div>', unsafe_allow_html=True)
                 with st.container():
                     boosted_score = st.session_state.boosted_ats_score
@@ -596,60 +1610,94 @@ def main():
                         ''', 
                         unsafe_allow_html=True
                     )
+                    score_before = st.session_state.boosted_ats_score_before
+                    if score_before is not None:
+                        st.metric("ATS Score (before → after)", f"{boosted_score:.1f}",
+                                  delta=f"{boosted_score - score_before:+.1f}")
+                    local_before = st.session_state.get("local_score")
+                    local_after = st.session_state.get("boosted_local_score")
+                    if local_before and local_after:
+                        st.metric(
+                            "Local ATS Score (before → after)",
+                            f"{local_after['score']:.1f}",
+                            delta=f"{local_after['score'] - local_before['score']:+.1f}",
+                        )
             
-            if st.session_state.get("custom_updated_resume"):
+            if get_artifact("custom_updated_resume"):
                 with st.container():
                     st.markdown('<h3 class="section-title">Custom Updated Resume</h3>', unsafe_allow_html=True)
                     with st.expander("📝 View Custom Updated Resume", expanded=True):
                         st.markdown('<div class="results-container">', unsafe_allow_html=True)
-                        st.markdown(st.session_state.custom_updated_resume)
+                        st.markdown(get_artifact("custom_updated_resume"))
                         st.markdown('</div>', unsafe_allow_html=True)
             
-            if st.session_state.get("new_resume"):
+            if get_artifact("new_resume"):
                 with st.container():
                     st.markdown('<h3 class="section-title">Newly Created Resume</h3>', unsafe_allow_html=True)
                     with st.expander("📝 View Newly Created Resume", expanded=True):
                         st.markdown('<div class="results-container">', unsafe_allow_html=True)
-                        st.markdown(st.session_state.new_resume)
+                        st.markdown(get_artifact("new_resume"))
                         st.markdown('</div>', unsafe_allow_html=True)
             
             with st.container():
                 st.markdown('<h3 class="section-title">Download Options</h3>', unsafe_allow_html=True)
-                col1, col2 = st.columns(2)
-                with col1:
-                    if st.session_state.get("boosted_resume"):
-                        boosted_html = markdown.markdown(st.session_state.boosted_resume)
-                        st.download_button(
-                            "📥 Download Optimized Resume as Markdown", 
-                            data=st.session_state.boosted_resume, 
-                            file_name="optimized_resume.md", 
-                            mime="text/markdown",
-                            use_container_width=True
-                        )
-                        st.download_button(
-                            "📥 Download Optimized Resume as HTML", 
-                            data=boosted_html, 
-                            file_name="optimized_resume.html", 
-                            mime="text/html",
-                            use_container_width=True
-                        )
-                with col2:
-                    if st.session_state.get("boosted_resume"):
-                        try:
-                            docx_resume = generate_docx_from_markdown(st.session_state.boosted_resume)
-                            st.download_button(
-                                "📥 Download Optimized Resume as Word Document", 
-                                data=docx_resume, 
-                                file_name="optimized_resume.docx", 
-                                mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
-                                use_container_width=True
-                            )
-                        except Exception as e:
-                            st.error(f"Conversion to Word failed: {e}")
-                    st.info("To save as PDF: Use your browser's print functionality and select 'Save as PDF'")
+                boosted_resume = get_artifact("boosted_resume")
+                if boosted_resume:
+                    render_download_buttons("Optimized Resume", boosted_resume, "optimized_resume")
+                st.info("To save as PDF: Use your browser's print functionality and select 'Save as PDF'")
         else:
             st.info("No analysis results yet. Please go to 'Upload & Analyze' tab and analyze your resume first.")
 
+    with tab5:
+        st.markdown('<h3 class="section-title">Analysis History</h3>', unsafe_allow_html=True)
+        store = get_history_store()
+        if store is None:
+            st.info("History is disabled (ATS_HISTORY_DISABLED).")
+        else:
+            requisitions = store.requisitions()
+            filter_cols = st.columns(4)
+            with filter_cols[0]:
+                candidate = st.text_input("Candidate", key="history_candidate").strip() or None
+            with filter_cols[1]:
+                requisition = st.selectbox(
+                    "Job description", [None] + requisitions, key="history_requisition",
+                    format_func=lambda r: "All" if r is None else f"{r['jd_title'] or r['jd_hash'][:8]} ({r['records']})",
+                )
+            with filter_cols[2]:
+                kind = st.selectbox("Type", [None] + list(HISTORY_KINDS), key="history_kind",
+                                    format_func=lambda k: "All" if k is None else k.replace("_", " "))
+            with filter_cols[3]:
+                min_score, max_score = st.slider("ATS score", 0, 100, (0, 100), key="history_scores")
+            filters = {
+                "candidate": candidate,
+                "jd_hash": requisition["jd_hash"] if requisition else None,
+                "kind": kind,
+                "min_score": min_score if min_score > 0 else None,
+                "max_score": max_score if max_score < 100 else None,
+            }
+            rows = history_page(filters)
+            if rows:
+                restore_col, button_col = st.columns([3, 1])
+                with restore_col:
+                    st.selectbox("Restore a result into this session", [row["id"] for row in rows],
+                                             key="history_restore_id")
+                with button_col:
+                    # The callback reads the selection when clicked, not when the button was drawn.
+                    st.button("↩️ Restore", use_container_width=True, key="history_restore",
+                              on_click=lambda: apply_history_record(st.session_state.history_restore_id))
+            if requisition:
+                st.markdown("**Top candidates for this job description**")
+                st.dataframe(
+                    [{
+                        "Candidate": row["candidate"],
+                        "ATS Score": row["ats_score"],
+                        "Local Score": row["local_score"],
+                        "Recorded": time.strftime("%Y-%m-%d %H:%M", time.localtime(row["created_at"])),
+                    } for row in store.top_for_jd(requisition["jd_hash"], n=10)],
+                    hide_index=True,
+                    use_container_width=True,
+                )
+
     def load_image_as_base64(file_path: str) -> str:
         try:
             with open(file_path, "rb") as file:
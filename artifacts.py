@@ -0,0 +1,347 @@
+"""
+Shared, compressed storage for large session artifacts.
+
+Every Streamlit session used to keep its reports and resume variants as
+plain strings in ``st.session_state``, so memory grew with the number of
+sessions until the pod ran out. Large values now go into one process-wide
+``ArtifactStore`` and the session keeps only an ``ArtifactRef``.
+
+- Artifacts are keyed by content hash, so identical results in different
+  sessions are stored once.
+- They are compressed at rest with zlib, or with zstd when
+  ATS_ARTIFACT_CODEC=zstd and the zstandard package is installed.
+- Compressed bytes held in memory are capped at ATS_ARTIFACT_MEMORY_BYTES.
+  Past that, the least recently used artifacts spill to disk and are loaded
+  back when next read.
+- A session that has not been seen for ATS_ARTIFACT_SESSION_IDLE seconds
+  releases its artifacts, unless ``is_live`` reports it still connected.
+  Artifacts no session references are deleted.
+
+Only results are stored here. Uploaded documents' extracted text is not
+kept in the session (it comes from the bounded extraction cache on each
+rerun), and background job results stay in the job manager until
+collected or expired (ATS_JOB_TTL).
+"""
+import atexit
+import hashlib
+import os
+import shutil
+import threading
+import time
+import zlib
+from collections import Counter, OrderedDict, namedtuple
+
+from extraction import optional_import
+from telemetry import increment
+
+MEMORY_BYTES = int(os.environ.get("ATS_ARTIFACT_MEMORY_BYTES", 256 * 1024 * 1024))
+# Values smaller than this stay inline in the session; a reference would not save anything.
+MIN_BYTES = int(os.environ.get("ATS_ARTIFACT_MIN_BYTES", 1024))
+SESSION_IDLE = float(os.environ.get("ATS_ARTIFACT_SESSION_IDLE", 3600))
+SPILL_DIR = os.environ.get("ATS_ARTIFACT_SPILL_DIR", os.path.join(".ats_cache", "artifacts"))
+CODEC = os.environ.get("ATS_ARTIFACT_CODEC", "zlib").lower()
+ZLIB_LEVEL = 6
+# Idle sessions are looked for at most this often (seconds).
+SWEEP_INTERVAL = 30.0
+
+ArtifactRef = namedtuple("ArtifactRef", "key size")
+
+
+def _codec():
+    if CODEC == "zstd" and optional_import("zstandard") is not None:
+        return "zstd"
+    return "zlib"
+
+
+def compress(data, codec):
+    if codec == "zstd":
+        return optional_import("zstandard").ZstdCompressor().compress(data)
+    return zlib.compress(data, ZLIB_LEVEL)
+
+
+def decompress(data, codec):
+    if codec == "zstd":
+        return optional_import("zstandard").ZstdDecompressor().decompress(data)
+    return zlib.decompress(data)
+
+
+class _Artifact:
+    __slots__ = ("codec", "is_text", "size", "stored_size", "data", "path", "sessions")
+
+    def __init__(self, codec, is_text, size, data):
+        self.codec = codec
+        self.is_text = is_text
+        self.size = size
+        self.stored_size = len(data)
+        # Compressed bytes while in memory, None once spilled to ``path``.
+        self.data = data
+        self.path = None
+        self.sessions = Counter()
+
+
+class ArtifactStore:
+    """
+    Content-addressed, compressed artifacts shared by all sessions, with a
+    memory budget, LRU spill to disk and idle-session eviction.
+    """
+
+    def __init__(self, memory_bytes=MEMORY_BYTES, spill_dir=SPILL_DIR, session_idle=SESSION_IDLE,
+                 min_bytes=MIN_BYTES, is_live=None):
+        self.memory_bytes = memory_bytes
+        # Per-process directory, so several app processes can share the spill location.
+        self.spill_dir = os.path.join(spill_dir, str(os.getpid())) if spill_dir else None
+        self.session_idle = session_idle
+        self.min_bytes = min_bytes
+        # Optional ``is_live(session)`` callback; live sessions are never evicted as idle.
+        self.is_live = is_live
+        self.codec = _codec()
+        self.spills = 0
+        self.loads = 0
+        self.evicted_sessions = 0
+        self._artifacts = OrderedDict()
+        self._sessions = {}
+        self._memory = 0
+        self._disk = 0
+        self._last_sweep = time.monotonic()
+        self._lock = threading.Lock()
+
+    def put(self, value, session):
+        """
+        Store ``value`` (str or bytes) for ``session`` and return an ArtifactRef,
+        or ``value`` itself when it is None or too small to be worth storing.
+        """
+        if value is None:
+            return None
+        is_text = isinstance(value, str)
+        data = value.encode("utf-8") if is_text else bytes(value)
+        if len(data) < self.min_bytes:
+            return value
+        key = hashlib.sha256((b"t" if is_text else b"b") + data).hexdigest()
+        with self._lock:
+            known = key in self._artifacts
+        # Compression runs outside the lock; a known artifact is not compressed again.
+        compressed = None if known else compress(data, self.codec)
+        with self._lock:
+            artifact = self._artifacts.get(key)
+            if artifact is None:
+                if compressed is None:
+                    # Deleted since the check above.
+                    compressed = compress(data, self.codec)
+                artifact = self._artifacts[key] = _Artifact(self.codec, is_text, len(data), compressed)
+                self._memory += artifact.stored_size
+            else:
+                self._artifacts.move_to_end(key)
+            artifact.sessions[session] += 1
+            self._sessions.setdefault(session, {"seen": time.monotonic(), "keys": Counter()})["keys"][key] += 1
+            spill = self._over_budget()
+        self._spill(spill)
+        self._maybe_sweep()
+        return ArtifactRef(key, len(data))
+
+    def get(self, ref):
+        """
+        Return the value behind ``ref``; anything that is not an ArtifactRef is
+        returned as is. Returns None if the artifact has been evicted.
+        """
+        if not isinstance(ref, ArtifactRef):
+            return ref
+        with self._lock:
+            artifact = self._artifacts.get(ref.key)
+            if artifact is None:
+                increment("artifact_misses_total")
+                return None
+            self._artifacts.move_to_end(ref.key)
+            data, path, codec = artifact.data, artifact.path, artifact.codec
+        if data is None:
+            data = self._load(ref.key, path)
+            if data is None:
+                return None
+        raw = decompress(data, codec)
+        return raw.decode("utf-8") if artifact.is_text else raw
+
+    def release(self, ref, session):
+        """
+        Drop ``session``'s reference to ``ref``, deleting the artifact if no session needs it.
+        """
+        if not isinstance(ref, ArtifactRef):
+            return
+        with self._lock:
+            state = self._sessions.get(session)
+            if state is None or not state["keys"][ref.key]:
+                return
+            state["keys"][ref.key] -= 1
+            if not state["keys"][ref.key]:
+                del state["keys"][ref.key]
+            paths = self._unreference(ref.key, session)
+        self._remove_files(paths)
+
+    def touch(self, session):
+        """
+        Mark ``session`` as active so its artifacts are not evicted as idle.
+        """
+        with self._lock:
+            self._sessions.setdefault(session, {"seen": 0.0, "keys": Counter()})["seen"] = time.monotonic()
+        self._maybe_sweep()
+
+    def drop_session(self, session):
+        with self._lock:
+            paths = self._drop_session(session)
+        self._remove_files(paths)
+
+    def _drop_session(self, session):
+        # Called with the lock held; returns spill files to delete.
+        state = self._sessions.pop(session, None)
+        paths = []
+        if state is not None:
+            for key, count in state["keys"].items():
+                for _ in range(count):
+                    paths += self._unreference(key, session)
+        return paths
+
+    def _unreference(self, key, session):
+        # Called with the lock held; returns the spill file to delete, if any.
+        artifact = self._artifacts.get(key)
+        if artifact is None:
+            return []
+        artifact.sessions[session] -= 1
+        if artifact.sessions[session] <= 0:
+            del artifact.sessions[session]
+        if artifact.sessions:
+            return []
+        del self._artifacts[key]
+        if artifact.data is not None:
+            self._memory -= artifact.stored_size
+        if artifact.path is not None:
+            self._disk -= artifact.stored_size
+            return [artifact.path]
+        return []
+
+    def _maybe_sweep(self):
+        now = time.monotonic()
+        if now - self._last_sweep < SWEEP_INTERVAL:
+            return
+        self._last_sweep = now
+        self.evict_idle(now)
+
+    def evict_idle(self, now=None):
+        """
+        Release the artifacts of sessions idle for longer than ``session_idle``
+        that ``is_live`` does not report as live. Returns the number of
+        sessions evicted.
+        """
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            idle = [session for session, state in self._sessions.items() if now - state["seen"] > self.session_idle]
+        if self.is_live is not None:
+            idle = [session for session in idle if not self.is_live(session)]
+        with self._lock:
+            # Sessions touched while liveness was checked are kept.
+            idle = [session for session in idle
+                    if session in self._sessions and now - self._sessions[session]["seen"] > self.session_idle]
+            paths = []
+            for session in idle:
+                paths += self._drop_session(session)
+            self.evicted_sessions += len(idle)
+        if idle:
+            increment("artifact_sessions_evicted_total", len(idle))
+        self._remove_files(paths)
+        return len(idle)
+
+    def _over_budget(self):
+        # Called with the lock held; picks least recently used in-memory artifacts to spill.
+        if self.spill_dir is None or self._memory <= self.memory_bytes:
+            return []
+        picked, freed = [], 0
+        for key, artifact in self._artifacts.items():
+            if self._memory - freed <= self.memory_bytes:
+                break
+            if artifact.data is not None:
+                picked.append((key, artifact, artifact.data))
+                freed += artifact.stored_size
+        return picked
+
+    def _spill(self, picked):
+        for key, artifact, data in picked:
+            path = artifact.path or os.path.join(self.spill_dir, key[:2], key)
+            if artifact.path is None:
+                try:
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    with open(path, "wb") as f:
+                        f.write(data)
+                except OSError:
+                    # Stays in memory; the budget is exceeded rather than losing the artifact.
+                    increment("artifact_spill_errors_total")
+                    continue
+            with self._lock:
+                if self._artifacts.get(key) is not artifact or artifact.data is None:
+                    continue
+                if artifact.path is None:
+                    artifact.path = path
+                    self._disk += artifact.stored_size
+                artifact.data = None
+                self._memory -= artifact.stored_size
+                self.spills += 1
+        if picked:
+            increment("artifact_spills_total", len(picked))
+
+    def _load(self, key, path):
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError:
+            return None
+        with self._lock:
+            artifact = self._artifacts.get(key)
+            if artifact is not None and artifact.data is None:
+                # Back in memory as the most recently used; its spill file is kept for the next spill.
+                artifact.data = data
+                self._memory += artifact.stored_size
+                self.loads += 1
+            spill = self._over_budget()
+        self._spill(spill)
+        return data
+
+    def _remove_files(self, paths):
+        for path in paths:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def session_stats(self, session):
+        """
+        Footprint of one session: its artifacts, their original size and their stored (compressed) size.
+        """
+        with self._lock:
+            state = self._sessions.get(session)
+            keys = list(state["keys"]) if state else []
+            artifacts = [self._artifacts[key] for key in keys if key in self._artifacts]
+            return {
+                "artifacts": len(artifacts),
+                "bytes": sum(artifact.size for artifact in artifacts),
+                "stored_bytes": sum(artifact.stored_size for artifact in artifacts),
+            }
+
+    def stats(self):
+        with self._lock:
+            raw = sum(artifact.size for artifact in self._artifacts.values())
+            stored = sum(artifact.stored_size for artifact in self._artifacts.values())
+            return {
+                "artifacts": len(self._artifacts),
+                "sessions": len(self._sessions),
+                "bytes": raw,
+                "memory_bytes": self._memory,
+                "disk_bytes": self._disk,
+                "compression_ratio": round(raw / stored, 2) if stored else 0.0,
+                "spills": self.spills,
+                "loads": self.loads,
+                "evicted_sessions": self.evicted_sessions,
+            }
+
+    def close(self):
+        if self.spill_dir:
+            shutil.rmtree(self.spill_dir, ignore_errors=True)
+
+
+artifact_store = ArtifactStore()
+atexit.register(artifact_store.close)
@@ -0,0 +1,320 @@
+"""
+Headless batch scoring: analyze N resumes against M job descriptions.
+
+Usage:
+    python batch.py --resumes resumes/ --jds jds/ --out results.jsonl [--boost]
+
+``--resumes`` and ``--jds`` accept a directory of PDF/DOCX/TXT/TEX files or
+a manifest: a text file with one path per line, or a JSONL file of
+``{"id": ..., "path": ...}`` / ``{"id": ..., "text": ...}`` records.
+Every resume/JD pair is analyzed on a bounded worker pool and written to
+the output JSONL as soon as it completes. Pairs already recorded as "ok"
+in the output file are skipped, so an interrupted run can be resumed by
+running the same command again.
+
+With ``--dedupe``, resumes are first grouped into near-duplicate clusters
+(MinHash/LSH, see ``near_duplicates.py``). Only the first resume of each
+cluster is analyzed. Its results are copied to the other members with a
+``duplicate_of`` field. A member whose representative fails is analyzed
+on its own.
+
+With ``--cascade``, each pair's local relevance decides how much model work
+it gets (see ``cascade.py``). Unrelated pairs are screened out without a
+model call and borderline ones get a short prompt. Only relevant pairs get
+the full analysis and, with ``--boost``, the boost. Every record carries its
+``tier`` and ``relevance``.
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from app import MODEL_ID, analyze_resume, analyze_resume_cascade, boost_resume_md, extract_ats_score
+from cascade import FULL, TIERS
+from extraction import extract_docx_text, extract_pdf_text
+from history import record as record_history
+from near_duplicates import duplicate_clusters
+from scheduler import BATCH, lane
+from scoring import score_resume
+
+SUPPORTED_EXTENSIONS = (".pdf", ".docx", ".txt", ".tex")
+# Extra pool threads for workers stuck on timed-out pairs, which cannot be interrupted.
+STUCK_HEADROOM = 4
+
+
+def read_document(path):
+    """
+    Extract the text of a document on disk, raising on unsupported or unreadable files.
+    """
+    lower = path.lower()
+    if lower.endswith(".pdf"):
+        return extract_pdf_text(path, on_truncate=lambda pages: print(
+            f"warning: only the first {pages} pages of {path} were read", file=sys.stderr))
+    if lower.endswith(".docx"):
+        return extract_docx_text(path)
+    if lower.endswith(".txt") or lower.endswith(".tex"):
+        with open(path, "r", encoding="utf-8") as f:
+            return f.read()
+    raise ValueError(f"Unsupported file type: {path}")
+
+
+def load_sources(source):
+    """
+    Return a list of ``{"id", "path"}`` or ``{"id", "text"}`` records from a
+    directory or manifest file.
+    """
+    if os.path.isdir(source):
+        return [
+            {"id": name, "path": os.path.join(source, name)}
+            for name in sorted(os.listdir(source))
+            if name.lower().endswith(SUPPORTED_EXTENSIONS)
+        ]
+    base = os.path.dirname(os.path.abspath(source))
+    records = []
+    with open(source, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            if source.lower().endswith(".jsonl"):
+                record = json.loads(line)
+            else:
+                record = {"id": line, "path": line}
+            if "path" in record and not os.path.isabs(record["path"]):
+                record["path"] = os.path.join(base, record["path"])
+            record.setdefault("id", record.get("path"))
+            records.append(record)
+    return records
+
+
+def load_checkpoint(out_path):
+    """
+    Return the set of (resume_id, jd_id) pairs already completed successfully.
+    """
+    done = set()
+    if not os.path.exists(out_path):
+        return done
+    with open(out_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # A partially written last line from an interrupted run.
+                continue
+            if record.get("status") == "ok":
+                done.add((record["resume"], record["jd"]))
+    return done
+
+
+def extract_all(records, pool):
+    """
+    Extract every record's text on the pool. Returns ``(texts, errors)`` keyed by id.
+    """
+    texts, errors = {}, {}
+    futures = {}
+    for record in records:
+        if "text" in record:
+            texts[record["id"]] = record["text"]
+        else:
+            futures[pool.submit(read_document, record["path"])] = record["id"]
+    for future, record_id in futures.items():
+        try:
+            texts[record_id] = future.result()
+        except Exception as e:
+            errors[record_id] = f"Extraction failed: {e}"
+    return texts, errors
+
+
+def process_pair(resume_text, jd_text, boost, use_cache, cascade=False):
+    if cascade:
+        # Only pairs the cascade routes to the full analysis are boosted.
+        routed = analyze_resume_cascade(resume_text, jd_text, use_cache=use_cache)
+        result = {"local_score": routed["local_score"], "tier": routed["tier"], "relevance": routed["relevance"],
+                  "ats_score": routed["ats_score"]}
+        analysis = routed["report"]
+        boost = boost and routed["tier"] == FULL
+    else:
+        result = {"local_score": score_resume(resume_text, jd_text)["score"]}
+        analysis = analyze_resume(resume_text, jd_text, use_cache=use_cache)
+        result["ats_score"] = extract_ats_score(analysis)
+    result["analysis"] = analysis
+    if boost:
+        boosted = boost_resume_md(resume_text, jd_text, analysis, use_cache=use_cache)
+        boosted_analysis = analyze_resume(boosted, jd_text, use_cache=use_cache)
+        result["boosted_resume"] = boosted
+        result["boosted_ats_score"] = extract_ats_score(boosted_analysis)
+        result["boosted_local_score"] = score_resume(boosted, jd_text)["score"]
+    return result
+
+
+def run_batch(resumes, jds, out_path, workers=4, timeout=300.0, boost=False, use_cache=True, dedupe=False,
+              cascade=False, headroom=STUCK_HEADROOM, log=sys.stderr):
+    """
+    Analyze every resume/JD pair, appending one JSON line per pair to ``out_path``.
+    With ``dedupe``, near-duplicate resumes reuse the results of their cluster's
+    first resume. With ``cascade``, pairs are routed through the scoring cascade
+    and the summary counts them per tier. The pool has ``headroom`` threads
+    beyond ``workers`` for workers stuck on timed-out pairs; once every thread
+    is stuck, the remaining pairs are recorded as errors. Returns a summary
+    dict of counts.
+    """
+    done = load_checkpoint(out_path)
+    pairs = [(r["id"], j["id"]) for r in resumes for j in jds if (r["id"], j["id"]) not in done]
+    summary = {"total": len(resumes) * len(jds), "skipped": len(resumes) * len(jds) - len(pairs),
+               "ok": 0, "error": 0, "timeout": 0, "deduplicated": 0}
+    if cascade:
+        summary["tiers"] = {tier: 0 for tier in TIERS}
+    if not pairs:
+        return summary
+
+    pool = ThreadPoolExecutor(max_workers=workers + headroom)
+    texts, extraction_errors = extract_all(resumes + jds, pool)
+    started = {}
+    started_lock = threading.Lock()
+    duplicate_of = {}
+    if dedupe:
+        clusters = duplicate_clusters({r["id"]: texts[r["id"]] for r in resumes if r["id"] in texts})
+        for members in clusters:
+            print(f"near-duplicate resumes: {', '.join(map(str, members))}", file=log)
+            duplicate_of.update((member, members[0]) for member in members[1:])
+        summary["duplicate_clusters"] = len(clusters)
+    representatives = set(duplicate_of.values())
+    scheduled = set(pairs)
+    # Results of representative pairs, and the duplicate pairs waiting for them.
+    representative_results = {}
+    waiting = {}
+
+    def task(pair):
+        with started_lock:
+            started[pair] = time.monotonic()
+        # Batch calls yield Gemini quota to interactive UI calls sharing the process.
+        with lane(BATCH):
+            result = process_pair(texts[pair[0]], texts[pair[1]], boost, use_cache, cascade)
+        # Batch results also land in the history store, ranked with the interactive ones.
+        record_history("analysis", result["analysis"], resume_text=texts[pair[0]], jd_text=texts[pair[1]],
+                       candidate=str(pair[0]), ats_score=result["ats_score"], local_score=result["local_score"],
+                       model_id=MODEL_ID, latency=time.monotonic() - started[pair])
+        return result
+
+    with open(out_path, "a", encoding="utf-8") as out:
+        def emit(pair, status, **fields):
+            record = {"resume": pair[0], "jd": pair[1], "status": status}
+            record.update(fields)
+            out.write(json.dumps(record) + "\n")
+            out.flush()
+            summary[status] += 1
+            if "duplicate_of" in fields:
+                summary["deduplicated"] += 1
+            if "tier" in fields:
+                summary["tiers"][fields["tier"]] += 1
+            print(f"[{sum(summary[s] for s in ('ok', 'error', 'timeout'))}/{len(pairs)}] "
+                  f"{pair[0]} x {pair[1]}: {status}", file=log)
+
+        pending = deque(pairs)
+        in_flight = {}
+        # Timed-out pairs whose threads are still running; they hold pool threads until they return.
+        stuck = set()
+
+        def capacity():
+            stuck.difference_update([future for future in stuck if future.done()])
+            return min(workers, workers + headroom - len(stuck))
+
+        def settle(pair, result=None):
+            # Copy a representative's result to its duplicates, or queue them on their own if it failed.
+            if pair[0] not in representatives:
+                return
+            duplicates = waiting.pop(pair, [])
+            if result is None:
+                representative_results[pair] = None
+                pending.extendleft(reversed(duplicates))
+                return
+            representative_results[pair] = result
+            for duplicate in duplicates:
+                emit(duplicate, "ok", elapsed=0.0, duplicate_of=pair[0], **result)
+
+        def fill():
+            # Keep at most `workers` pairs queued so per-pair deadlines start close to submission.
+            while pending and len(in_flight) < capacity():
+                pair = pending.popleft()
+                error = extraction_errors.get(pair[0]) or extraction_errors.get(pair[1])
+                if error:
+                    emit(pair, "error", error=error)
+                    settle(pair)
+                    continue
+                representative = (duplicate_of.get(pair[0]), pair[1])
+                if representative[0] is not None and representative in scheduled:
+                    if representative not in representative_results:
+                        waiting.setdefault(representative, []).append(pair)
+                        continue
+                    result = representative_results[representative]
+                    if result is not None:
+                        emit(pair, "ok", elapsed=0.0, duplicate_of=representative[0], **result)
+                        continue
+                in_flight[pool.submit(task, pair)] = pair
+
+        fill()
+        while in_flight:
+            finished, _ = wait(list(in_flight), timeout=1.0, return_when=FIRST_COMPLETED)
+            for future in finished:
+                pair = in_flight.pop(future)
+                elapsed = round(time.monotonic() - started.get(pair, time.monotonic()), 3)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    emit(pair, "error", elapsed=elapsed, error=str(e))
+                    settle(pair)
+                else:
+                    emit(pair, "ok", elapsed=elapsed, **result)
+                    settle(pair, result)
+            now = time.monotonic()
+            for future, pair in list(in_flight.items()):
+                start = started.get(pair)
+                if start is not None and now - start > timeout:
+                    # The worker thread cannot be interrupted; its late result is discarded.
+                    if not future.cancel():
+                        stuck.add(future)
+                    del in_flight[future]
+                    emit(pair, "timeout", elapsed=round(now - start, 3), error=f"Timed out after {timeout}s")
+                    settle(pair)
+            fill()
+            if not in_flight:
+                # Every pool thread is stuck; the remaining pairs are left for a later run.
+                while pending:
+                    pair = pending.popleft()
+                    emit(pair, "error", error=f"Aborted: all {workers + headroom} workers are stuck on "
+                                              "timed-out pairs")
+                    settle(pair)
+    pool.shutdown(wait=False, cancel_futures=True)
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score resumes against job descriptions in batch.")
+    parser.add_argument("--resumes", required=True, help="Directory or manifest of resumes")
+    parser.add_argument("--jds", required=True, help="Directory or manifest of job descriptions")
+    parser.add_argument("--out", required=True, help="Output JSONL file (also used as checkpoint)")
+    parser.add_argument("--workers", type=int, default=4, help="Number of concurrent pairs")
+    parser.add_argument("--timeout", type=float, default=300.0, help="Per-pair timeout in seconds")
+    parser.add_argument("--boost", action="store_true", help="Also boost each resume and re-score it")
+    parser.add_argument("--no-cache", action="store_true", help="Bypass the LLM response cache")
+    parser.add_argument("--cascade", action="store_true",
+                        help="Screen pairs locally first; only relevant ones get the full analysis and boost")
+    parser.add_argument("--dedupe", action="store_true",
+                        help="Analyze one resume per near-duplicate cluster and copy its results")
+    args = parser.parse_args(argv)
+
+    resumes = load_sources(args.resumes)
+    jds = load_sources(args.jds)
+    summary = run_batch(resumes, jds, args.out, workers=args.workers, timeout=args.timeout,
+                        boost=args.boost, use_cache=not args.no_cache, dedupe=args.dedupe,
+                        cascade=args.cascade)
+    print(json.dumps(summary), file=sys.stderr)
+    return 0 if summary["error"] == 0 and summary["timeout"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,450 @@
+"""
+Offline benchmark suite.
+
+Runs every processing stage against a synthetic corpus of PDF, DOCX, TXT
+and TEX resumes and job descriptions at several sizes, with Gemini
+replaced by a deterministic local stand-in, and writes a JSON report that
+can be compared against a previous run to catch regressions.
+
+Cold start is measured separately in fresh interpreters: the time to import
+``app`` and to serve the first analysis, and which heavy modules were loaded
+by the import alone.
+
+Usage:
+    python benchmark.py --out bench.json [--latency 0.05 --error-rate 0.01]
+    python benchmark.py --out bench.json --startup-runs 10
+    python benchmark.py --out new.json --compare bench.json --threshold 1.25
+"""
+import argparse
+import hashlib
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+from io import BytesIO
+
+SIZES = {"small": 400, "medium": 1500, "large": 6000}
+# Modules that should only be imported once a request needs them.
+DEFERRED_MODULES = ("google.generativeai", "pdfminer", "PyPDF2", "docx", "mammoth", "markdown", "numpy", "requests")
+
+SKILLS = [
+    "Python", "Java", "Go", "Rust", "TypeScript", "React", "Django", "Flask", "PostgreSQL", "MySQL",
+    "Redis", "Kafka", "Spark", "Airflow", "Docker", "Kubernetes", "Terraform", "AWS", "GCP", "Azure",
+    "GraphQL", "REST APIs", "CI/CD", "machine learning", "data pipelines", "microservices", "Linux",
+    "observability", "distributed systems", "SQL", "pandas", "NumPy", "TensorFlow", "PyTorch",
+]
+VERBS = ["Built", "Designed", "Led", "Migrated", "Optimized", "Automated", "Scaled", "Delivered", "Owned"]
+OBJECTS = [
+    "a billing platform", "internal tooling", "the data warehouse", "customer-facing APIs",
+    "the deployment pipeline", "a recommendation service", "monitoring dashboards", "batch ETL jobs",
+]
+OUTCOMES = [
+    "reducing latency by {n}%", "cutting costs by {n}%", "serving {n}M requests per day",
+    "improving reliability to 99.{n}%", "onboarding {n} new teams", "shrinking build times by {n}%",
+]
+
+
+class StubResponse:
+    def __init__(self, text, prompt_tokens, output_tokens):
+        self.text = text
+        self.usage_metadata = type("Usage", (), {
+            "prompt_token_count": prompt_tokens,
+            "candidates_token_count": output_tokens,
+            "total_token_count": prompt_tokens + output_tokens,
+        })()
+
+
+class StubModel:
+    """
+    Deterministic stand-in for a Gemini model with configurable latency,
+    output size and error rate. Output depends only on the prompt and on
+    whether JSON mode is requested.
+    """
+
+    def __init__(self, latency=0.0, output_chars=3000, error_rate=0.0, seed=0):
+        self.latency = latency
+        self.output_chars = output_chars
+        self.error_rate = error_rate
+        self.seed = seed
+
+    def _respond(self, prompt, json_mode=False):
+        digest = hashlib.sha256(f"{self.seed}:{prompt}".encode("utf-8")).digest()
+        rng = random.Random(digest)
+        if self.latency:
+            time.sleep(self.latency)
+        if rng.random() < self.error_rate:
+            raise RuntimeError("Stub model injected failure")
+        if json_mode:
+            text = json.dumps({
+                "overall_score": round(rng.uniform(40, 95), 1),
+                "section_scores": [{"section": name, "score": round(rng.uniform(30, 100), 1),
+                                    "notes": f"{rng.choice(VERBS)} {rng.choice(OBJECTS)}"}
+                                   for name in ("Summary", "Experience", "Skills", "Education")],
+                "missing_keywords": rng.sample(SKILLS, 3),
+                "recommendations": [f"{rng.choice(VERBS)} {rng.choice(OBJECTS)} with {rng.choice(SKILLS)}"
+                                    for _ in range(4)],
+            })
+            return StubResponse(text, len(prompt) // 4, len(text) // 4)
+        if prompt.startswith("Analyze"):
+            head = f"ATS Score : {rng.uniform(40, 95):.1f}\nDetailed Report:\n"
+        else:
+            head = "# Candidate Name\n\n## Experience\n"
+        body = []
+        size = len(head)
+        while size < self.output_chars:
+            line = f"- {rng.choice(VERBS)} {rng.choice(OBJECTS)} with {rng.choice(SKILLS)}"
+            if rng.random() < 0.05:
+                line += " (add relevant experience)"
+            body.append(line)
+            size += len(line) + 1
+        text = head + "\n".join(body)
+        return StubResponse(text, len(prompt) // 4, len(text) // 4)
+
+    def generate_content(self, prompt, stream=False, generation_config=None, request_options=None):
+        json_mode = (generation_config or {}).get("response_mime_type") == "application/json"
+        response = self._respond(prompt, json_mode)
+        if not stream:
+            return response
+        text = response.text
+        return iter([StubResponse(text[i:i + 200], 0, 0) for i in range(0, len(text), 200)] + [response])
+
+
+def synthetic_resume(words, seed):
+    rng = random.Random(seed)
+    lines = [
+        "# Alex Candidate",
+        "alex.candidate@example.com | +1 (555) 010-2030 | linkedin.com/in/alex",
+        "",
+        "## Summary",
+        f"Engineer with {rng.randint(3, 15)} years of experience in {', '.join(rng.sample(SKILLS, 4))}.",
+        "",
+        "## Experience",
+    ]
+    count = len(" ".join(lines).split())
+    job = 0
+    while count < words * 0.8:
+        job += 1
+        lines += ["", f"### Senior Engineer, Company {job} ({2024 - job * 2} - {2026 - job * 2})"]
+        for _ in range(rng.randint(4, 7)):
+            outcome = rng.choice(OUTCOMES).format(n=rng.randint(10, 90))
+            line = f"- {rng.choice(VERBS)} {rng.choice(OBJECTS)} using {rng.choice(SKILLS)} and {rng.choice(SKILLS)}, {outcome}"
+            lines.append(line)
+            count += len(line.split())
+    lines += ["", "## Education", "B.S. Computer Science, State University", "", "## Skills",
+              ", ".join(rng.sample(SKILLS, 14)), "", "## Certifications", "AWS Certified Solutions Architect"]
+    return "\n".join(lines)
+
+
+def synthetic_jd(words, seed):
+    rng = random.Random(seed + 7919)
+    required = rng.sample(SKILLS, 10)
+    lines = [f"Senior Software Engineer ({rng.choice(['Platform', 'Data', 'Backend'])})", "",
+             "Responsibilities"]
+    count = 0
+    while count < words * 0.6:
+        line = f"- {rng.choice(VERBS)} {rng.choice(OBJECTS)} with {rng.choice(required)} and {rng.choice(required)}"
+        lines.append(line)
+        count += len(line.split())
+    lines += ["", "Requirements"] + [f"- Experience with {skill}" for skill in required]
+    lines += ["", "Benefits", "Health insurance, dental and vision insurance, 401(k) matching, paid time off.", "",
+              "Equal Opportunity Employer: we hire without regard to race, age, sex or gender."]
+    return "\n".join(lines)
+
+
+def _pdf_escape(text):
+    text = text.encode("latin-1", "replace").decode("latin-1")
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def make_pdf(text, lines_per_page=50, width=95):
+    """
+    Build a minimal multi-page PDF (Helvetica, one text stream per page) from plain text.
+    """
+    wrapped = []
+    for line in text.splitlines():
+        while len(line) > width:
+            wrapped.append(line[:width])
+            line = line[width:]
+        wrapped.append(line)
+    pages = [wrapped[i:i + lines_per_page] for i in range(0, len(wrapped), lines_per_page)] or [[""]]
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None,
+               b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for page in pages:
+        content = "BT /F1 10 Tf 50 760 Td 14 TL " + " ".join(f"({_pdf_escape(l)}) '" for l in page) + " ET"
+        stream = content.encode("latin-1")
+        page_id = len(objects) + 1
+        kids.append(f"{page_id} 0 R")
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {page_id + 1} 0 R >>".encode("latin-1")
+        )
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(pages)} >>".encode("latin-1")
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+
+def make_docx(text):
+    from docx import Document
+    document = Document()
+    for line in text.splitlines():
+        if line.startswith("#"):
+            level = min(len(line) - len(line.lstrip("#")), 3)
+            document.add_heading(line.lstrip("#").strip(), level=level)
+        elif line.startswith("- "):
+            document.add_paragraph(line[2:], style="List Bullet")
+        else:
+            document.add_paragraph(line)
+    f = BytesIO()
+    document.save(f)
+    return f.getvalue()
+
+
+def make_tex(text):
+    body = []
+    for line in text.splitlines():
+        if line.startswith("#"):
+            body.append("\\section*{%s}" % line.lstrip("#").strip())
+        elif line.startswith("- "):
+            body.append("\\item %s" % line[2:])
+        else:
+            body.append(line)
+    return "\\documentclass{article}\n\\begin{document}\n" + "\n".join(body) + "\n\\end{document}\n"
+
+
+def build_corpus(seed=0, corpus_dir=None):
+    """
+    Return ``{size: {"resume": {fmt: bytes}, "jd": {fmt: bytes}, "resume_text", "jd_text"}}``.
+    """
+    corpus = {}
+    for size, words in SIZES.items():
+        entry = {"resume_text": synthetic_resume(words, seed), "jd_text": synthetic_jd(words // 3, seed)}
+        for kind in ("resume", "jd"):
+            text = entry[f"{kind}_text"]
+            entry[kind] = {
+                "pdf": make_pdf(text),
+                "docx": make_docx(text),
+                "txt": text.encode("utf-8"),
+                "tex": make_tex(text).encode("utf-8"),
+            }
+            if corpus_dir:
+                os.makedirs(corpus_dir, exist_ok=True)
+                for fmt, data in entry[kind].items():
+                    with open(os.path.join(corpus_dir, f"{kind}_{size}.{fmt}"), "wb") as f:
+                        f.write(data)
+        corpus[size] = entry
+    return corpus
+
+
+def measure(fn, repeat, warmup=1):
+    """
+    Time ``fn`` ``repeat`` times after ``warmup`` calls; failures are counted, not timed.
+    """
+    for _ in range(warmup):
+        try:
+            fn()
+        except Exception:
+            pass
+    timings, errors = [], 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        try:
+            fn()
+        except Exception:
+            errors += 1
+            continue
+        timings.append((time.perf_counter() - start) * 1000.0)
+    return summarise(timings, errors)
+
+
+def summarise(timings, errors=0):
+    """
+    Return run/error counts and min, median, p95 and mean of ``timings`` (in ms).
+    """
+    if not timings:
+        return {"runs": errors, "errors": errors}
+    ordered = sorted(timings)
+    return {
+        "runs": len(timings) + errors,
+        "errors": errors,
+        "min_ms": round(ordered[0], 4),
+        "median_ms": round(statistics.median(ordered), 4),
+        "p95_ms": round(ordered[min(int(len(ordered) * 0.95), len(ordered) - 1)], 4),
+        "mean_ms": round(statistics.fmean(ordered), 4),
+    }
+
+
+def run_benchmarks(repeat=5, latency=0.0, output_chars=3000, error_rate=0.0, seed=0, corpus_dir=None):
+    import app
+    from model_registry import registry
+    from scoring import score_resume
+    from near_duplicates import MinHasher
+    from taxonomy import get_taxonomy
+
+    stub = StubModel(latency=latency, output_chars=output_chars, error_rate=error_rate, seed=seed)
+    registry.set_model_factory(lambda model_id, system_instruction: stub)
+    corpus = build_corpus(seed, corpus_dir)
+    hasher = MinHasher()
+    results = {}
+    try:
+        for size, entry in corpus.items():
+            resume, jd = entry["resume"], entry["jd"]
+            resume_text, jd_text = entry["resume_text"], entry["jd_text"]
+            report = stub.generate_content(app.build_analysis_prompt(resume_text, jd_text)).text
+            boosted = stub.generate_content(app.build_boost_prompt(resume_text, jd_text, report)).text
+            stages = {
+                "extract_text_from_pdf": lambda: app.extract_text_from_pdf(resume["pdf"]),
+                "extract_text_from_docx": lambda: app.extract_text_from_docx(resume["docx"]),
+                "extract_txt": lambda: app.extract_uploaded_text("resume.txt", resume["txt"]),
+                "extract_tex": lambda: app.extract_uploaded_text("resume.tex", resume["tex"]),
+                "extract_jd_pdf": lambda: app.extract_text_from_pdf(jd["pdf"]),
+                "build_analysis_prompt": lambda: app.build_analysis_prompt(resume_text, jd_text),
+                "build_boost_prompt": lambda: app.build_boost_prompt(resume_text, jd_text, report),
+                "clean_placeholder_text": lambda: app.clean_placeholder_text(boosted),
+                "generate_docx_from_markdown": lambda: app.generate_docx_from_markdown(boosted),
+                "local_score": lambda: score_resume(resume_text, jd_text),
+                "skill_match": lambda: get_taxonomy().match(resume_text),
+                "minhash_signature": lambda: hasher.signature(resume_text),
+                "analyze_resume_e2e": lambda: app.analyze_resume(resume_text, jd_text, use_cache=False),
+                "boost_resume_md_e2e": lambda: app.boost_resume_md(resume_text, jd_text, report, use_cache=False),
+            }
+            results[size] = {name: measure(fn, repeat) for name, fn in stages.items()}
+            results[size]["_input"] = {
+                "resume_words": len(resume_text.split()),
+                "jd_words": len(jd_text.split()),
+                "pdf_bytes": len(resume["pdf"]),
+                "docx_bytes": len(resume["docx"]),
+            }
+    finally:
+        registry.set_model_factory(None)
+    return results
+
+
+def startup_probe():
+    """
+    Runs in a fresh interpreter: time ``import app`` and the first analysis
+    through the stub model, and report which deferred modules the import loaded.
+    """
+    start = time.perf_counter()
+    import app
+    import_ms = (time.perf_counter() - start) * 1000.0
+    loaded = [name for name in DEFERRED_MODULES if name in sys.modules]
+    from model_registry import registry
+    registry.set_model_factory(lambda model_id, system_instruction: StubModel())
+    resume, jd = synthetic_resume(SIZES["small"], 0), synthetic_jd(SIZES["small"] // 3, 0)
+    start = time.perf_counter()
+    app.analyze_resume(resume, jd, use_cache=False)
+    first_call_ms = (time.perf_counter() - start) * 1000.0
+    return {"import_ms": import_ms, "first_call_ms": first_call_ms, "loaded_at_import": loaded}
+
+
+def run_startup(runs):
+    """
+    Run ``startup_probe`` in ``runs`` fresh interpreters and summarise the timings.
+    """
+    samples = []
+    for _ in range(runs):
+        completed = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--startup-probe"],
+            capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)), timeout=300,
+        )
+        if completed.returncode == 0 and completed.stdout.strip():
+            samples.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+    results = {
+        "import_app": summarise([sample["import_ms"] for sample in samples], runs - len(samples)),
+        "first_analysis": summarise([sample["first_call_ms"] for sample in samples], runs - len(samples)),
+    }
+    results["_loaded_at_import"] = sorted({m for sample in samples for m in sample["loaded_at_import"]})
+    return results
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def compare(report, baseline, threshold=1.25, noise_floor_ms=0.5):
+    """
+    Return a list of ``(size, stage, baseline_ms, current_ms, ratio)`` for stages
+    whose median got slower than ``threshold`` times the baseline.
+    """
+    regressions = []
+    for size, stages in report["results"].items():
+        for stage, current in stages.items():
+            previous = baseline.get("results", {}).get(size, {}).get(stage)
+            if stage.startswith("_") or not previous or "median_ms" not in current or "median_ms" not in previous:
+                continue
+            before, after = previous["median_ms"], current["median_ms"]
+            if after - before > noise_floor_ms and after > before * threshold:
+                regressions.append((size, stage, before, after, round(after / max(before, 1e-9), 2)))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the resume pipeline offline with a stub model.")
+    parser.add_argument("--out", default="bench_report.json", help="Where to write the JSON report")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per stage")
+    parser.add_argument("--latency", type=float, default=0.0, help="Stub model latency per call, in seconds")
+    parser.add_argument("--output-chars", type=int, default=3000, help="Stub model output size")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Stub model failure probability")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the corpus and stub model")
+    parser.add_argument("--corpus-dir", help="Also write the synthetic corpus files here")
+    parser.add_argument("--startup-runs", type=int, default=5, help="Fresh interpreters for the cold-start benchmark (0 to skip)")
+    parser.add_argument("--startup-probe", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--compare", help="Baseline report to check for regressions")
+    parser.add_argument("--threshold", type=float, default=1.25, help="Slowdown ratio counted as a regression")
+    args = parser.parse_args(argv)
+    if args.startup_probe:
+        print(json.dumps(startup_probe()))
+        return 0
+
+    config = {k: getattr(args, k) for k in ("repeat", "latency", "output_chars", "error_rate", "seed")}
+    report_config = dict(config, startup_runs=args.startup_runs)
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+        },
+        "config": report_config,
+        "results": {},
+    }
+    # Cold start is measured before this process imports the application.
+    if args.startup_runs:
+        report["results"]["startup"] = run_startup(args.startup_runs)
+    report["results"].update(run_benchmarks(corpus_dir=args.corpus_dir, **config))
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+    for size, stages in report["results"].items():
+        for stage, stats in stages.items():
+            if not stage.startswith("_"):
+                print(f"{size:>7} {stage:<30} median {stats.get('median_ms', float('nan')):>10.3f} ms"
+                      f"  errors {stats['errors']}")
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            regressions = compare(report, json.load(f), args.threshold)
+        for size, stage, before, after, ratio in regressions:
+            print(f"REGRESSION {size} {stage}: {before:.3f} ms -> {after:.3f} ms ({ratio}x)")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
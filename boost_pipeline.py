@@ -0,0 +1,119 @@
+"""
+Concurrent boost pipeline.
+
+The blocking agent calls are adapted to asyncio through a shared thread
+pool so that each stage starts as soon as its inputs exist: the local
+pre-score runs alongside the boost call, and every boosted candidate is
+re-analyzed and locally scored concurrently. Several boost variants can run
+at once; the best-scoring candidate wins. Documents are not rendered here:
+downloads render only the chosen resume, when they are requested.
+"""
+import asyncio
+import contextvars
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from scoring import score_resume
+
+MAX_WORKERS = int(os.environ.get("ATS_PIPELINE_WORKERS", 8))
+_executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="ats-pipeline")
+
+
+async def run_blocking(fn, *args, **kwargs):
+    """
+    Run a blocking callable on the pipeline thread pool and await its result.
+    """
+    loop = asyncio.get_running_loop()
+    # Carry context variables (e.g. the active trace) into the worker thread.
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(_executor, context.run, functools.partial(fn, *args, **kwargs))
+
+
+async def _boost_candidate(variant, resume_text, jd_text, analysis_report, boost, analyze, parse_score):
+    boosted = await run_blocking(boost, resume_text, jd_text, analysis_report, variant)
+    return await _evaluate_candidate(variant, boosted, jd_text, analyze, parse_score)
+
+
+async def _evaluate_candidate(variant, boosted, jd_text, analyze, parse_score):
+    analysis, local = await asyncio.gather(
+        run_blocking(analyze, boosted, jd_text),
+        run_blocking(score_resume, boosted, jd_text),
+    )
+    return {
+        "variant": variant,
+        "boosted_resume": boosted,
+        "analysis": analysis,
+        "ats_score": parse_score(analysis),
+        "local_score": local,
+    }
+
+
+async def _score_before(resume_text, jd_text, analyze, parse_score, rescore_original):
+    # The original resume scored by the same ``analyze`` as the candidates, so the two are comparable.
+    if not rescore_original:
+        return None
+    return parse_score(await run_blocking(analyze, resume_text, jd_text))
+
+
+async def boost_pipeline_async(resume_text, jd_text, analysis_report, boost, analyze, parse_score,
+                               variants=(None,), rescore_original=False):
+    """
+    Boost a resume with every instruction variant concurrently and return the
+    best candidate, ranked by the re-analysis ATS score and then the local score.
+
+    ``boost(resume, jd, report, variant)`` and ``analyze(resume, jd)`` are the
+    blocking agent calls and ``parse_score(analysis)`` extracts the ATS score.
+    The returned dict also carries ``local_score_before``, ``candidates``
+    (every successful candidate) and ``errors`` (one message per failed variant).
+    With ``rescore_original`` the original resume is scored by ``analyze`` as
+    well, as ``ats_score_before``; otherwise that is None.
+    """
+    local_before = asyncio.ensure_future(run_blocking(score_resume, resume_text, jd_text))
+    score_before = asyncio.ensure_future(_score_before(resume_text, jd_text, analyze, parse_score, rescore_original))
+    outcomes = await asyncio.gather(
+        *(
+            _boost_candidate(variant, resume_text, jd_text, analysis_report, boost, analyze, parse_score)
+            for variant in variants
+        ),
+        return_exceptions=True,
+    )
+    candidates = [o for o in outcomes if not isinstance(o, BaseException)]
+    errors = [o for o in outcomes if isinstance(o, BaseException)]
+    if not candidates:
+        local_before.cancel()
+        score_before.cancel()
+        raise errors[0]
+    best = max(candidates, key=lambda c: (c["ats_score"], c["local_score"]["score"]))
+    result = dict(best)
+    result["local_score_before"] = await local_before
+    result["ats_score_before"] = await score_before
+    result["candidates"] = candidates
+    result["errors"] = [str(e) for e in errors]
+    return result
+
+
+def run_boost_pipeline(*args, **kwargs):
+    """
+    Synchronous entry point for ``boost_pipeline_async`` (e.g. from the Streamlit script thread).
+    """
+    return asyncio.run(boost_pipeline_async(*args, **kwargs))
+
+
+def evaluate_boosted(boosted, resume_text, jd_text, analyze, parse_score, rescore_original=False):
+    """
+    Re-analyze and locally score an already boosted resume concurrently,
+    e.g. after the boost itself was streamed to the UI. Returns the same shape
+    as ``run_boost_pipeline`` for a single candidate.
+    """
+    async def evaluate():
+        local_before = asyncio.ensure_future(run_blocking(score_resume, resume_text, jd_text))
+        score_before = asyncio.ensure_future(
+            _score_before(resume_text, jd_text, analyze, parse_score, rescore_original))
+        result = await _evaluate_candidate(None, boosted, jd_text, analyze, parse_score)
+        result["local_score_before"] = await local_before
+        result["ats_score_before"] = await score_before
+        result["candidates"] = [dict(result)]
+        result["errors"] = []
+        return result
+    return asyncio.run(evaluate())
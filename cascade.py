@@ -0,0 +1,122 @@
+"""
+Tiered scoring cascade.
+
+Without it, every resume/JD pair gets the full checklist analysis, even
+pairs that are plainly unrelated. In cascade mode a local relevance score
+runs first. It is the local keyword-match score, blended with the share of
+the JD's taxonomy skills the resume covers, and it routes the pair to one
+of three tiers:
+
+- ``screened_out`` (below ATS_CASCADE_FLOOR): an instant local verdict, with
+  no model call.
+- ``quick`` (below ATS_CASCADE_FULL): a short prompt on a compacted input
+  and a small output limit.
+- ``full``: the regular detailed analysis, and the boost when requested.
+
+Routing decisions are counted per tier for the sidebar and the metrics
+export.
+"""
+import os
+import threading
+
+from scoring import score_resume
+from telemetry import increment
+
+CASCADE_ENABLED = os.environ.get("ATS_CASCADE", "").lower() in ("1", "true", "yes")
+FLOOR = float(os.environ.get("ATS_CASCADE_FLOOR", 25))
+FULL_THRESHOLD = float(os.environ.get("ATS_CASCADE_FULL", 50))
+# Prompt budget and output limit of the quick tier.
+QUICK_BUDGET_TOKENS = int(os.environ.get("ATS_CASCADE_QUICK_BUDGET_TOKENS", 1500))
+QUICK_MAX_OUTPUT_TOKENS = int(os.environ.get("ATS_CASCADE_QUICK_MAX_OUTPUT_TOKENS", 256))
+# Weight of taxonomy skill coverage in the relevance score when the JD names known skills.
+SKILL_WEIGHT = 0.5
+
+SCREENED_OUT, QUICK, FULL = "screened_out", "quick", "full"
+TIERS = (SCREENED_OUT, QUICK, FULL)
+
+
+def relevance(local):
+    """
+    Relevance (0-100) of a pair from its ``score_resume`` result.
+    """
+    keyword = local["breakdown"]["keyword_match"]
+    skills = len(local["matched_skills"]) + len(local["missing_skills"])
+    if not skills:
+        return round(keyword, 1)
+    coverage = 100.0 * len(local["matched_skills"]) / skills
+    return round((1 - SKILL_WEIGHT) * keyword + SKILL_WEIGHT * coverage, 1)
+
+
+def route(score, floor=None, full_threshold=None):
+    floor = FLOOR if floor is None else floor
+    full_threshold = FULL_THRESHOLD if full_threshold is None else full_threshold
+    if score < floor:
+        return SCREENED_OUT
+    if score < full_threshold:
+        return QUICK
+    return FULL
+
+
+def screened_report(local, score):
+    """
+    The instant verdict for a screened-out pair, in the analysis report format.
+    """
+    missing = local["missing_skills"] or local["missing_keywords"]
+    lines = [
+        f"ATS Score : {local['score']:.1f}",
+        f"Detailed Report: Screened out by the local relevance check ({score:.0f} below the floor of "
+        f"{FLOOR:.0f}), so no detailed analysis was run.",
+    ]
+    if missing:
+        lines.append("")
+        lines.append("**Missing:** " + ", ".join(missing[:15]))
+    lines.append("")
+    lines.append("The resume does not appear to target this role. Tailor it to the job description "
+                 "before requesting a full analysis.")
+    return "\n".join(lines)
+
+
+class CascadeStats:
+    def __init__(self):
+        self.counts = {tier: 0 for tier in TIERS}
+        self._lock = threading.Lock()
+
+    def count(self, tier):
+        with self._lock:
+            self.counts[tier] += 1
+        increment(f"cascade_routed_total|tier={tier}")
+
+    def stats(self):
+        with self._lock:
+            routed = sum(self.counts.values())
+            return dict(
+                self.counts,
+                routed=routed,
+                llm_calls_avoided=self.counts[SCREENED_OUT],
+                floor=FLOOR,
+                full_threshold=FULL_THRESHOLD,
+            )
+
+
+cascade_stats = CascadeStats()
+
+
+def run_cascade(resume_text, jd_text, quick, full, local=None):
+    """
+    Route a pair through the cascade. ``quick(resume_text, jd_text)`` and
+    ``full(resume_text, jd_text)`` return the report of their tier; ``local``
+    is a precomputed ``score_resume`` result.
+
+    Returns ``{"tier", "relevance", "report", "local"}``.
+    """
+    local = local or score_resume(resume_text, jd_text)
+    score = relevance(local)
+    tier = route(score)
+    cascade_stats.count(tier)
+    if tier == SCREENED_OUT:
+        report = screened_report(local, score)
+    elif tier == QUICK:
+        report = quick(resume_text, jd_text)
+    else:
+        report = full(resume_text, jd_text)
+    return {"tier": tier, "relevance": score, "report": report, "local": local}
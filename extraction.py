@@ -0,0 +1,234 @@
+"""
+In-memory text extraction engine for PDF and DOCX documents.
+
+Documents are parsed straight from the uploaded bytes (or a memory-mapped
+file). Long PDFs are split into page ranges that are extracted in parallel
+across a process pool; workers map the document from disk, or attach to a
+shared memory copy of an upload, instead of receiving its bytes with every
+task. Page and byte
+limits stop work early on oversized uploads, and ``on_truncate`` reports
+PDFs cut at the page limit.
+
+The parser libraries are imported on the first document that needs them,
+not when this module is imported, to keep application start-up fast.
+"""
+import importlib
+import importlib.util
+import io
+import mmap
+import multiprocessing
+import os
+import threading
+from multiprocessing import shared_memory
+
+MAX_BYTES = int(os.environ.get("ATS_EXTRACT_MAX_BYTES", 20 * 1024 * 1024))
+MAX_PAGES = int(os.environ.get("ATS_EXTRACT_MAX_PAGES", 50))
+PARALLEL_MIN_PAGES = int(os.environ.get("ATS_EXTRACT_PARALLEL_MIN_PAGES", 8))
+PAGES_PER_TASK = int(os.environ.get("ATS_EXTRACT_PAGES_PER_TASK", 4))
+MAX_WORKERS = int(os.environ.get("ATS_EXTRACT_WORKERS", min(4, os.cpu_count() or 1)))
+
+
+class ExtractionLimitError(ValueError):
+    """Raised when a document exceeds the configured extraction limits."""
+
+
+_modules = {}
+_modules_lock = threading.Lock()
+
+
+def optional_import(name):
+    """
+    Import and memoize module ``name`` on first use; returns None if it is not installed.
+    """
+    if name not in _modules:
+        with _modules_lock:
+            if name not in _modules:
+                try:
+                    _modules[name] = importlib.import_module(name)
+                except ImportError:
+                    _modules[name] = None
+    return _modules[name]
+
+
+def _installed(name):
+    # Checks availability without paying for the import itself.
+    if name in _modules:
+        return _modules[name] is not None
+    try:
+        return importlib.util.find_spec(name) is not None
+    except (ImportError, ValueError):
+        return False
+
+
+def pdf_parser_name():
+    return "pdfminer" if _installed("pdfminer") else "pypdf2"
+
+
+def docx_parser_name():
+    return "mammoth" if _installed("mammoth") else "python-docx"
+
+
+class MappedFile(io.RawIOBase):
+    """
+    Read-only, seekable file object over an mmap, for parsers that insist
+    on an ``io.IOBase`` instance.
+    """
+
+    def __init__(self, mapped):
+        super().__init__()
+        self._mapped = mapped
+        self._mapped.seek(0)
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, b):
+        data = self._mapped.read(len(b))
+        b[:len(data)] = data
+        return len(data)
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        self._mapped.seek(offset, whence)
+        return self._mapped.tell()
+
+    def tell(self):
+        return self._mapped.tell()
+
+    def size(self):
+        return self._mapped.size()
+
+
+def open_buffer(source):
+    """
+    Return a seekable, file-like view of ``source`` without copying it.
+    ``source`` may be bytes, a memoryview/bytearray, an mmap, or a file path,
+    which is memory-mapped read-only.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return io.BytesIO(b"")
+            return MappedFile(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+    if isinstance(source, mmap.mmap):
+        return MappedFile(source)
+    return io.BytesIO(source)
+
+
+def _buffer_size(buffer):
+    if isinstance(buffer, MappedFile):
+        return buffer.size()
+    return buffer.getbuffer().nbytes
+
+
+def _check_size(buffer, max_bytes):
+    size = _buffer_size(buffer)
+    if max_bytes and size > max_bytes:
+        raise ExtractionLimitError(
+            f"Document is {size / (1024 * 1024):.1f} MB, over the {max_bytes / (1024 * 1024):.1f} MB limit"
+        )
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            from concurrent.futures import ProcessPoolExecutor
+            # The app server is multithreaded; forking it could copy locks held by other threads.
+            _pool = ProcessPoolExecutor(max_workers=MAX_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+
+def _extract_pdf_pages(source, page_numbers):
+    # Runs in a worker process. ``source`` is a path, which the worker maps itself,
+    # or the ``(name, size)`` of a shared memory block holding the document.
+    if isinstance(source, tuple):
+        name, size = source
+        block = shared_memory.SharedMemory(name=name)
+        try:
+            buffer = io.BytesIO(bytes(block.buf[:size]))
+        finally:
+            block.close()
+    else:
+        buffer = open_buffer(source)
+    return optional_import("pdfminer.high_level").extract_text(buffer, page_numbers=page_numbers)
+
+
+def _count_pdf_pages(buffer, limit):
+    count = 0
+    for _ in optional_import("pdfminer.pdfpage").PDFPage.get_pages(buffer):
+        count += 1
+        if count > limit:
+            break
+    buffer.seek(0)
+    return count
+
+
+def extract_pdf_text(source, max_pages=MAX_PAGES, max_bytes=MAX_BYTES, parallel=True, on_truncate=None):
+    """
+    Extract the text of a PDF held in memory or on disk.
+    Only the first ``max_pages`` pages are read; for larger documents
+    ``on_truncate(max_pages)`` is called and the rest is skipped.
+    """
+    buffer = open_buffer(source)
+    _check_size(buffer, max_bytes)
+    pdfminer = optional_import("pdfminer.high_level")
+    if pdfminer is None:
+        reader = optional_import("PyPDF2").PdfReader(buffer)
+        pages = reader.pages
+        if max_pages and len(pages) > max_pages:
+            pages = pages[:max_pages]
+            if on_truncate is not None:
+                on_truncate(max_pages)
+        return "".join([page.extract_text() or "" for page in pages])
+
+    page_count = _count_pdf_pages(buffer, max_pages or float("inf"))
+    if max_pages and page_count > max_pages:
+        page_count = max_pages
+        if on_truncate is not None:
+            on_truncate(max_pages)
+    if not parallel or MAX_WORKERS < 2 or page_count < PARALLEL_MIN_PAGES:
+        return pdfminer.extract_text(buffer, maxpages=page_count)
+
+    chunks = [
+        list(range(start, min(start + PAGES_PER_TASK, page_count)))
+        for start in range(0, page_count, PAGES_PER_TASK)
+    ]
+    if isinstance(source, (str, os.PathLike)):
+        return _extract_chunks(source, chunks)
+    # Workers attach to one shared copy by name, not the document pickled into every task.
+    size = _buffer_size(buffer)
+    block = shared_memory.SharedMemory(create=True, size=size)
+    try:
+        buffer.seek(0)
+        buffer.readinto(block.buf[:size])
+        return _extract_chunks((block.name, size), chunks)
+    finally:
+        block.close()
+        block.unlink()
+
+
+def _extract_chunks(source, chunks):
+    pool = _get_pool()
+    futures = [pool.submit(_extract_pdf_pages, source, chunk) for chunk in chunks]
+    return "".join([future.result() for future in futures])
+
+
+def extract_docx_text(source, max_bytes=MAX_BYTES):
+    """
+    Extract the text of a DOCX document held in memory or on disk, as
+    Markdown when mammoth is installed and as plain paragraphs otherwise.
+    """
+    buffer = open_buffer(source)
+    _check_size(buffer, max_bytes)
+    mammoth = optional_import("mammoth")
+    if mammoth is not None:
+        return mammoth.convert_to_markdown(buffer).value
+    document = optional_import("docx").Document(buffer)
+    return "".join([para.text + "\n" for para in document.paragraphs])
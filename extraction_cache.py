@@ -0,0 +1,158 @@
+"""
+Content-addressed cache for text extracted from uploaded documents.
+
+Streamlit re-executes the whole script on every interaction, so without a
+cache each rerun would parse the same uploaded PDF/DOCX again. Entries are
+keyed by the SHA-256 of the uploaded bytes plus the parser that produced
+the text, held in a bounded in-memory LRU shared by every session in the
+process, and optionally mirrored to an on-disk tier. A PDF cut short at the
+page limit keeps that page limit with its entry, so the warning about it is
+shown again when the text comes from the cache.
+"""
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+DEFAULT_MAX_ENTRIES = int(os.environ.get("ATS_EXTRACTION_CACHE_ENTRIES", 256))
+DEFAULT_MAX_BYTES = int(os.environ.get("ATS_EXTRACTION_CACHE_MAX_BYTES", 32 * 1024 * 1024))
+DEFAULT_DISK_DIR = os.environ.get("ATS_EXTRACTION_CACHE_DIR") or None
+
+
+def content_key(file_bytes, parser):
+    """
+    Build the cache key for a document's bytes and the parser used on it.
+    """
+    digest = hashlib.sha256(file_bytes).hexdigest()
+    return f"{parser}-{digest}"
+
+
+class ExtractionCache:
+    """
+    Bounded in-memory LRU of extracted text with an optional on-disk tier.
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, max_bytes=DEFAULT_MAX_BYTES, disk_dir=DEFAULT_DISK_DIR):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        # Page limit of entries extracted from truncated PDFs, by key.
+        self._truncated = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    def _disk_path(self, key):
+        # Shard on the first characters of the digest to keep directories small.
+        digest = key.rsplit("-", 1)[-1]
+        return os.path.join(self.disk_dir, digest[:2], f"{key}.txt")
+
+    def get(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+        if self.disk_dir:
+            path = self._disk_path(key)
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    text = f.read()
+            except OSError:
+                text = None
+            if text is not None:
+                pages = self._read_truncated(path)
+                self._remember(key, text)
+                with self._lock:
+                    if pages:
+                        self._truncated[key] = pages
+                    self.disk_hits += 1
+                return text
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def set(self, key, text):
+        self._remember(key, text)
+        if self.disk_dir:
+            path = self._disk_path(key)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(text)
+            os.replace(tmp_path, path)
+
+    def note_truncated(self, key, pages):
+        """
+        Record that the document behind ``key`` was only read up to ``pages`` pages.
+        """
+        with self._lock:
+            self._truncated[key] = pages
+            while len(self._truncated) > self.max_entries:
+                # Notes for documents whose text was never cached (e.g. failed parses).
+                del self._truncated[next(iter(self._truncated))]
+        if self.disk_dir:
+            path = self._disk_path(key)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(f"{path}.pages", "w", encoding="utf-8") as f:
+                f.write(str(pages))
+
+    def truncated_pages(self, key):
+        """
+        Return the page limit the document behind ``key`` was cut at, or None.
+        """
+        with self._lock:
+            return self._truncated.get(key)
+
+    def _read_truncated(self, path):
+        try:
+            with open(f"{path}.pages", "r", encoding="utf-8") as f:
+                return int(f.read())
+        except (OSError, ValueError):
+            return None
+
+    def _remember(self, key, text):
+        size = len(text)
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= len(self._entries.pop(key))
+            self._entries[key] = text
+            self._bytes += size
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                evicted_key, evicted = self._entries.popitem(last=False)
+                self._truncated.pop(evicted_key, None)
+                self._bytes -= len(evicted)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+            }
+
+
+extraction_cache = ExtractionCache()
+
+
+def cached_extract(file_bytes, parser, extract):
+    """
+    Return the text for ``file_bytes`` as produced by ``parser``, calling
+    ``extract(file_bytes)`` only on a cache miss. Empty results are not
+    cached so that a failed parse is retried on the next rerun.
+    """
+    key = content_key(file_bytes, parser)
+    text = extraction_cache.get(key)
+    if text is not None:
+        return text
+    text = extract(file_bytes)
+    if text:
+        extraction_cache.set(key, text)
+    return text
@@ -0,0 +1,246 @@
+"""
+Persistent analysis history.
+
+Results used to live only in the Streamlit session and were lost with it,
+so users re-ran paid analyses to see them again. Every analysis, boost,
+custom update and created resume is now recorded in a local SQLite database
+in WAL mode (``.ats_cache/history.sqlite3`` or ATS_HISTORY_PATH). Each record
+holds the result with its candidate, resume and JD hashes, scores, model id,
+latency and timestamp.
+
+``record`` only enqueues. A single background writer thread hashes the
+texts and commits queued records in batches, so recording never adds
+latency to the interactive path. If the queue is full, the record is
+dropped and counted instead of blocking. Reads go through their own
+connection; WAL lets them run alongside the writer. Indexes serve lookups
+by candidate, requisition (JD hash) and score range, keyset-paginated
+history pages, and top-N ranking per job description.
+"""
+import atexit
+import hashlib
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+from telemetry import increment
+
+DEFAULT_PATH = os.environ.get("ATS_HISTORY_PATH", os.path.join(".ats_cache", "history.sqlite3"))
+HISTORY_DISABLED = os.environ.get("ATS_HISTORY_DISABLED", "").lower() in ("1", "true", "yes")
+QUEUE_SIZE = int(os.environ.get("ATS_HISTORY_QUEUE_SIZE", 1000))
+# Records committed per write transaction at most.
+WRITE_BATCH = 100
+
+KINDS = ("analysis", "boost", "custom_update", "create")
+COLUMNS = ("id", "kind", "candidate", "resume_hash", "jd_hash", "jd_title", "ats_score", "local_score",
+           "model_id", "latency_ms", "created_at", "result")
+# Columns returned by listing queries; ``get`` also returns the result itself.
+SUMMARY_COLUMNS = COLUMNS[:-1]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS history (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    candidate TEXT,
+    resume_hash TEXT,
+    jd_hash TEXT,
+    jd_title TEXT,
+    ats_score REAL,
+    local_score REAL,
+    model_id TEXT,
+    latency_ms REAL,
+    created_at REAL NOT NULL,
+    result TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_history_created ON history(created_at, id);
+CREATE INDEX IF NOT EXISTS idx_history_candidate ON history(candidate, created_at);
+CREATE INDEX IF NOT EXISTS idx_history_jd_score ON history(jd_hash, kind, ats_score);
+CREATE INDEX IF NOT EXISTS idx_history_score ON history(ats_score);
+"""
+
+
+def text_hash(text):
+    return hashlib.sha256((text or "").encode("utf-8")).hexdigest() if text else None
+
+
+def first_line(text, max_words=8):
+    # A resume's first short line is usually the candidate's name, a JD's the job title.
+    for line in (text or "").splitlines():
+        line = line.strip().lstrip("#").strip().strip("*").strip()
+        if line:
+            return line[:80] if len(line.split()) <= max_words else None
+    return None
+
+
+class HistoryStore:
+    """
+    SQLite history of results with a non-blocking, batching writer thread.
+    """
+
+    def __init__(self, path=DEFAULT_PATH, queue_size=QUEUE_SIZE):
+        self.path = path
+        self.written = 0
+        self.dropped = 0
+        self.write_errors = 0
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._read_lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._write_conn = sqlite3.connect(path, check_same_thread=False)
+        self._write_conn.execute("PRAGMA journal_mode=WAL")
+        # WAL keeps committed data consistent after a crash; only the last transactions may be lost.
+        self._write_conn.execute("PRAGMA synchronous=NORMAL")
+        self._write_conn.executescript(SCHEMA)
+        self._write_conn.commit()
+        self._read_conn = sqlite3.connect(path, check_same_thread=False)
+        self._writer = threading.Thread(target=self._write_loop, name="ats-history-writer", daemon=True)
+        self._writer.start()
+
+    def record(self, kind, result, resume_text=None, jd_text=None, candidate=None, ats_score=None,
+               local_score=None, model_id=None, latency=None):
+        """
+        Queue a result for writing and return immediately. ``latency`` is in seconds.
+        """
+        item = (kind, result, resume_text, jd_text, candidate, ats_score, local_score, model_id, latency, time.time())
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            self.dropped += 1
+            increment("history_dropped_total")
+
+    def _row(self, item):
+        kind, result, resume_text, jd_text, candidate, ats_score, local_score, model_id, latency, created = item
+        return (kind, candidate or first_line(resume_text), text_hash(resume_text), text_hash(jd_text),
+                first_line(jd_text, 12), ats_score, local_score, model_id,
+                None if latency is None else round(latency * 1000, 1), created, result)
+
+    def _write_loop(self):
+        while True:
+            items = [self._queue.get()]
+            while len(items) < WRITE_BATCH:
+                try:
+                    items.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                with self._write_conn:
+                    self._write_conn.executemany(
+                        f"INSERT INTO history ({', '.join(COLUMNS[1:])}) VALUES ({', '.join('?' * (len(COLUMNS) - 1))})",
+                        [self._row(item) for item in items],
+                    )
+                self.written += len(items)
+                increment("history_written_total", len(items))
+            except sqlite3.Error:
+                self.write_errors += len(items)
+                increment("history_write_errors_total", len(items))
+            finally:
+                for _ in items:
+                    self._queue.task_done()
+
+    def flush(self, timeout=5.0):
+        """
+        Wait up to ``timeout`` seconds for queued records to be written.
+        """
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.01)
+        return not self._queue.unfinished_tasks
+
+    def _query(self, sql, params):
+        with self._read_lock:
+            return self._read_conn.execute(sql, params).fetchall()
+
+    def history(self, candidate=None, jd_hash=None, kind=None, min_score=None, max_score=None,
+                limit=20, cursor=None):
+        """
+        Return one page of records, newest first, as ``(rows, next_cursor)``.
+        Pass ``next_cursor`` back to fetch the following page; it is None on
+        the last page. Rows are dicts without the stored result.
+        """
+        where, params = [], []
+        for column, value in (("candidate", candidate), ("jd_hash", jd_hash), ("kind", kind)):
+            if value is not None:
+                where.append(f"{column} = ?")
+                params.append(value)
+        if min_score is not None:
+            where.append("ats_score >= ?")
+            params.append(min_score)
+        if max_score is not None:
+            where.append("ats_score <= ?")
+            params.append(max_score)
+        if cursor is not None:
+            # Keyset pagination: pages stay fast however deep they go.
+            where.append("(created_at, id) < (?, ?)")
+            params.extend(cursor)
+        sql = f"SELECT {', '.join(SUMMARY_COLUMNS)} FROM history"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY created_at DESC, id DESC LIMIT ?"
+        rows = [dict(zip(SUMMARY_COLUMNS, row)) for row in self._query(sql, params + [limit + 1])]
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = (rows[-1]["created_at"], rows[-1]["id"])
+        return rows, next_cursor
+
+    def top_for_jd(self, jd_hash, n=10, kind="analysis"):
+        """
+        Return the ``n`` best-scoring candidates for a job description, with
+        each resume's best record.
+        """
+        # SQLite returns the bare columns of the row holding MAX() for each group.
+        sql = (f"SELECT {', '.join(SUMMARY_COLUMNS[:6])}, MAX(ats_score), {', '.join(SUMMARY_COLUMNS[7:])} "
+               "FROM history WHERE jd_hash = ? AND kind = ? AND ats_score IS NOT NULL "
+               "GROUP BY resume_hash ORDER BY ats_score DESC LIMIT ?")
+        return [dict(zip(SUMMARY_COLUMNS, row)) for row in self._query(sql, (jd_hash, kind, n))]
+
+    def requisitions(self, limit=50):
+        """
+        Return the job descriptions with history, most recent first, as dicts
+        with ``jd_hash``, ``jd_title`` and the number of ``records``.
+        """
+        sql = ("SELECT jd_hash, MAX(jd_title), COUNT(*), MAX(created_at) AS last FROM history "
+               "WHERE jd_hash IS NOT NULL GROUP BY jd_hash ORDER BY last DESC LIMIT ?")
+        return [{"jd_hash": row[0], "jd_title": row[1], "records": row[2]} for row in self._query(sql, (limit,))]
+
+    def get(self, record_id):
+        rows = self._query(f"SELECT {', '.join(COLUMNS)} FROM history WHERE id = ?", (record_id,))
+        return dict(zip(COLUMNS, rows[0])) if rows else None
+
+    def stats(self):
+        return {
+            "queued": self._queue.qsize(),
+            "written": self.written,
+            "dropped": self.dropped,
+            "write_errors": self.write_errors,
+        }
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_history_store():
+    """
+    Return the process-wide history store, or None when history is disabled.
+    """
+    global _store
+    if HISTORY_DISABLED:
+        return None
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = HistoryStore()
+                atexit.register(_store.flush)
+    return _store
+
+
+def record(kind, result, **fields):
+    """
+    Record a result in the history store; a no-op when history is disabled.
+    """
+    store = get_history_store()
+    if store is not None:
+        store.record(kind, result, **fields)
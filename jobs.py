@@ -0,0 +1,210 @@
+"""
+Background jobs for long-running agent calls.
+
+A Streamlit script run blocks for as long as it is executing, so agent
+calls are submitted to a process-wide executor instead and the session only
+keeps the job id. The UI polls the job for its progress, elapsed time and
+partial output, and picks up the result on whichever rerun sees it finish.
+A job keeps running if its tab is closed (its response still lands in the
+response cache) and submitting the same inputs again while it is in flight
+attaches to the existing job instead of starting another one. A shared job
+is only cancelled once every session that submitted it has cancelled.
+Cancellation takes effect between streamed chunks and pipeline stages; a
+blocking Gemini call that is already in flight is left to complete and its
+result discarded.
+"""
+import contextvars
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from telemetry import increment
+from telemetry import request as trace_request
+
+MAX_WORKERS = int(os.environ.get("ATS_JOB_WORKERS", 4))
+# Finished jobs are kept this long (seconds) so a rerun can still collect them.
+JOB_TTL = int(os.environ.get("ATS_JOB_TTL", 1800))
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = "queued", "running", "done", "failed", "cancelled"
+
+
+class JobCancelled(Exception):
+    """Raised inside a job once it has been cancelled."""
+
+
+def job_key(kind, *parts):
+    """
+    Build the deduplication key for a job of ``kind`` over JSON-serialisable inputs.
+    """
+    payload = json.dumps([kind, parts], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class Job:
+    def __init__(self, kind, key):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.key = key
+        self.status = QUEUED
+        self.progress = None
+        self.text = ""
+        self.result = None
+        self.error = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.future = None
+        self._subscribers = set()
+        self._cancelled = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def done(self):
+        return self.status in (DONE, FAILED, CANCELLED)
+
+    def elapsed(self):
+        return (self.finished or time.time()) - (self.started or self.created)
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def subscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.add(subscriber)
+
+    def cancel(self, subscriber=None):
+        """
+        Withdraw ``subscriber`` from the job and stop it once no subscriber is
+        left; without a ``subscriber`` the job is stopped outright. Returns
+        whether the job is being stopped.
+        """
+        with self._lock:
+            if subscriber is not None:
+                self._subscribers.discard(subscriber)
+                if self._subscribers:
+                    return False
+        self._cancelled.set()
+        if self.future is not None and self.future.cancel():
+            # Never started; nothing will report the cancellation for it.
+            self.status = CANCELLED
+            self.finished = time.time()
+        return True
+
+    def check_cancelled(self):
+        if self._cancelled.is_set():
+            raise JobCancelled()
+
+    def set_progress(self, message):
+        self.check_cancelled()
+        self.progress = message
+
+    def stream(self, chunks):
+        """
+        Accumulate streamed text into ``self.text`` (visible to pollers) and return it.
+        """
+        for chunk in chunks:
+            self.check_cancelled()
+            with self._lock:
+                self.text += chunk
+        self.check_cancelled()
+        return self.text
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "id": self.id,
+                "kind": self.kind,
+                "status": self.status,
+                "progress": self.progress,
+                "elapsed": round(self.elapsed(), 3),
+                "text": self.text,
+                "error": self.error,
+            }
+
+
+class JobManager:
+    """
+    Runs jobs on a shared thread pool and deduplicates in-flight jobs by key.
+    """
+
+    def __init__(self, max_workers=MAX_WORKERS, ttl=JOB_TTL):
+        self.ttl = ttl
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ats-jobs")
+        self._jobs = {}
+        self._active = {}
+        self._lock = threading.Lock()
+        self._deduplicated = 0
+
+    def submit(self, kind, key, fn, *args, subscriber=None, **kwargs):
+        """
+        Run ``fn(job, *args, **kwargs)`` in the background and return its Job,
+        or the in-flight job already submitted with the same ``kind`` and ``key``.
+        ``subscriber`` (e.g. a session id) is added to the job's subscribers,
+        and the job is only cancelled once each of them has cancelled it.
+        """
+        with self._lock:
+            self._prune()
+            existing = self._active.get((kind, key))
+            # A job being cancelled is not joined; its result will be discarded.
+            if existing is not None and not existing.done and not existing.cancelled:
+                if subscriber is not None:
+                    existing.subscribe(subscriber)
+                self._deduplicated += 1
+                increment("jobs_deduplicated_total")
+                return existing
+            job = Job(kind, key)
+            if subscriber is not None:
+                job.subscribe(subscriber)
+            self._jobs[job.id] = job
+            self._active[(kind, key)] = job
+        context = contextvars.copy_context()
+        job.future = self._executor.submit(context.run, self._run, job, fn, args, kwargs)
+        return job
+
+    def _run(self, job, fn, args, kwargs):
+        if job._cancelled.is_set():
+            job.status = CANCELLED
+        else:
+            job.started = time.time()
+            job.status = RUNNING
+            try:
+                with trace_request(job.kind):
+                    job.result = fn(job, *args, **kwargs)
+                job.check_cancelled()
+                job.status = DONE
+            except JobCancelled:
+                job.status = CANCELLED
+            except Exception as e:
+                job.error = str(e) or type(e).__name__
+                job.status = FAILED
+        job.finished = time.time()
+        increment(f"jobs_total|status={job.status}")
+        with self._lock:
+            if self._active.get((job.kind, job.key)) is job:
+                del self._active[(job.kind, job.key)]
+
+    def _prune(self):
+        cutoff = time.time() - self.ttl
+        expired = [job_id for job_id, job in self._jobs.items() if job.done and (job.finished or 0) < cutoff]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def stats(self):
+        with self._lock:
+            stats = {status: 0 for status in (QUEUED, RUNNING, DONE, FAILED, CANCELLED)}
+            for job in self._jobs.values():
+                stats[job.status] += 1
+            stats["deduplicated"] = self._deduplicated
+            return stats
+
+
+job_manager = JobManager()
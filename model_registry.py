@@ -0,0 +1,237 @@
+"""
+Process-wide registry of Gemini clients, model objects and agents.
+
+Streamlit re-executes ``app.py`` on every interaction, so anything built at
+its module level is rebuilt on every rerun. This module is imported once
+per process instead: the Gemini SDK is configured once, each
+``GenerativeModel`` is constructed once per model id and system
+instruction and reused (the SDK keeps its underlying gRPC/REST
+connection alive across calls), and a per-model semaphore caps
+concurrent requests.
+
+Connection reuse is measured from the SDK's transport. With the REST
+transport (ATS_GEMINI_TRANSPORT=rest) the urllib3 pools of its HTTP
+sessions count requests and newly opened connections, and every request
+beyond a new connection went over a kept-alive one. The gRPC transport
+multiplexes all calls over one channel per client and does not expose its
+connections, so only its channels are counted.
+"""
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+from singleflight import SingleFlight
+
+MAX_CONCURRENCY = int(os.environ.get("ATS_MODEL_MAX_CONCURRENCY", 8))
+GEMINI_TRANSPORT = os.environ.get("ATS_GEMINI_TRANSPORT") or None
+# Explicit context caching only pays off (and is only accepted) for long, stable
+# system instructions on models that support it, so it is opt-in.
+CACHED_CONTEXT = os.environ.get("ATS_GEMINI_CACHED_CONTEXT", "").lower() in ("1", "true", "yes")
+CACHED_CONTEXT_TTL = int(os.environ.get("ATS_GEMINI_CACHED_CONTEXT_TTL", 3600))
+
+
+def _sdk_transports():
+    # Transports of the SDK's service clients; the SDK is not imported if nothing has used it yet.
+    client_module = sys.modules.get("google.generativeai.client")
+    if client_module is None:
+        return []
+    clients = list(client_module._client_manager.clients.values())
+    return [client._transport for client in clients if getattr(client, "_transport", None) is not None]
+
+
+def connection_stats(transports):
+    """
+    Count HTTP requests, new connections and reused connections across the
+    urllib3 pools of REST ``transports``, and the channels of gRPC ones.
+    """
+    requests = connections = channels = 0
+    sessions = {}
+    for transport in transports:
+        session = getattr(transport, "_session", None)
+        if session is not None:
+            sessions[id(session)] = session
+        elif getattr(transport, "_grpc_channel", None) is not None:
+            channels += 1
+    for session in sessions.values():
+        for adapter in session.adapters.values():
+            pools = getattr(getattr(adapter, "poolmanager", None), "pools", None)
+            if pools is None:
+                continue
+            for key in list(pools.keys()):
+                try:
+                    pool = pools[key]
+                except KeyError:
+                    continue
+                requests += pool.num_requests
+                connections += pool.num_connections
+    return {
+        "http_requests": requests,
+        "http_connections": connections,
+        "connection_reuses": max(requests - connections, 0),
+        "grpc_channels": channels,
+    }
+
+
+class ModelRegistry:
+    """
+    Memoizes Gemini model objects and other long-lived resources, and limits
+    concurrent calls per model id.
+    """
+
+    def __init__(self, max_concurrency=MAX_CONCURRENCY, transport=GEMINI_TRANSPORT):
+        self.max_concurrency = max_concurrency
+        self.transport = transport
+        self._configured = False
+        self._model_factory = None
+        self._models = {}
+        self._resources = {}
+        self._semaphores = {}
+        # Concurrent requests for a model that is not built yet share one build.
+        self._builds = SingleFlight()
+        self._lock = threading.Lock()
+        self._metrics = {
+            "models_created": 0,
+            "model_reuses": 0,
+            "resources_created": 0,
+            "resource_reuses": 0,
+            "calls": 0,
+            "in_flight": 0,
+            "max_in_flight": 0,
+            "slot_wait_seconds": 0.0,
+            "cached_contexts": 0,
+            "cached_context_fallbacks": 0,
+        }
+
+    def _configure(self):
+        import google.generativeai as genai
+        options = {}
+        api_key = os.environ.get("GEMINI_API_KEY") or os.environ.get("GOOGLE_API_KEY")
+        if api_key:
+            options["api_key"] = api_key
+        if self.transport:
+            options["transport"] = self.transport
+        if options:
+            genai.configure(**options)
+        self._configured = True
+
+    def get_model(self, model_id, system_instruction=None):
+        """
+        Return the shared ``GenerativeModel`` for ``model_id`` and ``system_instruction``.
+        With ATS_GEMINI_CACHED_CONTEXT set, the system instruction is stored as
+        Gemini cached content and refreshed when its TTL runs out.
+        """
+        key = (model_id, system_instruction)
+        model = self._cached_model(key)
+        if model is not None:
+            return model
+        # Built outside the lock: creating cached content is a network call that must
+        # not block slot() and stats() for every other caller.
+        return self._builds.do(key, lambda: self._create_model(key))
+
+    def _cached_model(self, key):
+        with self._lock:
+            entry = self._models.get(key)
+            if entry is not None and (entry[1] is None or entry[1] > time.time()):
+                self._metrics["model_reuses"] += 1
+                return entry[0]
+            return None
+
+    def _create_model(self, key):
+        # Another build may have finished between the cache check and this single-flight call.
+        model = self._cached_model(key)
+        if model is not None:
+            return model
+        with self._lock:
+            configure = not self._configured and self._model_factory is None
+        if configure:
+            self._configure()
+        model, expires = self._build_model(*key)
+        with self._lock:
+            self._models[key] = (model, expires)
+            self._metrics["models_created"] += 1
+        return model
+
+    def set_model_factory(self, factory):
+        """
+        Build models with ``factory(model_id, system_instruction)`` instead of the
+        Gemini SDK (e.g. a local stand-in for benchmarks); ``None`` restores Gemini.
+        """
+        with self._lock:
+            self._model_factory = factory
+            self._models.clear()
+
+    def _build_model(self, model_id, system_instruction):
+        if self._model_factory is not None:
+            return self._model_factory(model_id, system_instruction), None
+        import google.generativeai as genai
+        if system_instruction and CACHED_CONTEXT:
+            try:
+                import datetime
+                from google.generativeai import caching
+                cached = caching.CachedContent.create(
+                    model=model_id,
+                    system_instruction=system_instruction,
+                    ttl=datetime.timedelta(seconds=CACHED_CONTEXT_TTL),
+                )
+                with self._lock:
+                    self._metrics["cached_contexts"] += 1
+                # Rebuild slightly before the server-side cache expires.
+                return genai.GenerativeModel.from_cached_content(cached), time.time() + CACHED_CONTEXT_TTL * 0.9
+            except Exception:
+                # Unsupported model or instruction below the minimum cacheable size.
+                with self._lock:
+                    self._metrics["cached_context_fallbacks"] += 1
+        return genai.GenerativeModel(model_id, system_instruction=system_instruction), None
+
+    def get_resource(self, key, factory):
+        """
+        Return the object memoized under ``key``, building it with ``factory()`` on first use.
+        """
+        with self._lock:
+            if key in self._resources:
+                self._metrics["resource_reuses"] += 1
+                return self._resources[key]
+        resource = factory()
+        with self._lock:
+            if key in self._resources:
+                # Another thread won the race; keep a single shared instance.
+                self._metrics["resource_reuses"] += 1
+                return self._resources[key]
+            self._resources[key] = resource
+            self._metrics["resources_created"] += 1
+            return resource
+
+    @contextmanager
+    def slot(self, model_id):
+        """
+        Hold one of the model's concurrency slots for the duration of a call.
+        """
+        with self._lock:
+            semaphore = self._semaphores.get(model_id)
+            if semaphore is None:
+                semaphore = self._semaphores[model_id] = threading.BoundedSemaphore(self.max_concurrency)
+        started = time.perf_counter()
+        semaphore.acquire()
+        with self._lock:
+            self._metrics["slot_wait_seconds"] += time.perf_counter() - started
+            self._metrics["calls"] += 1
+            self._metrics["in_flight"] += 1
+            self._metrics["max_in_flight"] = max(self._metrics["max_in_flight"], self._metrics["in_flight"])
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._metrics["in_flight"] -= 1
+            semaphore.release()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._metrics)
+        stats["coalesced_builds"] = self._builds.stats()["coalesced"]
+        stats.update(connection_stats(_sdk_transports()))
+        return stats
+
+
+registry = ModelRegistry()
@@ -0,0 +1,231 @@
+"""
+Batched analysis of one resume against many job descriptions.
+
+Analyzing a resume against N requisitions one at a time sends the resume
+(and the checklist system instruction) N times. Here the resume is
+normalized once, the job descriptions are stripped of boilerplate and packed
+into as few prompts as fit the token budget, and the model returns one
+labelled block per job description. A batch whose answer is missing or
+malformed for some job descriptions is split in half and retried for those,
+down to a regular single-JD analysis; a job description whose single analysis
+fails too gets a row with an ``error`` instead of failing the whole request.
+The results are ranked by ATS score.
+
+With a pre-filter limit, the job descriptions are first ranked locally by
+taxonomy skill overlap and local score, and only the best ones are sent to
+the model; the rest are ranked by their local scores alone.
+"""
+import contextvars
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from prompt_budget import count_tokens, normalize_whitespace, strip_boilerplate, trim_to_budget
+from scoring import extract_keywords, score_resume
+from taxonomy import compare_skills
+from telemetry import increment, span
+
+BUDGET_TOKENS = int(os.environ.get("ATS_MULTI_JD_BUDGET_TOKENS", 12000))
+MAX_PER_PROMPT = int(os.environ.get("ATS_MULTI_JD_MAX_PER_PROMPT", 8))
+MAX_WORKERS = int(os.environ.get("ATS_MULTI_JD_WORKERS", 4))
+# Job descriptions sent to the model after the local pre-filter; 0 analyzes all of them.
+MAX_ANALYZED = int(os.environ.get("ATS_MULTI_JD_MAX_ANALYZED", 0))
+# Share of the budget the resume may take; the rest is packed with job descriptions.
+RESUME_SHARE = 0.4
+# Prompt instructions plus the label and output block of each job description.
+PROMPT_OVERHEAD_TOKENS = 250
+PER_JD_OVERHEAD_TOKENS = 120
+
+JD_HEADING = re.compile(r"^\W*JD\s*(\d+)\b", re.IGNORECASE | re.MULTILINE)
+FIELD = re.compile(r"^\W*(ATS Score|Matched|Missing|Summary)\W*:\s*(.*)$", re.IGNORECASE)
+SCORE_LINE = re.compile(r"^\W*ATS Score\b", re.IGNORECASE)
+REPORT_PREFIX = re.compile(r"^\W*Detailed Report\W*:\s*", re.IGNORECASE)
+
+EMPTY_RESULT = {"score": None, "matched": "", "missing": "", "summary": "", "error": ""}
+
+_executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="ats-multi-jd")
+
+
+def jd_title(jd_text, default):
+    # The first short non-empty line is usually the job title.
+    for line in (jd_text or "").splitlines():
+        line = line.strip().lstrip("#").strip()
+        if line:
+            return line[:80] if len(line.split()) <= 12 else default
+    return default
+
+
+def prepare_jds(jds, max_tokens):
+    """
+    Return each job description stripped of boilerplate and trimmed to ``max_tokens``.
+    """
+    prepared = []
+    for jd in jds:
+        text = normalize_whitespace(strip_boilerplate(jd["text"]))
+        if count_tokens(text) > max_tokens:
+            text = trim_to_budget(text, max_tokens, set(extract_keywords(text)[0]))
+        prepared.append(text)
+    return prepared
+
+
+def pack_batches(sizes, capacity, max_per_prompt=MAX_PER_PROMPT):
+    """
+    Group indices of ``sizes`` (token counts) in order into batches whose total
+    stays within ``capacity``; an oversized item gets a batch of its own.
+    """
+    batches, current, used = [], [], 0
+    for index, size in enumerate(sizes):
+        cost = size + PER_JD_OVERHEAD_TOKENS
+        if current and (used + cost > capacity or len(current) >= max_per_prompt):
+            batches.append(current)
+            current, used = [], 0
+        current.append(index)
+        used += cost
+    if current:
+        batches.append(current)
+    return batches
+
+
+def parse_batch(text, count, parse_score):
+    """
+    Parse the ``JD <n>`` blocks of a batched answer for labels 1..``count``.
+    Returns ``{label: result}`` for the blocks that carry an ATS score.
+    """
+    results = {}
+    headings = list(JD_HEADING.finditer(text or ""))
+    for heading, following in zip(headings, headings[1:] + [None]):
+        label = int(heading.group(1))
+        block = text[heading.end():following.start() if following else len(text)]
+        fields = {}
+        for line in block.splitlines():
+            match = FIELD.match(line)
+            if match:
+                fields[match.group(1).lower()] = match.group(2).strip()
+        if not 1 <= label <= count or "ats score" not in fields:
+            continue
+        results[label] = dict(
+            EMPTY_RESULT,
+            score=parse_score(f"ATS Score : {fields['ats score']}"),
+            matched=fields.get("matched", ""),
+            missing=fields.get("missing", ""),
+            summary=fields.get("summary", ""),
+        )
+    return results
+
+
+def _summarize_report(report):
+    # A single-JD report has no summary field; its first lines stand in for one.
+    lines = [REPORT_PREFIX.sub("", line).strip() for line in (report or "").splitlines() if not SCORE_LINE.match(line)]
+    return " ".join(line for line in lines if line)[:300]
+
+
+def analyze_many(resume_text, jds, build_prompt, call_model, analyze_single, parse_score,
+                 overhead_tokens=0, budget=None, max_per_prompt=None, max_analyzed=None):
+    """
+    Analyze ``resume_text`` against every job description in ``jds`` (dicts with
+    ``text`` and optionally ``id`` and ``title``).
+
+    ``build_prompt(resume_text, [(label, jd_text), ...])`` builds a batched
+    prompt and ``call_model(prompt)`` answers it; ``analyze_single(resume_text,
+    jd_text)`` is the full single-JD analysis used when a batch of one still
+    cannot be parsed, and ``parse_score`` reads its score. ``overhead_tokens`` is
+    what every call costs besides its prompt (e.g. the system instruction).
+    ``max_analyzed`` limits how many job descriptions, best skill overlap
+    first, are sent to the model; the others get an ``ats_score`` of None.
+
+    Returns a dict with the ranked ``rows`` (with an ``error`` message for job
+    descriptions that could not be analyzed), the number of ``prompts``,
+    ``fallbacks`` and ``prefiltered`` job descriptions, and the estimated input
+    tokens ``tokens_batched`` versus ``tokens_separate`` (one prompt per job
+    description).
+    """
+    budget = budget or BUDGET_TOKENS
+    max_per_prompt = max_per_prompt or MAX_PER_PROMPT
+    max_analyzed = MAX_ANALYZED if max_analyzed is None else max_analyzed
+    local = [score_resume(resume_text, jd["text"]) for jd in jds]
+    skills = [compare_skills(resume_text, jd["text"]) for jd in jds]
+    analyzed = list(range(len(jds)))
+    if 0 < max_analyzed < len(jds):
+        analyzed.sort(key=lambda i: (skills[i]["overlap"], local[i]["score"]), reverse=True)
+        analyzed = sorted(analyzed[:max_analyzed])
+        increment("multi_jd_prefiltered_total", len(jds) - len(analyzed))
+    resume = normalize_whitespace(resume_text or "")
+    resume_budget = int(budget * RESUME_SHARE)
+    if count_tokens(resume) > resume_budget:
+        required = set()
+        for i in analyzed:
+            required.update(extract_keywords(jds[i]["text"])[0])
+        resume = trim_to_budget(resume, resume_budget, required)
+    capacity = max(budget - count_tokens(resume) - PROMPT_OVERHEAD_TOKENS, PER_JD_OVERHEAD_TOKENS * 2)
+    texts = prepare_jds([jds[i] for i in analyzed], capacity - PER_JD_OVERHEAD_TOKENS)
+    stats = {"prompts": 0, "fallbacks": 0, "prefiltered": len(jds) - len(analyzed), "tokens_batched": 0}
+    lock = threading.Lock()
+
+    def run(indices):
+        # Runs on the executor; returns {index: result} for every index in ``indices``.
+        prompt = build_prompt(resume, [(label, texts[i]) for label, i in enumerate(indices, 1)])
+        with lock:
+            stats["prompts"] += 1
+            stats["tokens_batched"] += count_tokens(prompt) + overhead_tokens
+        try:
+            with span("multi_jd_batch"):
+                parsed = parse_batch(call_model(prompt), len(indices), parse_score)
+        except Exception:
+            # Retried below like a malformed answer: split, then single-JD analyses.
+            parsed = {}
+        results = {indices[label - 1]: result for label, result in parsed.items()}
+        missing = [i for i in indices if i not in results]
+        if not missing:
+            return results
+        increment("multi_jd_reparsed_total", len(missing))
+        if len(missing) == 1 and len(indices) == 1:
+            with lock:
+                stats["fallbacks"] += 1
+                stats["tokens_batched"] += (count_tokens(resume) + count_tokens(texts[missing[0]])
+                                            + PROMPT_OVERHEAD_TOKENS + overhead_tokens)
+            try:
+                report = analyze_single(resume_text, jds[analyzed[missing[0]]]["text"])
+            except Exception as e:
+                increment("multi_jd_errors_total")
+                results[missing[0]] = dict(EMPTY_RESULT, error=f"{type(e).__name__}: {e}")
+                return results
+            results[missing[0]] = dict(EMPTY_RESULT, score=parse_score(report), summary=_summarize_report(report))
+            return results
+        half = (len(missing) + 1) // 2
+        for part in (missing[:half], missing[half:]):
+            if part:
+                results.update(run(part))
+        return results
+
+    batches = pack_batches([count_tokens(text) for text in texts], capacity, max_per_prompt)
+    futures = [_executor.submit(contextvars.copy_context().run, run, batch) for batch in batches]
+    results = {}
+    for future in futures:
+        for position, result in future.result().items():
+            results[analyzed[position]] = result
+
+    rows = []
+    for index, jd in enumerate(jds):
+        result = results.get(index, EMPTY_RESULT)
+        rows.append({
+            "id": jd.get("id", index + 1),
+            "title": jd.get("title") or jd_title(jd["text"], f"JD {index + 1}"),
+            "ats_score": result["score"],
+            "local_score": local[index]["score"],
+            "skill_overlap": skills[index]["overlap"],
+            "missing_skills": ", ".join(skills[index]["missing"]),
+            "matched": result["matched"] or ", ".join(skills[index]["matched"]),
+            "missing": result["missing"] or ", ".join(local[index]["missing_keywords"][:10]),
+            "summary": result["summary"],
+            "error": result["error"],
+        })
+    # Job descriptions left out by the pre-filter rank below the analyzed ones.
+    rows.sort(key=lambda row: (row["ats_score"] is not None, row["ats_score"] or 0.0, row["local_score"]),
+              reverse=True)
+    for rank, row in enumerate(rows, 1):
+        row["rank"] = rank
+    stats["tokens_separate"] = sum(
+        count_tokens(resume) + count_tokens(text) + PROMPT_OVERHEAD_TOKENS + overhead_tokens for text in texts
+    )
+    return dict(stats, rows=rows)
@@ -0,0 +1,346 @@
+"""
+Near-duplicate resume detection with MinHash and locality-sensitive hashing.
+
+The same resume often comes back with trivial edits, or through another
+channel as a differently rendered PDF. Its bytes differ, so the exact-hash
+caches miss, yet its analysis against the same job description would be
+the same. Here each resume's text is reduced to word shingles and a MinHash
+signature, whose agreement estimates the Jaccard similarity of two
+resumes. Signatures are split into LSH bands so that a lookup only compares
+against resumes sharing at least one band, not against every stored one.
+
+``AnalysisReuse`` keeps prior analyses keyed by job description and resume
+signature, in memory and optionally in SQLite (ATS_NEAR_DUP_PATH), and
+returns the analysis of the most similar prior resume above
+ATS_NEAR_DUP_THRESHOLD. A near (not identical) match is only returned if the
+new resume still matches exactly the same job description keywords and
+skills as the prior one, so an edit that adds a missing skill is analyzed
+again. ``duplicate_clusters`` groups a set of resumes for batch runs.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict, defaultdict
+
+from scoring import TOKEN_PATTERN
+from telemetry import increment
+
+NUM_PERM = int(os.environ.get("ATS_NEAR_DUP_PERMUTATIONS", 128))
+BANDS = int(os.environ.get("ATS_NEAR_DUP_BANDS", 16))
+SHINGLE_WORDS = int(os.environ.get("ATS_NEAR_DUP_SHINGLE_WORDS", 3))
+THRESHOLD = float(os.environ.get("ATS_NEAR_DUP_THRESHOLD", 0.9))
+MAX_ENTRIES = int(os.environ.get("ATS_NEAR_DUP_MAX_ENTRIES", 5000))
+STORE_PATH = os.environ.get("ATS_NEAR_DUP_PATH") or None
+# "offer" shows a prior analysis in the UI, "auto" uses it instead of calling the model, "off" disables reuse.
+MODE = os.environ.get("ATS_NEAR_DUP_MODE", "offer").lower()
+MODES = ("off", "offer", "auto")
+
+# Universal hashing modulo a Mersenne prime; products of 31- and 32-bit values fit in uint64.
+_PRIME = (1 << 31) - 1
+_SIGNATURE_MEMO_ENTRIES = 256
+
+
+def shingles(text, words=SHINGLE_WORDS):
+    """
+    Return the set of hashed ``words``-word shingles of ``text``. Case,
+    punctuation and layout are ignored, so PDF renderings of the same
+    resume produce the same shingles.
+    """
+    tokens = TOKEN_PATTERN.findall((text or "").lower())
+    if len(tokens) < words:
+        return {zlib.crc32(" ".join(tokens).encode("utf-8"))} if tokens else set()
+    return {zlib.crc32(" ".join(tokens[i:i + words]).encode("utf-8")) for i in range(len(tokens) - words + 1)}
+
+
+class MinHasher:
+    def __init__(self, num_perm=NUM_PERM, seed=1):
+        import numpy as np
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        self._a = rng.integers(1, _PRIME, num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, _PRIME, num_perm, dtype=np.uint64)
+
+    def signature(self, text):
+        """
+        MinHash signature of ``text`` as a tuple of ``num_perm`` ints, or None
+        when the text has no words.
+        """
+        import numpy as np
+        values = shingles(text)
+        if not values:
+            return None
+        x = np.fromiter(values, dtype=np.uint64, count=len(values))
+        hashed = (np.outer(self._a, x) + self._b[:, None]) % np.uint64(_PRIME)
+        return tuple(hashed.min(axis=1).tolist())
+
+
+def similarity(signature_a, signature_b):
+    """
+    Estimated Jaccard similarity of the texts behind two signatures.
+    """
+    same = sum(1 for a, b in zip(signature_a, signature_b) if a == b)
+    return same / len(signature_a)
+
+
+class LSHIndex:
+    """
+    Banded LSH over MinHash signatures. Keys are only compared with keys in
+    the same ``namespace`` that share at least one band.
+    """
+
+    def __init__(self, num_perm=NUM_PERM, bands=BANDS):
+        if num_perm % bands:
+            raise ValueError("the number of permutations must be a multiple of the number of bands")
+        self.rows = num_perm // bands
+        self.bands = bands
+        self.signatures = {}
+        self._buckets = defaultdict(set)
+
+    def _band_keys(self, namespace, signature):
+        rows = self.rows
+        return [(namespace, band, hash(signature[band * rows:(band + 1) * rows])) for band in range(self.bands)]
+
+    def add(self, key, signature, namespace=""):
+        self.remove(key, namespace)
+        self.signatures[namespace, key] = signature
+        for band_key in self._band_keys(namespace, signature):
+            self._buckets[band_key].add(key)
+
+    def remove(self, key, namespace=""):
+        signature = self.signatures.pop((namespace, key), None)
+        if signature is None:
+            return
+        for band_key in self._band_keys(namespace, signature):
+            bucket = self._buckets.get(band_key)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del self._buckets[band_key]
+
+    def query(self, signature, threshold=THRESHOLD, namespace=""):
+        """
+        Return ``[(key, similarity), ...]`` of stored signatures at or above
+        ``threshold``, most similar first.
+        """
+        candidates = set()
+        for band_key in self._band_keys(namespace, signature):
+            candidates.update(self._buckets.get(band_key, ()))
+        matches = []
+        for key in candidates:
+            score = similarity(signature, self.signatures[namespace, key])
+            if score >= threshold:
+                matches.append((key, score))
+        matches.sort(key=lambda match: -match[1])
+        return matches
+
+
+def duplicate_clusters(texts, threshold=THRESHOLD, hasher=None):
+    """
+    Group ``{id: text}`` into clusters of near-duplicates. Returns a list of
+    id lists with more than one member, each in the order of ``texts``.
+    """
+    hasher = hasher or analysis_reuse.hasher
+    index = LSHIndex(hasher.num_perm)
+    order = {key: position for position, key in enumerate(texts)}
+    parent = {}
+
+    def find(key):
+        while parent[key] != key:
+            parent[key] = parent[parent[key]]
+            key = parent[key]
+        return key
+
+    for key, text in texts.items():
+        signature = hasher.signature(text)
+        if signature is None:
+            continue
+        parent[key] = key
+        for other, _ in index.query(signature, threshold):
+            root, other_root = find(key), find(other)
+            if root != other_root:
+                # The earliest member stays the root, so it represents the cluster.
+                first, second = sorted((root, other_root), key=order.get)
+                parent[second] = first
+        index.add(key, signature)
+    clusters = defaultdict(list)
+    for key in texts:
+        if key in parent:
+            clusters[find(key)].append(key)
+    return [members for members in clusters.values() if len(members) > 1]
+
+
+def coverage(resume_text, jd_text):
+    """
+    The job description keywords and taxonomy skills found in the resume,
+    as a sorted list; prior analyses are only reused while it is unchanged.
+    """
+    from scoring import score_resume
+    result = score_resume(resume_text, jd_text)
+    return sorted(set(result["matched_keywords"]) | {f"skill:{skill}" for skill in result["matched_skills"]})
+
+
+def _normalized_key(text):
+    # Job descriptions differing only in case or whitespace share prior analyses.
+    return hashlib.sha256(" ".join((text or "").lower().split()).encode("utf-8")).hexdigest()
+
+
+class AnalysisReuse:
+    """
+    Prior analyses by job description and resume, found again for near-duplicate resumes.
+    """
+
+    def __init__(self, threshold=THRESHOLD, max_entries=MAX_ENTRIES, path=STORE_PATH, num_perm=NUM_PERM):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.path = path
+        self.num_perm = num_perm
+        self.index = LSHIndex(num_perm)
+        self._hasher = None
+        self.lookups = 0
+        self.hits = 0
+        self.exact_hits = 0
+        self._entries = OrderedDict()
+        self._signatures = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+        if path:
+            self._open(path)
+
+    def _open(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS analyses (
+                namespace TEXT NOT NULL,
+                resume_key TEXT NOT NULL,
+                signature TEXT NOT NULL,
+                coverage TEXT NOT NULL,
+                value TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                PRIMARY KEY (namespace, resume_key)
+            )"""
+        )
+        # Rows beyond the newest max_entries (e.g. after lowering the limit) are never loaded, so they are dropped.
+        self._conn.execute(
+            "DELETE FROM analyses WHERE rowid NOT IN "
+            "(SELECT rowid FROM analyses ORDER BY created_at DESC LIMIT ?)",
+            (self.max_entries,),
+        )
+        self._conn.commit()
+        rows = self._conn.execute(
+            "SELECT namespace, resume_key, signature, coverage, value FROM analyses ORDER BY created_at DESC",
+        ).fetchall()
+        for namespace, resume_key, signature, matched, value in reversed(rows):
+            signature = tuple(json.loads(signature))
+            self._entries[namespace, resume_key] = (json.loads(matched), json.loads(value))
+            self.index.add(resume_key, signature, namespace)
+
+    @property
+    def hasher(self):
+        # Created on first use so that importing this module does not import numpy.
+        if self._hasher is None:
+            self._hasher = MinHasher(self.num_perm)
+        return self._hasher
+
+    def signature(self, text):
+        # Streamlit reruns look up the same resume repeatedly; its signature is memoized by content hash.
+        key = hashlib.sha256((text or "").encode("utf-8")).hexdigest()
+        with self._lock:
+            if key in self._signatures:
+                self._signatures.move_to_end(key)
+                return key, self._signatures[key]
+        signature = self.hasher.signature(text)
+        with self._lock:
+            self._signatures[key] = signature
+            if len(self._signatures) > _SIGNATURE_MEMO_ENTRIES:
+                self._signatures.popitem(last=False)
+        return key, signature
+
+    def find(self, resume_text, jd_text, kind="report"):
+        """
+        Return ``{"result", "similarity", "exact"}`` for the most similar prior
+        resume analyzed against this job description (as ``kind``), or None.
+        Near matches whose keyword and skill coverage differs from this
+        resume's are skipped.
+        """
+        resume_key, signature = self.signature(resume_text)
+        if signature is None:
+            return None
+        namespace = f"{kind}:{_normalized_key(jd_text)}"
+        with self._lock:
+            matches = self.index.query(signature, self.threshold, namespace)
+            candidates = [(key, score, self._entries[namespace, key]) for key, score in matches]
+        found = None
+        matched = None
+        for key, score, (prior_coverage, result) in candidates:
+            if key != resume_key:
+                if matched is None:
+                    matched = coverage(resume_text, jd_text)
+                if prior_coverage != matched:
+                    continue
+            found = key, score, result
+            break
+        with self._lock:
+            self.lookups += 1
+            if found is None:
+                outcome = "miss"
+            else:
+                key, score, result = found
+                if (namespace, key) in self._entries:
+                    self._entries.move_to_end((namespace, key))
+                self.hits += 1
+                exact = key == resume_key
+                if exact:
+                    self.exact_hits += 1
+                outcome = "exact" if exact else "near"
+        increment(f"near_duplicate_lookups_total|outcome={outcome}")
+        if found is None:
+            return None
+        return {"result": result, "similarity": round(score, 3), "exact": exact}
+
+    def remember(self, resume_text, jd_text, result, kind="report"):
+        """
+        Store ``result`` (JSON-serializable) as the analysis of this resume against this job description.
+        """
+        resume_key, signature = self.signature(resume_text)
+        if signature is None or not result:
+            return
+        namespace = f"{kind}:{_normalized_key(jd_text)}"
+        matched = coverage(resume_text, jd_text)
+        evicted = []
+        with self._lock:
+            self._entries[namespace, resume_key] = (matched, result)
+            self._entries.move_to_end((namespace, resume_key))
+            self.index.add(resume_key, signature, namespace)
+            while len(self._entries) > self.max_entries:
+                (old_namespace, old_key), _ = self._entries.popitem(last=False)
+                self.index.remove(old_key, old_namespace)
+                evicted.append((old_namespace, old_key))
+            if self._conn is not None:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO analyses VALUES (?, ?, ?, ?, ?, ?)",
+                    (namespace, resume_key, json.dumps(signature), json.dumps(matched), json.dumps(result),
+                     time.time()),
+                )
+                self._conn.executemany("DELETE FROM analyses WHERE namespace = ? AND resume_key = ?", evicted)
+                self._conn.commit()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "lookups": self.lookups,
+                "hits": self.hits,
+                "exact_hits": self.exact_hits,
+                "hit_rate": round(self.hits / self.lookups, 4) if self.lookups else 0.0,
+            }
+
+
+analysis_reuse = AnalysisReuse()
@@ -0,0 +1,166 @@
+"""
+Token budgeting and compaction for analysis and boost prompts.
+
+Each prompt component (resume, job description, analysis report) is
+measured, and when their total exceeds the configured budget they are
+compacted: job-description boilerplate such as EEO statements and
+benefits sections is dropped, analysis reports are trimmed to their
+actionable items, and remaining lines that carry none of the job
+description's keywords are removed until the prompt fits. Lines that
+contain a required keyword are never removed, and prompts that rewrite the
+resume keep all of it.
+"""
+import os
+import re
+import threading
+
+from scoring import extract_keywords, tokenize
+
+PROMPT_BUDGET_TOKENS = int(os.environ.get("ATS_PROMPT_BUDGET_TOKENS", 6000))
+# Rough characters-per-token ratio for English text with Gemini's tokenizer.
+CHARS_PER_TOKEN = 4.0
+
+BOILERPLATE_HEADINGS = re.compile(
+    r"^\W*(equal (employment )?opportunity|eeo|benefits|perks|what we offer|compensation|salary|"
+    r"about (us|the company)|who we are|our values|how to apply|diversity|accommodations?|"
+    r"privacy notice|disclaimer)\b",
+    re.IGNORECASE,
+)
+# Whole words and phrases only, so that e.g. a dental practice's own requirements are kept.
+BOILERPLATE_LINES = re.compile(
+    r"\b(equal opportunity employer|without regard to (race|age|sex|gender)|reasonable accommodations?|"
+    r"e-verify|protected veterans?|401\(?k\)?|paid time off|health insurance|"
+    r"dental (insurance|plans?|coverage|benefits)|dental,? (and )?vision|vision (insurance|plans?|coverage)|"
+    r"background checks?|privacy policy|we are proud to be)(?!\w)",
+    re.IGNORECASE,
+)
+ACTIONABLE_LINE = re.compile(
+    r"^\s*(?:[-*•]|\d+[.)])|\b(ats score|missing|add(s|ed|ing)?|includ(e|es|ed|ing)|recommend\w*|improv\w*|"
+    r"consider\w*|replac\w*|quantif\w*|highlight\w*|emphasi[sz]\w*|remov\w*|keywords?)\b",
+    re.IGNORECASE,
+)
+
+_stats_lock = threading.Lock()
+budget_stats = {"prompts": 0, "compacted": 0, "tokens_before": 0, "tokens_after": 0}
+
+
+def count_tokens(text):
+    """
+    Estimate the number of tokens in ``text`` without a network round trip.
+    """
+    if not text:
+        return 0
+    return int(len(text) / CHARS_PER_TOKEN) + 1
+
+
+def _trailing_whitespace(match):
+    # Two or more trailing spaces after text are a Markdown hard line break.
+    if match.group(1) and match.group(2).startswith("  "):
+        return match.group(1) + "  \n"
+    return match.group(1) + "\n"
+
+
+def normalize_whitespace(text):
+    # Collapse runs of spaces and blank lines; ATS text extraction produces plenty of both.
+    # Leading indentation is kept because it encodes nested Markdown lists, and
+    # trailing double spaces because they are Markdown hard line breaks.
+    text = re.sub(r"(?<=\S)[ \t\u00a0]{2,}(?=\S)", " ", text)
+    text = re.sub(r"(\S?)([ \t\u00a0]+)\n", _trailing_whitespace, text)
+    return re.sub(r"\n{3,}", "\n\n", text).strip()
+
+
+def strip_boilerplate(jd_text):
+    """
+    Remove EEO, benefits, company-blurb and similar sections from a job description.
+    A boilerplate section runs from its heading to the next blank line.
+    """
+    kept = []
+    skipping = False
+    for line in jd_text.splitlines():
+        stripped = line.strip()
+        if BOILERPLATE_HEADINGS.match(stripped.lstrip("#").strip()) and len(stripped.split()) <= 8:
+            skipping = True
+            continue
+        if skipping:
+            if not stripped:
+                skipping = False
+            continue
+        if BOILERPLATE_LINES.search(stripped):
+            continue
+        kept.append(line)
+    return "\n".join(kept)
+
+
+def actionable_report(report_text):
+    """
+    Trim an analysis report to its score line and actionable items.
+    """
+    lines = [line for line in report_text.splitlines() if ACTIONABLE_LINE.search(line)]
+    return "\n".join(lines) if lines else report_text
+
+
+def _line_has_keyword(line, required):
+    tokens = tokenize(line)
+    if required & set(tokens):
+        return True
+    bigrams = {f"{a} {b}" for a, b in zip(tokens, tokens[1:])}
+    return bool(required & bigrams)
+
+
+def trim_to_budget(text, max_tokens, required):
+    """
+    Drop lines without any required keyword, from the bottom up, until
+    ``text`` fits in ``max_tokens``. Headings and keyword lines are kept.
+    """
+    if count_tokens(text) <= max_tokens:
+        return text
+    lines = text.splitlines()
+    removable = [
+        i for i, line in enumerate(lines)
+        if line.strip() and not line.lstrip().startswith("#") and not _line_has_keyword(line, required)
+    ]
+    excess_chars = len(text) - max_tokens * CHARS_PER_TOKEN
+    dropped = set()
+    for i in reversed(removable):
+        if excess_chars <= 0:
+            break
+        dropped.add(i)
+        excess_chars -= len(lines[i]) + 1
+    return "\n".join(line for i, line in enumerate(lines) if i not in dropped)
+
+
+def fit_prompt_inputs(resume_text, jd_text, report_text=None, budget=None, keep_resume=False):
+    """
+    Return ``(resume_text, jd_text, report_text, usage)`` compacted to fit the
+    token budget. ``usage`` maps each component to its token count before and
+    after compaction. Inputs already within budget are only whitespace-normalized.
+
+    With ``keep_resume`` no resume line is dropped and only the job description
+    and report are compacted. Prompts whose output replaces the resume need
+    this, or the model would rewrite a resume that is missing content.
+    """
+    budget = budget or PROMPT_BUDGET_TOKENS
+    components = {"resume": resume_text or "", "jd": jd_text or "", "report": report_text or ""}
+    before = {name: count_tokens(text) for name, text in components.items()}
+    texts = {name: normalize_whitespace(text) for name, text in components.items()}
+    compacted = sum(count_tokens(t) for t in texts.values()) > budget
+    if compacted:
+        texts["jd"] = normalize_whitespace(strip_boilerplate(texts["jd"]))
+        if texts["report"]:
+            texts["report"] = actionable_report(texts["report"])
+        required = set(extract_keywords(texts["jd"])[0])
+        # The report is already reduced to actionable items; the JD and then the
+        # resume are trimmed, each keeping at least its proportional share of the rest.
+        remaining = max(budget - count_tokens(texts["report"]), 0)
+        sizes = {name: count_tokens(texts[name]) for name in ("jd", "resume")}
+        for name in (("jd",) if keep_resume else ("jd", "resume")):
+            other = "resume" if name == "jd" else "jd"
+            share = max(remaining - count_tokens(texts[other]), remaining * sizes[name] // max(sum(sizes.values()), 1))
+            texts[name] = trim_to_budget(texts[name], share, required)
+    usage = {name: {"before": before[name], "after": count_tokens(texts[name])} for name in texts}
+    with _stats_lock:
+        budget_stats["prompts"] += 1
+        budget_stats["compacted"] += int(compacted)
+        budget_stats["tokens_before"] += sum(before.values())
+        budget_stats["tokens_after"] += sum(u["after"] for u in usage.values())
+    return texts["resume"], texts["jd"], (texts["report"] if report_text is not None else None), usage
@@ -0,0 +1,237 @@
+"""
+Markdown rendering for resume downloads.
+
+``markdown_to_docx`` converts a resume in Markdown to a Word document in a
+single pass over its lines: headings, bullet and numbered lists (nested by
+indentation), and inline bold, italic, code and links. Paragraph styles are
+resolved to style ids once per document and set directly, which avoids
+python-docx's per-paragraph style lookup by name.
+
+``render`` memoizes rendered documents by content hash and format in a
+bounded process-wide LRU, so repeated reruns and sessions downloading the
+same resume render it only once.
+"""
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict
+from io import BytesIO
+
+MAX_ENTRIES = int(os.environ.get("ATS_RENDER_CACHE_ENTRIES", 128))
+MAX_BYTES = int(os.environ.get("ATS_RENDER_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+
+HEADING = re.compile(r"^(#{1,6})\s+(.*?)[\s#]*$")
+LIST_ITEM = re.compile(r"^([ \t]*)([-*+•]|\d+[.)])\s+(.*)$")
+RULE = re.compile(r"^\s*([-*_])(?:\s*\1){2,}\s*$")
+INLINE = re.compile(
+    r"(\*\*\*|___)(.+?)\1"                                    # bold italic
+    r"|(\*\*|__)(.+?)\3"                                      # bold
+    r"|(?<![\w*])([*_])(?![\s*_])(.+?)(?<![\s\\])\5(?![\w*])"  # italic
+    r"|`([^`]+)`"                                             # code
+    r"|\[([^\]]+)\]\(([^)\s]+)\)"                             # link
+)
+ESCAPED = re.compile(r"\\([\\`*_{}\[\]()#+\-.!|])")
+# Deepest list level with its own style in the default template ("List Bullet 3").
+MAX_LIST_LEVEL = 2
+LINK_COLOR = "0563C1"
+
+
+class _DocxWriter:
+    def __init__(self):
+        from docx import Document
+        self.document = Document()
+        self._style_ids = {}
+        self._list_indents = []
+
+    def _style_id(self, name):
+        style_id = self._style_ids.get(name)
+        if style_id is None:
+            style_id = self._style_ids[name] = self.document.styles[name].style_id
+        return style_id
+
+    def paragraph(self, text, style=None):
+        paragraph = self.document.add_paragraph()
+        if style:
+            paragraph._p.get_or_add_pPr().style = self._style_id(style)
+        if text:
+            self.inline(paragraph, text)
+        return paragraph
+
+    def list_level(self, indent):
+        # Track the indentation of open list levels so any consistent indent width nests.
+        while self._list_indents and indent < self._list_indents[-1]:
+            self._list_indents.pop()
+        if not self._list_indents or indent > self._list_indents[-1]:
+            self._list_indents.append(indent)
+        return min(len(self._list_indents) - 1, MAX_LIST_LEVEL)
+
+    def end_list(self):
+        self._list_indents = []
+
+    def inline(self, paragraph, text, bold=False, italic=False):
+        position = 0
+        for match in INLINE.finditer(text):
+            if match.start() > position:
+                self.run(paragraph, text[position:match.start()], bold, italic)
+            if match.group(2) is not None:
+                self.inline(paragraph, match.group(2), True, True)
+            elif match.group(4) is not None:
+                self.inline(paragraph, match.group(4), True, italic)
+            elif match.group(6) is not None:
+                self.inline(paragraph, match.group(6), bold, True)
+            elif match.group(7) is not None:
+                run = self.run(paragraph, match.group(7), bold, italic, unescape=False)
+                run.font.name = "Courier New"
+            else:
+                self.hyperlink(paragraph, ESCAPED.sub(r"\1", match.group(8)), match.group(9), bold, italic)
+            position = match.end()
+        if position < len(text):
+            self.run(paragraph, text[position:], bold, italic)
+
+    def run(self, paragraph, text, bold, italic, unescape=True):
+        run = paragraph.add_run(ESCAPED.sub(r"\1", text) if unescape else text)
+        if bold:
+            run.bold = True
+        if italic:
+            run.italic = True
+        return run
+
+    def hyperlink(self, paragraph, text, url, bold, italic):
+        from docx.opc.constants import RELATIONSHIP_TYPE
+        from docx.oxml import OxmlElement
+        from docx.oxml.ns import qn
+        rel_id = paragraph.part.relate_to(url, RELATIONSHIP_TYPE.HYPERLINK, is_external=True)
+        link = OxmlElement("w:hyperlink")
+        link.set(qn("r:id"), rel_id)
+        run = OxmlElement("w:r")
+        properties = OxmlElement("w:rPr")
+        # Run properties must follow the schema order: b, i, color, u.
+        if bold:
+            properties.append(OxmlElement("w:b"))
+        if italic:
+            properties.append(OxmlElement("w:i"))
+        for tag, value in (("w:color", LINK_COLOR), ("w:u", "single")):
+            element = OxmlElement(tag)
+            element.set(qn("w:val"), value)
+            properties.append(element)
+        run.append(properties)
+        node = OxmlElement("w:t")
+        node.text = text
+        node.set(qn("xml:space"), "preserve")
+        run.append(node)
+        link.append(run)
+        paragraph._p.append(link)
+
+    def save(self):
+        f = BytesIO()
+        self.document.save(f)
+        return f.getvalue()
+
+
+def markdown_to_docx(markdown_text):
+    """
+    Convert Markdown text to DOCX bytes in a single pass over its lines.
+    """
+    writer = _DocxWriter()
+    previous_blank = False
+    for line in (markdown_text or "").splitlines():
+        if not line.strip() or RULE.match(line):
+            # Runs of blank lines collapse into one empty paragraph.
+            if not previous_blank:
+                writer.paragraph("")
+            previous_blank = True
+            writer.end_list()
+            continue
+        previous_blank = False
+        heading = HEADING.match(line.strip())
+        if heading:
+            writer.end_list()
+            writer.paragraph(heading.group(2), f"Heading {min(len(heading.group(1)), 3)}")
+            continue
+        item = LIST_ITEM.match(line)
+        if item:
+            indent = len(item.group(1).expandtabs(4))
+            level = writer.list_level(indent)
+            kind = "List Number" if item.group(2)[0].isdigit() else "List Bullet"
+            writer.paragraph(item.group(3).strip(), kind if level == 0 else f"{kind} {level + 1}")
+            continue
+        writer.end_list()
+        writer.paragraph(line.strip())
+    return writer.save()
+
+
+def markdown_to_html(markdown_text):
+    import markdown
+    return markdown.markdown(markdown_text or "")
+
+
+RENDERERS = {"docx": markdown_to_docx, "html": markdown_to_html}
+
+
+def render_key(markdown_text, output_format):
+    digest = hashlib.sha256((markdown_text or "").encode("utf-8")).hexdigest()
+    return f"{output_format}-{digest}"
+
+
+class RenderCache:
+    """
+    Bounded in-memory LRU of rendered documents, keyed by content hash and format.
+    """
+
+    def __init__(self, max_entries=MAX_ENTRIES, max_bytes=MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+            return None
+
+    def set(self, key, content):
+        size = len(content)
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= len(self._entries.pop(key))
+            self._entries[key] = content
+            self._bytes += size
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+            }
+
+
+render_cache = RenderCache()
+
+
+def render(markdown_text, output_format, renderer=None):
+    """
+    Return ``markdown_text`` rendered as ``output_format`` ("docx" or "html"),
+    from the render cache when it was rendered before. ``renderer`` overrides
+    the default converter for the format.
+    """
+    key = render_key(markdown_text, output_format)
+    content = render_cache.get(key)
+    if content is None:
+        content = (renderer or RENDERERS[output_format])(markdown_text)
+        render_cache.set(key, content)
+    return content
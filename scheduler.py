@@ -0,0 +1,391 @@
+"""
+Rate-limit-aware scheduling of Gemini calls.
+
+Every call is admitted through two token buckets per model id, one for
+requests per minute and one for tokens per minute, refilled continuously so
+traffic is spread evenly at the quota ceiling instead of bursting into it and
+being throttled. Callers wait in priority lanes: interactive UI calls are
+admitted before batch work queued for the same model. Throttled (429) and
+transient (5xx, timeout, connection) failures are retried with jittered
+exponential backoff within the call's deadline; a 429 also empties the request
+bucket so every caller pauses, not just the one that was rejected. Repeated
+transient failures open a per-model circuit breaker, which fails calls fast
+until a single probe call succeeds again; a probe keeps its slot across its
+own retries and hands it to the next call when it gives up.
+"""
+import contextvars
+import heapq
+import itertools
+import math
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+INTERACTIVE, BATCH = 0, 1
+LANES = {"interactive": INTERACTIVE, "batch": BATCH}
+
+# Quotas of the model's tier; 0 disables the corresponding limit.
+REQUESTS_PER_MINUTE = float(os.environ.get("ATS_GEMINI_RPM", 2000))
+TOKENS_PER_MINUTE = float(os.environ.get("ATS_GEMINI_TPM", 4_000_000))
+# Bucket capacity in seconds of quota: how large a burst is admitted at once.
+BURST_SECONDS = float(os.environ.get("ATS_GEMINI_BURST_SECONDS", 5))
+# Output tokens reserved per call up front; the difference is settled from usage metadata.
+EXPECTED_OUTPUT_TOKENS = int(os.environ.get("ATS_GEMINI_EXPECTED_OUTPUT_TOKENS", 1024))
+MAX_RETRIES = int(os.environ.get("ATS_GEMINI_MAX_RETRIES", 4))
+BACKOFF_BASE = float(os.environ.get("ATS_GEMINI_BACKOFF_BASE", 1.0))
+BACKOFF_MAX = float(os.environ.get("ATS_GEMINI_BACKOFF_MAX", 30.0))
+CALL_DEADLINE = float(os.environ.get("ATS_GEMINI_DEADLINE", 120))
+BREAKER_FAILURES = int(os.environ.get("ATS_GEMINI_BREAKER_FAILURES", 5))
+BREAKER_RESET = float(os.environ.get("ATS_GEMINI_BREAKER_RESET", 30))
+
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+_lane = contextvars.ContextVar("ats_request_lane", default=INTERACTIVE)
+_END = object()
+
+
+class SchedulerError(RuntimeError):
+    """Base class for calls rejected by the scheduler itself."""
+
+
+class CircuitOpen(SchedulerError):
+    """Raised without calling Gemini while the model's circuit breaker is open."""
+
+    def __init__(self, model_id, retry_after):
+        super().__init__(f"Gemini ({model_id}) is temporarily unavailable; retry in {math.ceil(retry_after)}s")
+        self.retry_after = retry_after
+
+
+class DeadlineExceeded(SchedulerError):
+    """Raised when a call cannot be admitted or retried before its deadline."""
+
+
+@contextmanager
+def lane(priority):
+    """
+    Schedule Gemini calls made in this context in ``priority`` lane (INTERACTIVE or BATCH).
+    """
+    token = _lane.set(priority)
+    try:
+        yield
+    finally:
+        _lane.reset(token)
+
+
+def current_lane():
+    return _lane.get()
+
+
+def error_status(error):
+    """
+    Return the HTTP status carried by an SDK or transport exception, if any.
+    """
+    for attr in ("code", "status_code"):
+        value = getattr(error, attr, None)
+        if isinstance(value, int):
+            return int(value)
+    value = getattr(getattr(error, "response", None), "status_code", None)
+    return value if isinstance(value, int) else None
+
+
+def _retry_after(error):
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("Retry-After"))
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    def __init__(self, per_minute, burst_seconds=BURST_SECONDS):
+        self.rate = per_minute / 60.0
+        self.capacity = max(self.rate * burst_seconds, 1.0)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount, now):
+        """
+        Seconds until ``amount`` can be taken; a request larger than the bucket
+        only needs a full bucket and leaves it in debt.
+        """
+        if self.rate <= 0:
+            return 0.0
+        self._refill(now)
+        needed = min(amount, self.capacity)
+        return 0.0 if self.tokens >= needed else (needed - self.tokens) / self.rate
+
+    def take(self, amount, now):
+        if self.rate > 0:
+            self._refill(now)
+            self.tokens -= amount
+
+    def drain(self):
+        self.tokens = min(self.tokens, 0.0)
+
+
+class CircuitBreaker:
+    def __init__(self, failures=BREAKER_FAILURES, reset_after=BREAKER_RESET):
+        self.threshold = failures
+        self.reset_after = reset_after
+        self.state = CLOSED
+        self.failures = 0
+        self.opened = 0.0
+        self.trips = 0
+        self._probing = False
+
+    def retry_in(self, now):
+        return max(self.opened + self.reset_after - now, 0.0)
+
+    def allow(self, now):
+        """
+        Return whether a call may go ahead; after ``reset_after`` an open breaker
+        lets a single probe call through.
+        """
+        if self.state == OPEN and self.retry_in(now) <= 0:
+            self.state = HALF_OPEN
+            self._probing = False
+        if self.state == HALF_OPEN and not self._probing:
+            self._probing = True
+            return True
+        return self.state == CLOSED
+
+    def success(self):
+        self.state = CLOSED
+        self.failures = 0
+        self._probing = False
+
+    def abandon(self):
+        # The probe never reached the service; let the next call probe instead.
+        if self.state == HALF_OPEN:
+            self._probing = False
+
+    def failure(self, now):
+        self.failures += 1
+        if self.state == HALF_OPEN or (self.threshold and self.failures >= self.threshold):
+            self.state = OPEN
+            self.opened = now
+            self.trips += 1
+            self._probing = False
+
+
+class _ModelState:
+    def __init__(self, requests_per_minute, tokens_per_minute, burst_seconds, breaker_failures, breaker_reset):
+        self.requests = TokenBucket(requests_per_minute, burst_seconds)
+        self.tokens = TokenBucket(tokens_per_minute, burst_seconds)
+        self.breaker = CircuitBreaker(breaker_failures, breaker_reset)
+        self.waiting = []
+
+
+class RequestScheduler:
+    """
+    Admits, retries and fails fast Gemini calls per model id; see the module docstring.
+    """
+
+    def __init__(self, requests_per_minute=REQUESTS_PER_MINUTE, tokens_per_minute=TOKENS_PER_MINUTE,
+                 burst_seconds=BURST_SECONDS, max_retries=MAX_RETRIES, backoff_base=BACKOFF_BASE,
+                 backoff_max=BACKOFF_MAX, deadline=CALL_DEADLINE, breaker_failures=BREAKER_FAILURES,
+                 breaker_reset=BREAKER_RESET):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.burst_seconds = burst_seconds
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.deadline = deadline
+        self.breaker_failures = breaker_failures
+        self.breaker_reset = breaker_reset
+        self._models = {}
+        self._sequence = itertools.count()
+        self._cond = threading.Condition()
+        self._stats = {
+            "calls": 0,
+            "retries": 0,
+            "throttled": 0,
+            "failures": 0,
+            "rejected": 0,
+            "deadline_exceeded": 0,
+            "wait_seconds": 0.0,
+        }
+
+    def _state(self, model_id):
+        state = self._models.get(model_id)
+        if state is None:
+            state = self._models[model_id] = _ModelState(
+                self.requests_per_minute, self.tokens_per_minute, self.burst_seconds,
+                self.breaker_failures, self.breaker_reset,
+            )
+        return state
+
+    def _admit(self, model_id, cost, priority, deadline, probing=False):
+        """
+        Wait for quota and return whether the call holds the half-open breaker's
+        probe slot; ``probing`` says it already held it on a previous attempt.
+        """
+        entry = (priority, next(self._sequence))
+        started = time.monotonic()
+        with self._cond:
+            state = self._state(model_id)
+            # A retrying probe is not gated again, unless another failure re-opened the breaker.
+            if not (probing and state.breaker.state == HALF_OPEN):
+                if not state.breaker.allow(started):
+                    self._stats["rejected"] += 1
+                    raise CircuitOpen(model_id, state.breaker.retry_in(started))
+                probing = state.breaker.state == HALF_OPEN
+            heapq.heappush(state.waiting, entry)
+            try:
+                while True:
+                    now = time.monotonic()
+                    delay = None
+                    # Only the head of the queue may take quota, so a batch call never
+                    # overtakes an interactive one waiting for the same model.
+                    if state.waiting[0] == entry:
+                        delay = max(state.requests.wait_time(1, now), state.tokens.wait_time(cost, now))
+                        if delay <= 0:
+                            state.requests.take(1, now)
+                            state.tokens.take(cost, now)
+                            self._stats["calls"] += 1
+                            self._stats["wait_seconds"] += now - started
+                            return probing
+                    remaining = deadline - now
+                    if remaining <= 0:
+                        if probing:
+                            state.breaker.abandon()
+                        self._stats["deadline_exceeded"] += 1
+                        raise DeadlineExceeded(f"Gemini ({model_id}) call not admitted before its deadline")
+                    self._cond.wait(remaining if delay is None else min(delay, remaining))
+            finally:
+                state.waiting.remove(entry)
+                heapq.heapify(state.waiting)
+                self._cond.notify_all()
+
+    def _backoff(self, model_id, error, attempt, deadline, probing=False):
+        """
+        Record a failed attempt and return the delay before retrying it, or
+        ``None`` if ``error`` should be raised to the caller. ``probing`` says
+        the attempt held the half-open breaker's probe slot.
+        """
+        status = error_status(error)
+        retryable = status in RETRYABLE_STATUS or isinstance(error, (ConnectionError, TimeoutError))
+        now = time.monotonic()
+        with self._cond:
+            state = self._state(model_id)
+            if not retryable:
+                # The service answered; the request itself was at fault.
+                state.breaker.success()
+                return None
+            self._stats["failures"] += 1
+            if status == 429:
+                self._stats["throttled"] += 1
+                state.requests.drain()
+            else:
+                state.breaker.failure(now)
+            delay = None
+            if attempt < self.max_retries and state.breaker.state != OPEN:
+                # Full jitter keeps retries from many callers from arriving in lockstep.
+                delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+                delay = max(delay, _retry_after(error) or 0.0)
+                if now + delay >= deadline:
+                    delay = None
+            if delay is None:
+                if probing:
+                    # A throttled probe proved nothing either way; the next call probes instead.
+                    state.breaker.abandon()
+                return None
+            self._stats["retries"] += 1
+            return delay
+
+    def _succeeded(self, model_id):
+        with self._cond:
+            self._state(model_id).breaker.success()
+
+    def call(self, model_id, fn, cost=1, priority=None, deadline=None):
+        """
+        Return ``fn(timeout)``, admitted within ``model_id``'s quotas and retried on
+        transient failures. ``cost`` is the estimated number of tokens, ``timeout``
+        the seconds left before the call's deadline.
+        """
+        priority = current_lane() if priority is None else priority
+        deadline = time.monotonic() + (self.deadline if deadline is None else deadline)
+        probing = False
+        for attempt in itertools.count():
+            probing = self._admit(model_id, cost, priority, deadline, probing)
+            try:
+                result = fn(max(deadline - time.monotonic(), 0.001))
+            except Exception as error:
+                delay = self._backoff(model_id, error, attempt, deadline, probing)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+                continue
+            self._succeeded(model_id)
+            return result
+
+    def stream(self, model_id, factory, cost=1, priority=None, deadline=None):
+        """
+        Yield the chunks of ``factory(timeout)`` like ``call``; a stream is only
+        retried until its first chunk arrives, so output is never repeated.
+        """
+        priority = current_lane() if priority is None else priority
+        deadline = time.monotonic() + (self.deadline if deadline is None else deadline)
+        probing = False
+        for attempt in itertools.count():
+            probing = self._admit(model_id, cost, priority, deadline, probing)
+            try:
+                chunks = iter(factory(max(deadline - time.monotonic(), 0.001)))
+                first = next(chunks, _END)
+            except Exception as error:
+                delay = self._backoff(model_id, error, attempt, deadline, probing)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+                continue
+            self._succeeded(model_id)
+            if first is not _END:
+                yield first
+                yield from chunks
+            return
+
+    def settle(self, model_id, estimated, actual):
+        """
+        Correct the token bucket once a call's real token count is known.
+        """
+        if not actual:
+            return
+        with self._cond:
+            self._state(model_id).tokens.take(actual - estimated, time.monotonic())
+
+    def describe(self, model_id):
+        now = time.monotonic()
+        with self._cond:
+            state = self._state(model_id)
+            return {
+                "state": state.breaker.state,
+                "retry_in": round(state.breaker.retry_in(now), 1) if state.breaker.state == OPEN else 0.0,
+                "waiting": len(state.waiting),
+                "requests_available": round(state.requests.tokens, 2),
+                "tokens_available": round(state.tokens.tokens),
+            }
+
+    def stats(self):
+        with self._cond:
+            stats = dict(self._stats)
+            stats["wait_seconds"] = round(stats["wait_seconds"], 3)
+            states = [state.breaker.state for state in self._models.values()]
+            stats["circuits_open"] = states.count(OPEN)
+            stats["circuits_half_open"] = states.count(HALF_OPEN)
+            stats["breaker_trips"] = sum(state.breaker.trips for state in self._models.values())
+            for name, priority in LANES.items():
+                stats[f"waiting_{name}"] = sum(
+                    1 for state in self._models.values() for entry in state.waiting if entry[0] == priority
+                )
+            return stats
+
+
+scheduler = RequestScheduler()
@@ -0,0 +1,345 @@
+"""
+Local, deterministic ATS scoring.
+
+Implements the keyword, context and structure steps of the checklist
+without an LLM round trip: keywords and phrases are extracted from the job
+description with BM25-style term weighting, matched against each resume
+section with NumPy (imported on first use), and combined with a set of ATS formatting checks into a
+0-100 score with a per-component and per-section breakdown.
+
+Term weights are TF-IDF: frequency in the job description times the inverse
+document frequency over a bundled background corpus of job postings from
+many fields (``background_jds.txt``, or ATS_IDF_CORPUS). Vocabulary every
+posting uses scores low, and the terms that set this job apart score high.
+"""
+import math
+import os
+import re
+import threading
+from collections import Counter
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9][a-z0-9+#.\-]*[a-z0-9+#]|[a-z0-9]")
+EMAIL_PATTERN = re.compile(r"[\w.+-]+@[\w-]+\.[\w.-]+")
+PHONE_PATTERN = re.compile(r"\+?\d[\d\s().-]{7,}\d")
+BULLET_PATTERN = re.compile(r"^\s*(?:[-*•▪‣◦]|\d+[.)])\s+", re.MULTILINE)
+
+STOPWORDS = frozenset("""
+a about above across after again against all also am an and any are as at be because been before being
+below between both but by can could did do does doing down during each either etc few for from further
+had has have having he her here hers him his how i if in into is it its itself just may me might more
+most must my no nor not now of off on once only or other our ours out over own per plus same she should
+so some such than that the their theirs them then there these they this those through to too under until
+up upon us very via was we well were what when where which while who whom why will with within without
+would you your yours
+""".split())
+
+# Words that appear in nearly every job description and carry little signal on their own.
+GENERIC_TERMS = frozenset("""
+ability able candidate candidates company role position job work working team teams strong excellent
+good great experience experienced years year including include includes responsibilities responsible
+requirements required preferred plus knowledge understanding skills skill looking join opportunity
+environment new using use related relevant ideal successful day based across etc e.g i.e
+""".split())
+
+SECTION_ALIASES = {
+    "summary": ("summary", "profile", "objective", "about me", "professional summary", "career objective"),
+    "experience": ("experience", "work experience", "professional experience", "employment history",
+                   "employment", "work history", "career history"),
+    "education": ("education", "academic background", "education and training", "qualifications"),
+    "skills": ("skills", "technical skills", "core competencies", "competencies", "technologies",
+               "key skills", "tools"),
+    "certifications": ("certifications", "certificates", "licenses", "licenses and certifications",
+                       "certifications and licenses"),
+    "projects": ("projects", "personal projects", "key projects", "selected projects"),
+    "achievements": ("achievements", "awards", "honors", "accomplishments", "honors and awards"),
+    "hobbies": ("hobbies", "interests", "hobbies and interests"),
+}
+_ALIAS_TO_SECTION = {alias: name for name, aliases in SECTION_ALIASES.items() for alias in aliases}
+
+# Sections where a JD keyword counts as used in context rather than merely mentioned.
+CONTEXT_SECTIONS = frozenset(("summary", "experience", "skills", "projects", "certifications"))
+
+COMPONENT_WEIGHTS = {"keyword_match": 0.55, "context": 0.15, "structure": 0.30}
+MAX_UNIGRAMS = 40
+MAX_PHRASES = 15
+BM25_K1 = 1.2
+BM25_B = 0.75
+REFERENCE_RESUME_TOKENS = 500
+IDF_CORPUS_PATH = os.environ.get("ATS_IDF_CORPUS") or os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "background_jds.txt")
+
+
+def tokenize(text):
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def _normalize_heading(line):
+    heading = line.strip().lstrip("#").strip().strip("*_:").strip().lower()
+    return re.sub(r"\s+", " ", heading.replace("&", "and"))
+
+
+def _heading(line):
+    # Return (name, markdown_level) for a heading line, or None. Level is 0 for
+    # a plain line that names a known section.
+    stripped = line.strip()
+    if not stripped:
+        return None
+    level = len(stripped) - len(stripped.lstrip("#"))
+    name = _normalize_heading(stripped)
+    if name in _ALIAS_TO_SECTION:
+        return _ALIAS_TO_SECTION[name], level
+    if level and name:
+        return name, level
+    return None
+
+
+def split_sections(text):
+    """
+    Split resume text into ``(section_name, body)`` pairs by its headings.
+    Known headings are mapped to canonical names (e.g. "Work History" ->
+    "experience"); text before the first heading is returned as "header".
+    Sub-headings (such as job titles under Experience) stay in their section.
+    """
+    sections = []
+    name = "header"
+    section_level = None
+    lines = []
+    for line in text.splitlines():
+        heading = _heading(line)
+        if heading is not None:
+            heading_name, level = heading
+            if heading_name not in SECTION_ALIASES and (not section_level or level > section_level):
+                heading = None
+        if heading is None:
+            lines.append(line)
+            continue
+        if lines or name != "header":
+            sections.append((name, "\n".join(lines).strip()))
+        name, section_level = heading
+        lines = []
+    sections.append((name, "\n".join(lines).strip()))
+    return [(name, body) for name, body in sections if body or name != "header"]
+
+
+def section_spans(text):
+    """
+    Return ``(section_name, start, end)`` character spans of the sections
+    ``split_sections`` would produce, each running from the end of its heading
+    line to the start of the next section heading.
+    """
+    spans = []
+    name = "header"
+    section_level = None
+    start = 0
+    offset = 0
+    for line in text.splitlines(keepends=True):
+        heading = _heading(line)
+        if heading is not None:
+            heading_name, level = heading
+            if heading_name not in SECTION_ALIASES and (not section_level or level > section_level):
+                heading = None
+        if heading is not None:
+            spans.append((name, start, offset))
+            name, section_level = heading
+            start = offset + len(line)
+        offset += len(line)
+    spans.append((name, start, offset))
+    return [span for span in spans if span[2] > span[1] or span[0] != "header"]
+
+
+def _terms(tokens):
+    # Unigrams and stopword-free bigrams of a token stream.
+    unigrams = Counter(t for t in tokens if t not in STOPWORDS and len(t) > 1 and not t.isdigit())
+    bigrams = Counter(
+        f"{a} {b}" for a, b in zip(tokens, tokens[1:])
+        if a not in STOPWORDS and b not in STOPWORDS and not (a in GENERIC_TERMS and b in GENERIC_TERMS)
+        and not a.isdigit() and not b.isdigit()
+    )
+    return unigrams, bigrams
+
+
+class BackgroundIDF:
+    """
+    Inverse document frequencies of terms and phrases over a background
+    corpus of documents separated by ``---`` lines.
+    """
+
+    def __init__(self, documents):
+        self.documents = len(documents)
+        self.document_frequency = Counter()
+        for text in documents:
+            unigrams, bigrams = _terms(tokenize(text))
+            self.document_frequency.update(unigrams.keys())
+            self.document_frequency.update(bigrams.keys())
+
+    @classmethod
+    def from_file(cls, path):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                text = f.read()
+        except OSError:
+            text = ""
+        return cls([doc for doc in re.split(r"^\s*---+\s*$", text, flags=re.MULTILINE) if doc.strip()])
+
+    def idf(self, term):
+        # BM25 IDF; terms absent from the corpus get the largest weight.
+        df = self.document_frequency.get(term, 0)
+        return math.log(1.0 + (self.documents - df + 0.5) / (df + 0.5))
+
+
+_idf = None
+_idf_lock = threading.Lock()
+
+
+def get_background_idf():
+    """
+    Return the process-wide background IDF table, loading the corpus on first use.
+    """
+    global _idf
+    if _idf is None:
+        with _idf_lock:
+            if _idf is None:
+                _idf = BackgroundIDF.from_file(IDF_CORPUS_PATH)
+    return _idf
+
+
+def extract_keywords(jd_text, max_unigrams=MAX_UNIGRAMS, max_phrases=MAX_PHRASES):
+    """
+    Return ``(keywords, weights, jd_counts)`` for the most important terms and
+    phrases of a job description. Weights grow logarithmically with JD
+    frequency and are scaled by the term's background IDF; generic
+    job-posting vocabulary is ignored.
+    """
+    import numpy as np
+    background = get_background_idf()
+    unigrams, bigrams = _terms(tokenize(jd_text))
+    candidates = []
+    for term, count in unigrams.items():
+        if term not in GENERIC_TERMS:
+            candidates.append(((1.0 + math.log(count)) * background.idf(term), term, count, 1))
+    phrases = []
+    for term, count in bigrams.items():
+        if count >= 2:
+            phrases.append((1.5 * (1.0 + math.log(count)) * background.idf(term), term, count, 2))
+    candidates.sort(key=lambda c: (-c[0], c[1]))
+    phrases.sort(key=lambda c: (-c[0], c[1]))
+    selected = candidates[:max_unigrams] + phrases[:max_phrases]
+    keywords = [term for _, term, _, _ in selected]
+    weights = np.array([weight for weight, _, _, _ in selected], dtype=float)
+    jd_counts = np.array([count for _, _, count, _ in selected], dtype=float)
+    return keywords, weights, jd_counts
+
+
+def _bm25_saturation(tf, doc_len):
+    norm = BM25_K1 * (1.0 - BM25_B + BM25_B * doc_len / REFERENCE_RESUME_TOKENS)
+    return tf * (BM25_K1 + 1.0) / (tf + norm)
+
+
+def _section_counts(sections, keywords):
+    # sections x keywords matrix of occurrence counts.
+    import numpy as np
+    index = {term: i for i, term in enumerate(keywords)}
+    counts = np.zeros((len(sections), len(keywords)), dtype=float)
+    for row, (_, body) in enumerate(sections):
+        unigrams, bigrams = _terms(tokenize(body))
+        for term, count in unigrams.items():
+            col = index.get(term)
+            if col is not None:
+                counts[row, col] = count
+        for term, count in bigrams.items():
+            col = index.get(term)
+            if col is not None:
+                counts[row, col] = count
+    return counts
+
+
+def structure_checks(resume_text, sections):
+    """
+    Run ATS formatting checks and return ``(score, checks)`` where ``checks``
+    maps each check name to whether it passed.
+    """
+    names = {name for name, _ in sections}
+    word_count = len(resume_text.split())
+    table_rows = sum(1 for line in resume_text.splitlines() if line.count("|") >= 2)
+    checks = {
+        "experience_section": ("experience" in names, 20),
+        "education_section": ("education" in names, 15),
+        "skills_section": ("skills" in names, 15),
+        "email": (bool(EMAIL_PATTERN.search(resume_text)), 10),
+        "phone": (bool(PHONE_PATTERN.search(resume_text)), 5),
+        "bullet_points": (len(BULLET_PATTERN.findall(resume_text)) >= 3, 10),
+        "length": (250 <= word_count <= 1200, 15),
+        "no_tables_or_images": (table_rows < 3 and "<table" not in resume_text.lower()
+                                and "![" not in resume_text, 10),
+    }
+    total = sum(weight for _, weight in checks.values())
+    score = 100.0 * sum(weight for passed, weight in checks.values() if passed) / total
+    return score, {name: passed for name, (passed, _) in checks.items()}
+
+
+def score_resume(resume_text, jd_text):
+    """
+    Score a resume against a job description without calling the LLM.
+
+    Returns a dict with the overall ``score`` (0-100), the ``breakdown`` per
+    scoring component, keyword coverage per resume ``sections``, the
+    ``matched_keywords`` and ``missing_keywords``, the taxonomy skills of the
+    JD as ``matched_skills`` and ``missing_skills``, and the structure ``checks``.
+    """
+    import numpy as np
+    from taxonomy import compare_skills
+    sections = split_sections(resume_text) or [("header", resume_text)]
+    keywords, weights, jd_counts = extract_keywords(jd_text)
+    structure_score, checks = structure_checks(resume_text, sections)
+
+    if keywords:
+        counts = _section_counts(sections, keywords)
+        resume_len = max(len(tokenize(resume_text)), 1)
+        # Full credit once a keyword appears as often as in the JD (capped at 3 mentions).
+        target = _bm25_saturation(np.minimum(jd_counts, 3.0), resume_len)
+        total_tf = counts.sum(axis=0)
+        coverage = np.minimum(_bm25_saturation(total_tf, resume_len) / target, 1.0)
+        weight_sum = float(weights.sum())
+        keyword_score = 100.0 * float(weights @ coverage) / weight_sum
+
+        in_context = np.array([name in CONTEXT_SECTIONS for name, _ in sections])
+        context_tf = counts[in_context].sum(axis=0) if in_context.any() else np.zeros(len(keywords))
+        matched_weight = float(weights @ (total_tf > 0))
+        if matched_weight:
+            context_fraction = float(weights @ (context_tf > 0)) / matched_weight
+            # Penalise keyword stuffing: mentions far beyond what the JD itself uses.
+            stuffed = total_tf > np.maximum(3.0 * jd_counts, 6.0)
+            stuffing = float(weights @ stuffed) / matched_weight
+            context_score = 100.0 * context_fraction * (1.0 - 0.5 * stuffing)
+        else:
+            context_score = 0.0
+
+        section_coverage = np.minimum(_bm25_saturation(counts, resume_len) / target, 1.0)
+        section_scores = 100.0 * (section_coverage @ weights) / weight_sum
+        sections_breakdown = {}
+        for (name, _), value in zip(sections, section_scores):
+            sections_breakdown[name] = round(max(sections_breakdown.get(name, 0.0), float(value)), 1)
+        matched = [kw for kw, tf in zip(keywords, total_tf) if tf > 0]
+        missing = [kw for kw, tf in zip(keywords, total_tf) if tf == 0]
+    else:
+        keyword_score = context_score = 0.0
+        sections_breakdown = {name: 0.0 for name, _ in sections}
+        matched, missing = [], []
+
+    breakdown = {
+        "keyword_match": round(keyword_score, 1),
+        "context": round(context_score, 1),
+        "structure": round(structure_score, 1),
+    }
+    score = sum(COMPONENT_WEIGHTS[name] * value for name, value in breakdown.items())
+    skills = compare_skills(resume_text, jd_text)
+    return {
+        "score": round(score, 1),
+        "breakdown": breakdown,
+        "sections": sections_breakdown,
+        "matched_keywords": matched,
+        "missing_keywords": missing,
+        "matched_skills": skills["matched"],
+        "missing_skills": skills["missing"],
+        "checks": checks,
+    }
@@ -0,0 +1,184 @@
+"""
+Section-aware incremental re-analysis.
+
+A boost or custom update usually rewrites only a few sections of a resume,
+yet a full analysis pays for the whole document every time. Here the resume
+is split into sections by its headings (``scoring.split_sections``) and each
+section is analyzed on its own against the job description. Results are
+cached by a hash of the section's content, the job description and the
+model, so re-analyzing an edited resume only calls the model for sections
+that actually changed; the per-section scores and findings are then merged
+into one weighted ATS score and report.
+"""
+import contextvars
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from scoring import split_sections
+from telemetry import increment, span
+
+MAX_ENTRIES = int(os.environ.get("ATS_SECTION_CACHE_ENTRIES", 1024))
+MAX_WORKERS = int(os.environ.get("ATS_SECTION_WORKERS", 4))
+
+# Relative weight of each section in the merged score; weights are renormalized
+# over the sections present. Sections not listed use DEFAULT_WEIGHT.
+SECTION_WEIGHTS = {
+    "experience": 0.35,
+    "skills": 0.20,
+    "summary": 0.10,
+    "education": 0.10,
+    "projects": 0.08,
+    "certifications": 0.05,
+    "achievements": 0.04,
+    "header": 0.05,
+}
+DEFAULT_WEIGHT = 0.03
+# Sections an ATS expects; each one missing costs MISSING_SECTION_PENALTY points.
+CORE_SECTIONS = ("experience", "education", "skills")
+MISSING_SECTION_PENALTY = 5.0
+
+SCORE_LINE = re.compile(r"^\W*ATS Score\b", re.IGNORECASE)
+FINDINGS_PREFIX = re.compile(r"^\W*Findings\W*:\s*", re.IGNORECASE)
+
+_executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="ats-sections")
+
+
+def section_key(model_id, name, body, jd_text):
+    """
+    Build the cache key for one section analyzed against a job description.
+    """
+    digest = hashlib.sha256()
+    for part in (model_id or "", name, body, jd_text):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\x00")
+    return digest.hexdigest()
+
+
+class SectionCache:
+    """
+    Bounded in-memory LRU of per-section analysis results.
+    """
+
+    def __init__(self, max_entries=MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+            return None
+
+    def set(self, key, result):
+        with self._lock:
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "entries": len(self._entries),
+            }
+
+
+section_cache = SectionCache()
+
+
+def _analyze_one(name, body, jd_text, analyze_section, parse_score):
+    with span("section_analysis"):
+        text = analyze_section(name, body, jd_text)
+    # The section's own score line is reported separately in the merged summary.
+    findings = "\n".join(line for line in text.splitlines() if not SCORE_LINE.match(line))
+    return {"score": parse_score(text), "findings": FINDINGS_PREFIX.sub("", findings.strip())}
+
+
+def merge_sections(results, missing=()):
+    """
+    Combine per-section results into ``(score, report)``. The report starts
+    with an "ATS Score :" line so it parses like a full analysis.
+    """
+    weights = [SECTION_WEIGHTS.get(r["name"], DEFAULT_WEIGHT) for r in results]
+    total = sum(weights)
+    score = sum(w * r["score"] for w, r in zip(weights, results)) / total if total else 0.0
+    score = max(score - MISSING_SECTION_PENALTY * len(missing), 0.0)
+    lines = [f"ATS Score : {score:.1f}", "Detailed Report:", "", "Section scores:"]
+    for r in results:
+        origin = "cached" if r["cached"] else "re-analyzed"
+        lines.append(f"- {r['name'].title()}: {r['score']:.1f} ({origin})")
+    if missing:
+        lines += ["", "Missing sections: " + ", ".join(name.title() for name in missing)]
+    for r in results:
+        lines += ["", f"### {r['name'].title()}", r["findings"].strip()]
+    return round(score, 1), "\n".join(lines)
+
+
+def analyze_incremental(resume_text, jd_text, analyze_section, parse_score, model_id="", use_cache=True):
+    """
+    Analyze ``resume_text`` section by section, calling
+    ``analyze_section(name, body, jd_text)`` only for sections whose content is
+    not cached yet (concurrently), and ``parse_score(text)`` on each result.
+
+    Returns a dict with the merged ``score`` and ``report``, the per-section
+    ``sections`` results, and how many sections were ``reanalyzed`` or ``reused``.
+    With ``use_cache`` false every section is re-analyzed (results are still stored).
+    """
+    sections = split_sections(resume_text or "")
+    results = []
+    pending = {}
+    for name, body in sections:
+        result = {"name": name, "cached": False}
+        if not body.strip():
+            result.update(score=0.0, findings="This section is empty.")
+        else:
+            key = section_key(model_id, name, body, jd_text)
+            cached = section_cache.get(key) if use_cache else None
+            if cached is not None:
+                result.update(cached, cached=True)
+            else:
+                result["key"] = key
+                # Identical sections (e.g. repeated headings) are analyzed once.
+                if key not in pending:
+                    context = contextvars.copy_context()
+                    pending[key] = _executor.submit(
+                        context.run, _analyze_one, name, body, jd_text, analyze_section, parse_score)
+        results.append(result)
+    analyzed = {key: future.result() for key, future in pending.items()}
+    for key, value in analyzed.items():
+        section_cache.set(key, value)
+    for result in results:
+        key = result.pop("key", None)
+        if key is not None:
+            result.update(analyzed[key])
+    reused = sum(1 for r in results if r["cached"])
+    increment("section_reanalyzed_total", len(results) - reused)
+    increment("section_reused_total", reused)
+    present = {r["name"] for r in results}
+    missing = [name for name in CORE_SECTIONS if name not in present]
+    score, report = merge_sections(results, missing)
+    return {
+        "score": score,
+        "report": report,
+        "sections": results,
+        "reanalyzed": len(results) - reused,
+        "reused": reused,
+    }
@@ -0,0 +1,162 @@
+"""
+Process-wide single-flight coalescing of identical in-flight requests.
+
+When several sessions send the same prompt to the same agent at the same
+time, only the first caller (the leader) actually calls Gemini; callers
+arriving while it is in flight wait for and share its result, or its
+exception. Streams are shared too: followers replay the chunks received so
+far and then receive new chunks as the leader's stream produces them. Once
+a request completes it is forgotten; later identical requests are served by
+the response cache instead.
+"""
+import threading
+
+
+class StreamAbandoned(RuntimeError):
+    """Raised to followers of a shared stream whose leader stopped before the end."""
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class _Stream:
+    def __init__(self):
+        self.chunks = []
+        self.finished = False
+        self.error = None
+        self.followers = 0
+        self.cond = threading.Condition()
+
+    def push(self, chunk):
+        with self.cond:
+            self.chunks.append(chunk)
+            self.cond.notify_all()
+
+    def finish(self, error=None):
+        with self.cond:
+            self.finished = True
+            self.error = error
+            self.cond.notify_all()
+
+    def follow(self):
+        position = 0
+        while True:
+            with self.cond:
+                while position >= len(self.chunks) and not self.finished:
+                    self.cond.wait()
+                pending = self.chunks[position:]
+                position = len(self.chunks)
+                finished, error = self.finished, self.error
+            yield from pending
+            if finished and position >= len(self.chunks):
+                if error is not None:
+                    raise error
+                return
+
+
+class SingleFlight:
+    def __init__(self):
+        self._calls = {}
+        self._streams = {}
+        self._lock = threading.Lock()
+        self._stats = {"leaders": 0, "coalesced": 0, "failures": 0}
+
+    def do(self, key, fn):
+        """
+        Return ``fn()``, sharing one execution among concurrent callers with the same ``key``.
+        A caller arriving while an identical stream is in flight gets the stream's full text.
+        """
+        with self._lock:
+            flight = self._streams.get(key)
+            if flight is not None:
+                flight.followers += 1
+                self._stats["coalesced"] += 1
+            else:
+                call = self._calls.get(key)
+                leader = call is None
+                if leader:
+                    call = self._calls[key] = _Call()
+                    self._stats["leaders"] += 1
+                else:
+                    self._stats["coalesced"] += 1
+        if flight is not None:
+            return "".join(flight.follow())
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            with self._lock:
+                self._stats["failures"] += 1
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def stream(self, key, factory):
+        """
+        Yield the chunks of ``factory()``, sharing one stream among concurrent callers with the same ``key``.
+        """
+        with self._lock:
+            flight = self._streams.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._streams[key] = _Stream()
+                self._stats["leaders"] += 1
+            else:
+                flight.followers += 1
+                self._stats["coalesced"] += 1
+        if not leader:
+            yield from flight.follow()
+            return
+        chunks = iter(factory())
+        try:
+            for chunk in chunks:
+                flight.push(chunk)
+                yield chunk
+        except GeneratorExit:
+            # Our own consumer stopped early (e.g. a cancelled job). No new followers
+            # can join once the key is removed; finish the stream for existing ones.
+            with self._lock:
+                self._streams.pop(key, None)
+                followers = flight.followers
+            if followers:
+                try:
+                    for chunk in chunks:
+                        flight.push(chunk)
+                    flight.finish()
+                except Exception as e:
+                    flight.finish(e)
+            else:
+                flight.finish(StreamAbandoned("The shared stream was abandoned"))
+            raise
+        except BaseException as e:
+            with self._lock:
+                self._stats["failures"] += 1
+            flight.finish(e)
+            raise
+        else:
+            flight.finish()
+        finally:
+            with self._lock:
+                if self._streams.get(key) is flight:
+                    del self._streams[key]
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["in_flight"] = len(self._calls) + len(self._streams)
+            return stats
+
+
+single_flight = SingleFlight()
@@ -0,0 +1,161 @@
+"""
+Schema-constrained analysis results.
+
+In structured mode the analysis agent answers with JSON matching
+``ANALYSIS_SCHEMA`` (Gemini's JSON mode with a response schema) instead of
+prose with an "ATS Score :" line to scrape. The answer is validated and
+normalized here. An answer that fails validation gets a bounded number of
+cheap repair requests, which send back only the invalid JSON and the
+validation error, not the resume and job description. Validated results are
+rendered to the Markdown report format the rest of the app already consumes.
+"""
+import json
+import os
+import re
+
+from telemetry import increment
+
+REPAIR_ATTEMPTS = int(os.environ.get("ATS_STRUCTURED_REPAIR_ATTEMPTS", 1))
+# Invalid answers longer than this are truncated in the repair prompt.
+REPAIR_MAX_CHARS = 12000
+
+ANALYSIS_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "overall_score": {"type": "NUMBER", "description": "Overall ATS score from 0 to 100"},
+        "section_scores": {
+            "type": "ARRAY",
+            "items": {
+                "type": "OBJECT",
+                "properties": {
+                    "section": {"type": "STRING"},
+                    "score": {"type": "NUMBER", "description": "Section score from 0 to 100"},
+                    "notes": {"type": "STRING"},
+                },
+                "required": ["section", "score"],
+            },
+        },
+        "missing_keywords": {"type": "ARRAY", "items": {"type": "STRING"}},
+        "recommendations": {"type": "ARRAY", "items": {"type": "STRING"}},
+    },
+    "required": ["overall_score", "section_scores", "missing_keywords", "recommendations"],
+}
+GENERATION_CONFIG = {"response_mime_type": "application/json", "response_schema": ANALYSIS_SCHEMA}
+
+CODE_FENCE = re.compile(r"^\s*```(?:json)?\s*(.*?)\s*```\s*$", re.DOTALL | re.IGNORECASE)
+
+
+class StructuredOutputError(ValueError):
+    """Raised when a structured answer is not valid JSON or does not match the schema."""
+
+
+def parse_json(text):
+    fenced = CODE_FENCE.match(text or "")
+    try:
+        return json.loads(fenced.group(1) if fenced else text or "")
+    except json.JSONDecodeError as e:
+        raise StructuredOutputError(f"invalid JSON: {e}") from None
+
+
+def _score(value, field):
+    if isinstance(value, str):
+        try:
+            value = float(value.strip().rstrip("%"))
+        except ValueError:
+            pass
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise StructuredOutputError(f"{field} must be a number")
+    if not 0 <= value <= 100:
+        raise StructuredOutputError(f"{field} must be between 0 and 100, got {value}")
+    return round(float(value), 1)
+
+
+def _strings(value, field):
+    if not isinstance(value, list) or not all(isinstance(item, str) for item in value):
+        raise StructuredOutputError(f"{field} must be a list of strings")
+    seen = []
+    for item in (item.strip() for item in value):
+        if item and item.lower() not in (s.lower() for s in seen):
+            seen.append(item)
+    return seen
+
+
+def validate_analysis(data):
+    """
+    Return ``data`` normalized to ``ANALYSIS_SCHEMA``, or raise StructuredOutputError.
+    """
+    if not isinstance(data, dict):
+        raise StructuredOutputError("the answer must be a JSON object")
+    missing = [name for name in ANALYSIS_SCHEMA["required"] if name not in data]
+    if missing:
+        raise StructuredOutputError(f"missing field(s): {', '.join(missing)}")
+    if not isinstance(data["section_scores"], list):
+        raise StructuredOutputError("section_scores must be a list")
+    sections = []
+    for i, entry in enumerate(data["section_scores"]):
+        if not isinstance(entry, dict) or not str(entry.get("section") or "").strip():
+            raise StructuredOutputError(f"section_scores[{i}] must be an object with a section name")
+        sections.append({
+            "section": str(entry["section"]).strip(),
+            "score": _score(entry.get("score"), f"section_scores[{i}].score"),
+            "notes": str(entry.get("notes") or "").strip(),
+        })
+    return {
+        "overall_score": _score(data["overall_score"], "overall_score"),
+        "section_scores": sections,
+        "missing_keywords": _strings(data["missing_keywords"], "missing_keywords"),
+        "recommendations": _strings(data["recommendations"], "recommendations"),
+    }
+
+
+def is_valid_analysis(text):
+    try:
+        validate_analysis(parse_json(text))
+    except StructuredOutputError:
+        return False
+    return True
+
+
+def repair_prompt(text, error):
+    return (f"""The JSON below does not match the required schema: {error}.
+Return only the corrected JSON object with the fields overall_score (number, 0 to 100),
+section_scores (list of {{section, score, notes}}), missing_keywords (list of strings) and
+recommendations (list of strings). Keep the original content wherever it is valid.
+
+{(text or "")[:REPAIR_MAX_CHARS]}""")
+
+
+def parse_analysis(text, repair=None, attempts=REPAIR_ATTEMPTS):
+    """
+    Validate a structured analysis answer. When it is invalid and ``repair`` is
+    given, ``repair(prompt)`` is asked to fix it, at most ``attempts`` times.
+    """
+    for attempt in range(attempts + 1):
+        try:
+            result = validate_analysis(parse_json(text))
+        except StructuredOutputError as e:
+            if repair is None or attempt == attempts:
+                increment("structured_output_total|outcome=invalid")
+                raise
+            increment("structured_output_repairs_total")
+            text = repair(repair_prompt(text, e))
+            continue
+        increment(f"structured_output_total|outcome={'repaired' if attempt else 'valid'}")
+        return result
+
+
+def report_from_analysis(analysis):
+    """
+    Render a validated analysis as the Markdown report used across the app;
+    it starts with an "ATS Score :" line like a free-text analysis.
+    """
+    lines = [f"ATS Score : {analysis['overall_score']:.1f}", "Detailed Report:", "", "**Section scores**"]
+    for entry in analysis["section_scores"]:
+        notes = f": {entry['notes']}" if entry["notes"] else ""
+        lines.append(f"- {entry['section']}: {entry['score']:.1f}{notes}")
+    if analysis["missing_keywords"]:
+        lines += ["", "**Missing keywords:** " + ", ".join(analysis["missing_keywords"])]
+    if analysis["recommendations"]:
+        lines += ["", "**Recommendations**"]
+        lines += [f"{i}. {item}" for i, item in enumerate(analysis["recommendations"], 1)]
+    return "\n".join(lines)
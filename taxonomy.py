@@ -0,0 +1,200 @@
+"""
+Skills taxonomy and single-pass phrase matching.
+
+``PhraseMatcher`` compiles any number of phrases into a trie over tokens and
+finds all of them in one left-to-right scan of a text (leftmost-longest,
+non-overlapping), so its cost grows with the length of the text rather than
+with the number of phrases. The skills taxonomy (``skills_taxonomy.json``, or
+the file named by ATS_SKILLS_TAXONOMY) maps each canonical skill to its
+synonyms and abbreviations, e.g. "k8s" -> Kubernetes; matching a resume or
+job description returns every canonical skill found with its position and
+resume section. The same matcher removes placeholder phrases from generated
+text.
+"""
+import bisect
+import json
+import os
+import threading
+from collections import namedtuple
+
+from scoring import TOKEN_PATTERN, section_spans
+
+TAXONOMY_PATH = os.environ.get("ATS_SKILLS_TAXONOMY") or os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "skills_taxonomy.json")
+# Characters allowed between the tokens of a multi-word phrase.
+JOINERS = frozenset(" \t\n\r-/&")
+
+SkillMatch = namedtuple("SkillMatch", "skill category text start end section")
+
+_END = object()
+
+
+def _tokens(text):
+    return [(m.group(), m.start(), m.end()) for m in TOKEN_PATTERN.finditer(text.lower())]
+
+
+class PhraseMatcher:
+    """
+    Finds many phrases in a text in a single scan. Phrases are matched on
+    whole tokens, case-insensitively unless added with ``exact=True``.
+    """
+
+    def __init__(self, phrases=()):
+        self._root = {}
+        self.size = 0
+        for phrase in phrases:
+            self.add(phrase, phrase)
+
+    def add(self, phrase, value, exact=False):
+        words = [token for token, _, _ in _tokens(phrase)]
+        if not words:
+            return
+        variants = [words]
+        if len(words) > 1:
+            # "machine learning" also matches "machine-learning".
+            variants.append(["-".join(words)])
+        for variant in variants:
+            node = self._root
+            for word in variant:
+                node = node.setdefault(word, {})
+            node.setdefault(_END, []).append((value, phrase if exact else None))
+        self.size += 1
+
+    def finditer(self, text, final=True):
+        """
+        Yield ``(start, end, value)`` for each match in ``text``. With ``final``
+        false, matches touching the end of ``text`` are skipped because the
+        last word may continue in a later chunk.
+        """
+        if len(text) != len(text.lower()):
+            # A few characters change length when lowercased; keep offsets aligned.
+            text = "".join(ch.lower()[:1] or ch for ch in text)
+        tokens = _tokens(text)
+        count = len(tokens)
+        i = 0
+        while i < count:
+            node = self._root
+            best = None
+            j = i
+            while j < count:
+                if j > i and not JOINERS.issuperset(text[tokens[j - 1][2]:tokens[j][1]]):
+                    break
+                node = node.get(tokens[j][0])
+                if node is None:
+                    break
+                j += 1
+                for value, surface in node.get(_END, ()):
+                    start, end = tokens[i][1], tokens[j - 1][2]
+                    if surface is None or text[start:end] == surface:
+                        best = (start, end, value, j)
+                        break
+            if best is None or (not final and best[1] >= len(text)):
+                i += 1
+                continue
+            yield best[:3]
+            i = best[3]
+
+    def remove(self, text, final=True):
+        """
+        Return ``text`` with every match cut out.
+        """
+        parts = []
+        position = 0
+        for start, end, _ in self.finditer(text, final):
+            parts.append(text[position:start])
+            position = end
+        if not parts:
+            return text
+        parts.append(text[position:])
+        return "".join(parts)
+
+
+class Taxonomy:
+    def __init__(self, skills):
+        self.skills = {}
+        self.matcher = PhraseMatcher()
+        for entry in skills:
+            name = entry["name"]
+            self.skills[name] = entry.get("category", "")
+            exact = set(entry.get("exact", ()))
+            for phrase in [name] + list(entry.get("synonyms", ())):
+                self.matcher.add(phrase, name, exact=phrase in exact)
+
+    @classmethod
+    def from_file(cls, path):
+        with open(path, encoding="utf-8") as f:
+            return cls(json.load(f)["skills"])
+
+    def match(self, text, sections=True):
+        """
+        Return a SkillMatch for every skill mention in ``text``; ``section`` is the
+        resume section containing it when ``sections`` is true.
+        """
+        text = text or ""
+        spans = section_spans(text) if sections else []
+        starts = [start for _, start, _ in spans]
+        matches = []
+        for start, end, name in self.matcher.finditer(text):
+            section = spans[max(bisect.bisect_right(starts, start) - 1, 0)][0] if spans else None
+            matches.append(SkillMatch(name, self.skills[name], text[start:end], start, end, section))
+        return matches
+
+    def skill_counts(self, text):
+        """
+        Return ``{skill: {"category", "count", "sections"}}`` for the skills in ``text``.
+        """
+        found = {}
+        for match in self.match(text):
+            entry = found.setdefault(match.skill, {"category": match.category, "count": 0, "sections": []})
+            entry["count"] += 1
+            if match.section not in entry["sections"]:
+                entry["sections"].append(match.section)
+        return found
+
+
+_taxonomy = None
+_taxonomy_lock = threading.Lock()
+
+
+def get_taxonomy():
+    """
+    Return the process-wide taxonomy, loading it on first use.
+    """
+    global _taxonomy
+    if _taxonomy is None:
+        with _taxonomy_lock:
+            if _taxonomy is None:
+                _taxonomy = Taxonomy.from_file(TAXONOMY_PATH)
+    return _taxonomy
+
+
+def compare_skills(resume_text, jd_text):
+    """
+    Match the taxonomy skills of a job description against a resume. Returns
+    the JD's skills split into ``matched`` and ``missing``, the resume's
+    ``extra`` skills, and the fraction of JD skills the resume covers.
+    """
+    taxonomy = get_taxonomy()
+    jd_skills = taxonomy.skill_counts(jd_text)
+    resume_skills = taxonomy.skill_counts(resume_text)
+    # Skills the JD mentions most come first.
+    ordered = sorted(jd_skills, key=lambda name: -jd_skills[name]["count"])
+    matched = [name for name in ordered if name in resume_skills]
+    return {
+        "matched": matched,
+        "missing": [name for name in ordered if name not in resume_skills],
+        "extra": sorted(name for name in resume_skills if name not in jd_skills),
+        "overlap": round(len(matched) / len(ordered), 3) if ordered else 0.0,
+        "sections": {name: resume_skills[name]["sections"] for name in matched},
+    }
+
+
+def skill_summary(resume_text, jd_text):
+    """
+    Compact skill lists for a prompt, or "" when the JD names no known skills.
+    """
+    comparison = compare_skills(resume_text, jd_text)
+    if not comparison["matched"] and not comparison["missing"]:
+        return ""
+    return (f"Matched skills: {', '.join(comparison['matched']) or 'none'}\n"
+            f"Missing skills: {', '.join(comparison['missing']) or 'none'}")
@@ -0,0 +1,243 @@
+"""
+Lightweight tracing and metrics.
+
+``span(name)`` times a stage and ``traced(name)`` does the same for a whole
+function. Spans opened inside ``request(name)`` are grouped into a trace;
+the last few traces are kept for the in-app waterfall. Every span also
+feeds per-stage latency histograms and error counters, which are exported
+together with token counts and cache hit rates in Prometheus text or JSON
+format, and optionally written to ATS_METRICS_FILE after each request.
+"""
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+METRICS_FILE = os.environ.get("ATS_METRICS_FILE") or None
+RECENT_TRACES = int(os.environ.get("ATS_TRACE_HISTORY", 20))
+LATENCY_BUCKETS = (0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_current_trace = contextvars.ContextVar("ats_current_trace", default=None)
+_lock = threading.Lock()
+_stages = {}
+_counters = {}
+_recent = deque(maxlen=RECENT_TRACES)
+# Callables returning {name: value} gauges, e.g. cache statistics.
+_gauge_sources = {}
+
+
+class Trace:
+    def __init__(self, name):
+        self.name = name
+        self.started = time.time()
+        self.started_perf = time.perf_counter()
+        self.duration = None
+        self.error = None
+        self.spans = []
+        self.tokens = {"prompt": 0, "output": 0}
+        self._lock = threading.Lock()
+
+    def add_span(self, name, start, duration, error):
+        with self._lock:
+            self.spans.append({
+                "name": name,
+                "offset": round(start - self.started_perf, 6),
+                "duration": round(duration, 6),
+                "error": error,
+            })
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "started": self.started,
+            "duration": self.duration,
+            "error": self.error,
+            "tokens": dict(self.tokens),
+            "spans": sorted(self.spans, key=lambda s: s["offset"]),
+        }
+
+
+def _observe(name, duration, error):
+    with _lock:
+        stage = _stages.get(name)
+        if stage is None:
+            stage = _stages[name] = {"count": 0, "errors": 0, "sum": 0.0, "buckets": [0] * len(LATENCY_BUCKETS)}
+        stage["count"] += 1
+        stage["sum"] += duration
+        if error:
+            stage["errors"] += 1
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if duration <= bound:
+                stage["buckets"][i] += 1
+
+
+@contextmanager
+def span(name):
+    """
+    Time the enclosed block as stage ``name``; exceptions are counted and re-raised.
+    """
+    trace = _current_trace.get()
+    start = time.perf_counter()
+    error = None
+    try:
+        yield
+    except BaseException as e:
+        error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        duration = time.perf_counter() - start
+        _observe(name, duration, error)
+        if trace is not None:
+            trace.add_span(name, start, duration, error)
+
+
+def traced(name):
+    """
+    Decorator timing every call of the wrapped function as stage ``name``.
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+@contextmanager
+def request(name):
+    """
+    Group the spans of one user-level operation into a trace.
+    """
+    trace = Trace(name)
+    token = _current_trace.set(trace)
+    try:
+        with span(f"request.{name}"):
+            yield trace
+    except BaseException as e:
+        trace.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _current_trace.reset(token)
+        trace.duration = round(time.perf_counter() - trace.started_perf, 6)
+        with _lock:
+            _recent.append(trace)
+        if METRICS_FILE:
+            write_metrics(METRICS_FILE)
+
+
+def increment(name, value=1):
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+
+
+def record_tokens(model_id, prompt_tokens, output_tokens):
+    """
+    Count tokens reported in a Gemini response's usage metadata.
+    """
+    increment(f"tokens_prompt_total|model={model_id}", prompt_tokens or 0)
+    increment(f"tokens_output_total|model={model_id}", output_tokens or 0)
+    trace = _current_trace.get()
+    if trace is not None:
+        with trace._lock:
+            trace.tokens["prompt"] += prompt_tokens or 0
+            trace.tokens["output"] += output_tokens or 0
+
+
+def record_usage(model_id, response):
+    # Gemini responses (and the last chunk of a stream) carry usage_metadata.
+    usage = getattr(response, "usage_metadata", None)
+    if usage is not None:
+        record_tokens(model_id, getattr(usage, "prompt_token_count", 0),
+                      getattr(usage, "candidates_token_count", 0))
+
+
+def register_gauges(name, source):
+    """
+    Register a callable returning ``{metric: value}`` to include in every export.
+    """
+    with _lock:
+        _gauge_sources[name] = source
+
+
+def recent_traces():
+    with _lock:
+        return [trace.to_dict() for trace in reversed(_recent)]
+
+
+def _gauges():
+    with _lock:
+        sources = dict(_gauge_sources)
+    gauges = {}
+    for prefix, source in sources.items():
+        try:
+            values = source()
+        except Exception:
+            continue
+        for key, value in values.items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                gauges[f"{prefix}_{key}"] = value
+    return gauges
+
+
+def snapshot():
+    """
+    Return all metrics as a JSON-serialisable dict.
+    """
+    with _lock:
+        stages = {name: {"count": s["count"], "errors": s["errors"], "sum": round(s["sum"], 6),
+                         "buckets": dict(zip(LATENCY_BUCKETS, s["buckets"]))}
+                  for name, s in _stages.items()}
+        counters = dict(_counters)
+    return {"stages": stages, "counters": counters, "gauges": _gauges()}
+
+
+def render_prometheus():
+    """
+    Return all metrics in the Prometheus text exposition format.
+    """
+    data = snapshot()
+    lines = [
+        "# HELP ats_stage_seconds Latency of each processing stage.",
+        "# TYPE ats_stage_seconds histogram",
+    ]
+    for name, stage in sorted(data["stages"].items()):
+        for bound, count in stage["buckets"].items():
+            lines.append(f'ats_stage_seconds_bucket{{stage="{name}",le="{bound}"}} {count}')
+        lines.append(f'ats_stage_seconds_bucket{{stage="{name}",le="+Inf"}} {stage["count"]}')
+        lines.append(f'ats_stage_seconds_sum{{stage="{name}"}} {stage["sum"]}')
+        lines.append(f'ats_stage_seconds_count{{stage="{name}"}} {stage["count"]}')
+    lines += ["# HELP ats_stage_errors_total Failed calls per stage.", "# TYPE ats_stage_errors_total counter"]
+    for name, stage in sorted(data["stages"].items()):
+        lines.append(f'ats_stage_errors_total{{stage="{name}"}} {stage["errors"]}')
+    for key, value in sorted(data["counters"].items()):
+        # Counters may carry one label, encoded as "name|label=value".
+        metric, _, label = key.partition("|")
+        if label:
+            label_name, _, label_value = label.partition("=")
+            metric = f'{metric}{{{label_name}="{label_value}"}}'
+        lines.append(f"ats_{metric} {value}")
+    for key, value in sorted(data["gauges"].items()):
+        lines.append(f"ats_{key} {value}")
+    return "\n".join(lines) + "\n"
+
+
+def write_metrics(path):
+    """
+    Atomically write the metrics to ``path``; ``.json`` files get JSON, others Prometheus text.
+    """
+    if path.endswith(".json"):
+        payload = json.dumps(snapshot(), default=str, indent=2)
+    else:
+        payload = render_prometheus()
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(payload)
+    os.replace(tmp_path, path)
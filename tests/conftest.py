@@ -0,0 +1,7 @@
+import os
+import sys
+
+# The app's modules live at the repository root, not in a package.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("ATS_HISTORY_DISABLED", "1")
+os.environ.setdefault("ATS_LLM_CACHE_DISABLED", "1")
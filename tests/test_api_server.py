@@ -0,0 +1,131 @@
+import base64
+import http.client
+import json
+import threading
+import time
+
+import pytest
+
+import api_server
+
+
+@pytest.fixture
+def server():
+    httpd = api_server.make_server("127.0.0.1", 0, workers=1, queue_size=0)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def post(httpd, path, body):
+    connection = http.client.HTTPConnection("127.0.0.1", httpd.server_address[1], timeout=10)
+    connection.request("POST", path, json.dumps(body), {"Content-Type": "application/json"})
+    response = connection.getresponse()
+    return response.status, dict(response.getheaders()), response.read()
+
+
+def fake_operation(monkeypatch, handler):
+    monkeypatch.setitem(api_server.OPERATIONS, "analyze", (handler, ("resume_text", "jd_text"), True))
+
+
+def test_render_returns_base64_content(server):
+    status, _, body = post(server, "/v1/render", {"markdown": "# Jane", "format": "html"})
+    assert status == 200
+    content = base64.b64decode(json.loads(body)["content_base64"]).decode("utf-8")
+    assert "Jane" in content
+
+
+def test_extract_reads_text_files(server):
+    content = base64.b64encode(b"plain resume").decode("ascii")
+    status, _, body = post(server, "/v1/extract", {"file_name": "cv.TXT", "content_base64": content})
+    assert status == 200 and json.loads(body) == {"text": "plain resume"}
+
+
+@pytest.mark.parametrize("payload", [
+    {"file_name": 123, "content_base64": "eA=="},
+    {"file_name": ["cv.pdf"], "content_base64": "eA=="},
+    {"file_name": "cv.txt"},
+    {"file_name": "cv.txt", "content_base64": "not base64!"},
+])
+def test_extract_rejects_invalid_payloads(server, payload):
+    status, _, body = post(server, "/v1/extract", payload)
+    assert status == 400
+    assert "error" in json.loads(body)
+
+
+def test_unknown_operation_is_not_found(server):
+    status, _, _ = post(server, "/v1/unknown", {})
+    assert status == 404
+
+
+def test_busy_pool_answers_429_with_retry_after(server, monkeypatch):
+    release = threading.Event()
+
+    def blocking(payload, stream=False):
+        release.wait(5)
+        return {"report": ""}
+
+    fake_operation(monkeypatch, blocking)
+    first = threading.Thread(target=post, args=(server, "/v1/analyze", {"resume_text": "r", "jd_text": "j"}))
+    first.start()
+    while not server.pool.saturated():
+        time.sleep(0.01)
+    status, headers, _ = post(server, "/v1/analyze", {"resume_text": "r", "jd_text": "j"})
+    release.set()
+    first.join()
+    assert status == 429 and headers["Retry-After"] == str(api_server.RETRY_AFTER_SECONDS)
+
+
+def test_stream_frames_text_then_done(server, monkeypatch):
+    fake_operation(monkeypatch, lambda payload, stream=False: iter(["Hello", " world"]))
+    status, headers, body = post(server, "/v1/analyze", {"resume_text": "r", "jd_text": "j", "stream": True})
+    assert status == 200 and headers["Transfer-Encoding"] == "chunked"
+    frames = [json.loads(line) for line in body.decode("utf-8").splitlines()]
+    assert frames == [{"text": "Hello"}, {"text": " world"}, {"done": True}]
+
+
+def test_stream_error_before_first_chunk_is_a_plain_response(server, monkeypatch):
+    def failing(payload, stream=False):
+        raise api_server.ApiError(422, "nothing to analyze")
+        yield
+
+    fake_operation(monkeypatch, failing)
+    status, _, body = post(server, "/v1/analyze", {"resume_text": "r", "jd_text": "j", "stream": True})
+    assert status == 422 and json.loads(body) == {"error": "nothing to analyze"}
+
+
+def test_stream_first_chunk_timeout_cancels_the_worker(server, monkeypatch):
+    produced = []
+
+    def slow(payload, stream=False):
+        time.sleep(0.5)
+        for chunk in ("late", "later"):
+            produced.append(chunk)
+            yield chunk
+
+    fake_operation(monkeypatch, slow)
+    payload = {"resume_text": "r", "jd_text": "j", "stream": True, "timeout": 0.2}
+    status, _, _ = post(server, "/v1/analyze", payload)
+    assert status == 504
+    time.sleep(0.6)
+    # The worker saw the cancellation after its first chunk instead of generating the rest.
+    assert produced == ["late"]
+
+
+def test_stream_deadline_covers_the_whole_stream(server, monkeypatch):
+    def trickle(payload, stream=False):
+        for _ in range(10):
+            time.sleep(0.15)
+            yield "."
+
+    fake_operation(monkeypatch, trickle)
+    payload = {"resume_text": "r", "jd_text": "j", "stream": True, "timeout": 0.5}
+    started = time.monotonic()
+    status, _, body = post(server, "/v1/analyze", payload)
+    frames = [json.loads(line) for line in body.decode("utf-8").splitlines()]
+    assert status == 200
+    assert frames[-1] == {"error": "Request timed out", "status": 504}
+    assert len(frames) < 10
+    assert time.monotonic() - started < 1.2
@@ -0,0 +1,70 @@
+import os
+
+from artifacts import ArtifactRef, ArtifactStore
+
+REPORT = "ATS Score : 72\n" + "Detailed report line with some text.\n" * 200
+
+
+def test_small_values_stay_inline():
+    store = ArtifactStore(spill_dir=None, min_bytes=1024)
+    assert store.put("short", "session") == "short"
+    assert store.put(None, "session") is None
+    assert store.get("short") == "short"
+
+
+def test_identical_values_are_stored_once_and_released():
+    store = ArtifactStore(spill_dir=None, min_bytes=1)
+    first = store.put(REPORT, "a")
+    second = store.put(REPORT, "b")
+    assert isinstance(first, ArtifactRef) and first == second
+    assert store.get(first) == REPORT
+    assert store.stats()["artifacts"] == 1
+    assert store.stats()["compression_ratio"] > 1
+    store.release(first, "a")
+    assert store.get(first) == REPORT
+    store.release(second, "b")
+    assert store.get(first) is None
+
+
+def test_bytes_round_trip():
+    store = ArtifactStore(spill_dir=None, min_bytes=1)
+    data = bytes(range(256)) * 10
+    assert store.get(store.put(data, "a")) == data
+
+
+def test_least_recently_used_artifacts_spill_and_load_back(tmp_path):
+    store = ArtifactStore(memory_bytes=1, spill_dir=str(tmp_path), min_bytes=1)
+    first = store.put(REPORT, "a")
+    second = store.put(REPORT + "second", "a")
+    stats = store.stats()
+    assert stats["spills"] >= 1 and stats["disk_bytes"] > 0
+    assert store.get(first) == REPORT
+    assert store.get(second) == REPORT + "second"
+    assert store.stats()["loads"] >= 1
+    store.drop_session("a")
+    assert store.stats()["artifacts"] == 0
+    assert store.stats()["disk_bytes"] == 0
+    assert not any(files for _, _, files in os.walk(tmp_path))
+
+
+def test_idle_sessions_are_evicted_unless_live():
+    live = {"connected"}
+    store = ArtifactStore(spill_dir=None, session_idle=0, min_bytes=1, is_live=lambda session: session in live)
+    kept = store.put(REPORT, "connected")
+    evicted = store.put(REPORT + "gone", "closed")
+    assert store.evict_idle() == 1
+    assert store.get(kept) == REPORT
+    assert store.get(evicted) is None
+    assert store.stats()["evicted_sessions"] == 1
+    live.clear()
+    assert store.evict_idle() == 1
+    assert store.get(kept) is None
+
+
+def test_touched_sessions_are_not_idle():
+    store = ArtifactStore(spill_dir=None, session_idle=60, min_bytes=1)
+    ref = store.put(REPORT, "a")
+    store.touch("a")
+    assert store.evict_idle() == 0
+    assert store.get(ref) == REPORT
+    assert store.session_stats("a")["artifacts"] == 1
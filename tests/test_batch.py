@@ -0,0 +1,96 @@
+import json
+import threading
+
+import pytest
+
+import batch
+from batch import load_checkpoint, load_sources, run_batch
+
+RESUME = "Python developer with Docker and PostgreSQL experience building REST APIs for payments."
+
+
+def records(ids, text=RESUME):
+    return [{"id": record_id, "text": f"{text} {record_id}"} for record_id in ids]
+
+
+def read(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+@pytest.fixture
+def pairs(monkeypatch):
+    processed = []
+
+    def process_pair(resume_text, jd_text, boost, use_cache, cascade=False):
+        processed.append((resume_text, jd_text))
+        if "broken" in resume_text:
+            raise ValueError("model error")
+        return {"local_score": 50.0, "ats_score": 70.0, "analysis": "ATS Score : 70"}
+
+    monkeypatch.setattr(batch, "process_pair", process_pair)
+    return processed
+
+
+def test_load_sources_from_directory_and_manifests(tmp_path):
+    (tmp_path / "b.txt").write_text("resume b")
+    (tmp_path / "a.pdf").write_bytes(b"%PDF")
+    (tmp_path / "notes.md").write_text("ignored")
+    assert [record["id"] for record in load_sources(str(tmp_path))] == ["a.pdf", "b.txt"]
+
+    manifest = tmp_path / "list.txt"
+    manifest.write_text("# comment\nb.txt\n\n")
+    assert load_sources(str(manifest)) == [{"id": "b.txt", "path": str(tmp_path / "b.txt")}]
+    jsonl = tmp_path / "list.jsonl"
+    jsonl.write_text('{"id": "x", "text": "inline"}\n{"path": "b.txt"}\n')
+    assert load_sources(str(jsonl)) == [{"id": "x", "text": "inline"},
+                                       {"path": str(tmp_path / "b.txt"), "id": str(tmp_path / "b.txt")}]
+
+
+def test_results_are_checkpointed_and_resumed(tmp_path, pairs):
+    out = str(tmp_path / "out.jsonl")
+    summary = run_batch(records(["r1", "broken"]), records(["j1"], "Backend JD"), out, workers=2, log=None)
+    assert summary["ok"] == 1 and summary["error"] == 1
+    assert {record["resume"]: record["status"] for record in read(out)} == {"r1": "ok", "broken": "error"}
+    assert load_checkpoint(out) == {("r1", "j1")}
+
+    pairs.clear()
+    summary = run_batch(records(["r1", "broken"]), records(["j1"], "Backend JD"), out, workers=2, log=None)
+    assert summary["skipped"] == 1 and len(pairs) == 1
+
+
+def test_extraction_errors_are_recorded(tmp_path, pairs):
+    out = str(tmp_path / "out.jsonl")
+    missing = [{"id": "gone", "path": str(tmp_path / "gone.pdf")}]
+    summary = run_batch(missing, records(["j1"]), out, log=None)
+    assert summary["error"] == 1 and not pairs
+    assert read(out)[0]["error"].startswith("Extraction failed")
+
+
+def test_near_duplicates_reuse_their_representative(tmp_path, pairs):
+    out = str(tmp_path / "out.jsonl")
+    resumes = [{"id": "a", "text": RESUME}, {"id": "b", "text": RESUME.upper()}]
+    summary = run_batch(resumes, records(["j1"]), out, dedupe=True, log=None)
+    assert summary["ok"] == 2 and summary["deduplicated"] == 1 and len(pairs) == 1
+    assert [record.get("duplicate_of") for record in read(out)] == [None, "a"]
+
+
+def test_stuck_workers_are_bounded(tmp_path, monkeypatch):
+    release = threading.Event()
+
+    def hang(resume_text, jd_text, boost, use_cache, cascade=False):
+        release.wait(30)
+        return {"local_score": 0.0, "ats_score": 0.0, "analysis": ""}
+
+    monkeypatch.setattr(batch, "process_pair", hang)
+    out = str(tmp_path / "out.jsonl")
+    threads = threading.active_count()
+    try:
+        summary = run_batch(records(["r1", "r2", "r3", "r4"]), records(["j1"]), out, workers=1, timeout=0.1,
+                            headroom=1, log=None)
+        # One worker plus one thread of headroom, both stuck; nothing else is started.
+        assert threading.active_count() - threads <= 2
+    finally:
+        release.set()
+    assert summary["timeout"] == 2 and summary["error"] == 2
+    assert [record["status"] for record in read(out)] == ["timeout", "timeout", "error", "error"]
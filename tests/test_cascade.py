@@ -0,0 +1,32 @@
+from cascade import FULL, QUICK, SCREENED_OUT, relevance, route, run_cascade
+
+
+def local(keyword_match, matched=(), missing=()):
+    return {"score": keyword_match, "breakdown": {"keyword_match": keyword_match},
+            "matched_skills": list(matched), "missing_skills": list(missing), "missing_keywords": ["kafka"]}
+
+
+def test_relevance_blends_keywords_with_skill_coverage():
+    assert relevance(local(40.0)) == 40.0
+    assert relevance(local(40.0, matched=["Python"], missing=["Kafka"])) == 45.0
+
+
+def test_route_by_thresholds():
+    assert route(10, floor=25, full_threshold=50) == SCREENED_OUT
+    assert route(25, floor=25, full_threshold=50) == QUICK
+    assert route(50, floor=25, full_threshold=50) == FULL
+
+
+def test_only_the_routed_tier_is_called():
+    calls = []
+
+    def tier(name):
+        return lambda resume, jd: calls.append(name) or name
+
+    screened = run_cascade("resume", "jd", tier("quick"), tier("full"), local=local(0.0, missing=["Kafka"]))
+    assert screened["tier"] == SCREENED_OUT and not calls
+    assert screened["report"].startswith("ATS Score : 0.0")
+    assert "Kafka" in screened["report"]
+
+    full = run_cascade("resume", "jd", tier("quick"), tier("full"), local=local(90.0, matched=["Python"]))
+    assert full["tier"] == FULL and full["report"] == "full" and calls == ["full"]
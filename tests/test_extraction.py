@@ -0,0 +1,113 @@
+import io
+import os
+
+import pytest
+
+import extraction
+from extraction import ExtractionLimitError, extract_docx_text, extract_pdf_text, open_buffer
+
+
+def make_pdf(pages):
+    # A minimal PDF with one line of Helvetica text per page.
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None,
+               b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for text in pages:
+        stream = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET".encode("latin-1")
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        objects.append(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents %d 0 R "
+                       b"/Resources << /Font << /F1 3 0 R >> >> >>" % len(objects))
+        kids.append(b"%d 0 R" % len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (b" ".join(kids), len(kids))
+    out = io.BytesIO(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(out.tell())
+        out.write(b"%d 0 obj\n%s\nendobj\n" % (number, body))
+    xref = out.tell()
+    out.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+    out.writelines(b"%010d 00000 n \n" % offset for offset in offsets)
+    out.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref))
+    return out.getvalue()
+
+
+PAGES = [f"Page {i} text" for i in range(12)]
+
+
+def words(text):
+    return text.split()
+
+
+def test_open_buffer_maps_files_and_wraps_bytes(tmp_path):
+    path = tmp_path / "doc.bin"
+    path.write_bytes(b"abcdef")
+    mapped = open_buffer(str(path))
+    mapped.seek(2)
+    assert mapped.read(3) == b"cde" and mapped.size() == 6
+    assert open_buffer(b"xyz").read() == b"xyz"
+
+
+def test_pdf_text_from_bytes():
+    assert words(extract_pdf_text(make_pdf(PAGES[:2]), parallel=False)) == words("Page 0 text Page 1 text")
+
+
+@pytest.fixture
+def parallel(monkeypatch):
+    monkeypatch.setattr(extraction, "MAX_WORKERS", 2)
+    monkeypatch.setattr(extraction, "PARALLEL_MIN_PAGES", 4)
+    sources = []
+    extract_chunks = extraction._extract_chunks
+
+    def record(source, chunks):
+        sources.append(source)
+        return extract_chunks(source, chunks)
+
+    monkeypatch.setattr(extraction, "_extract_chunks", record)
+    return sources
+
+
+def test_parallel_extraction_matches_serial(tmp_path, parallel):
+    data = make_pdf(PAGES)
+    serial = extract_pdf_text(data, parallel=False)
+    assert words(extract_pdf_text(data)) == words(serial)
+    path = tmp_path / "doc.pdf"
+    path.write_bytes(data)
+    assert words(extract_pdf_text(str(path))) == words(serial)
+    # Uploads go to the workers as a shared memory block, files by path.
+    assert isinstance(parallel[0], tuple) and parallel[1] == str(path)
+
+
+def test_no_temporary_files_for_uploads(tmp_path, monkeypatch, parallel):
+    monkeypatch.setattr("tempfile.tempdir", str(tmp_path))
+    extract_pdf_text(make_pdf(PAGES))
+    assert parallel and os.listdir(tmp_path) == []
+
+
+def test_truncation_is_reported():
+    truncated = []
+    text = extract_pdf_text(make_pdf(PAGES), max_pages=3, on_truncate=truncated.append)
+    assert truncated == [3]
+    assert words(text) == words("Page 0 text Page 1 text Page 2 text")
+    assert extract_pdf_text(make_pdf(PAGES[:3]), max_pages=3, on_truncate=truncated.append)
+    assert truncated == [3]
+
+
+def test_size_limit():
+    with pytest.raises(ExtractionLimitError):
+        extract_pdf_text(make_pdf(PAGES), max_bytes=100)
+
+
+def test_docx_text():
+    docx = pytest.importorskip("docx")
+    document = docx.Document()
+    document.add_paragraph("Jane Doe")
+    document.add_paragraph("Python developer")
+    out = io.BytesIO()
+    document.save(out)
+    text = extract_docx_text(out.getvalue())
+    assert "Jane Doe" in text and "Python developer" in text
+
+
+def test_parser_names():
+    assert extraction.pdf_parser_name() in ("pdfminer", "pypdf2")
+    assert extraction.docx_parser_name() in ("mammoth", "python-docx")
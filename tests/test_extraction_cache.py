@@ -0,0 +1,49 @@
+from extraction_cache import ExtractionCache, cached_extract, content_key, extraction_cache
+
+
+def test_extraction_cache_bounds_entries_and_bytes():
+    cache = ExtractionCache(max_entries=2, max_bytes=100)
+    cache.set("a", "1")
+    cache.set("b", "2")
+    assert cache.get("a") == "1"
+    cache.set("c", "3")
+    assert cache.get("b") is None
+    assert cache.get("a") == "1"
+    cache.set("big", "x" * 100)
+    assert cache.stats() == {"hits": 2, "disk_hits": 0, "misses": 1, "entries": 1, "bytes": 100}
+
+
+def test_extraction_cache_reads_back_from_disk(tmp_path):
+    key = content_key(b"%PDF", "pdfminer")
+    ExtractionCache(disk_dir=str(tmp_path)).set(key, "text")
+    cache = ExtractionCache(disk_dir=str(tmp_path))
+    assert cache.get(key) == "text"
+    assert cache.stats()["disk_hits"] == 1
+
+
+def test_cached_extract_does_not_cache_failed_parses():
+    calls = []
+
+    def extract(data):
+        calls.append(data)
+        return "" if len(calls) == 1 else "parsed"
+
+    data = b"test_cached_extract_does_not_cache_failed_parses"
+    assert cached_extract(data, "test", extract) == ""
+    assert cached_extract(data, "test", extract) == "parsed"
+    assert cached_extract(data, "test", extract) == "parsed"
+    assert len(calls) == 2
+    assert extraction_cache.get(content_key(data, "test")) == "parsed"
+
+
+def test_truncation_notes_stay_with_their_entry(tmp_path):
+    cache = ExtractionCache(max_entries=1, disk_dir=str(tmp_path))
+    cache.note_truncated("pdfminer-aa", 50)
+    cache.set("pdfminer-aa", "text")
+    assert cache.truncated_pages("pdfminer-aa") == 50
+    assert ExtractionCache(disk_dir=str(tmp_path)).truncated_pages("pdfminer-aa") is None
+    reopened = ExtractionCache(disk_dir=str(tmp_path))
+    assert reopened.get("pdfminer-aa") == "text"
+    assert reopened.truncated_pages("pdfminer-aa") == 50
+    cache.set("pdfminer-bb", "other")
+    assert cache.truncated_pages("pdfminer-aa") is None
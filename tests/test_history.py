@@ -0,0 +1,75 @@
+import queue
+
+import pytest
+
+import history
+from history import HistoryStore, first_line, text_hash
+
+JD = "Backend Engineer\nPython and Django."
+
+
+@pytest.fixture
+def store(tmp_path):
+    return HistoryStore(str(tmp_path / "history.sqlite3"))
+
+
+def test_records_are_written_in_the_background(store):
+    store.record("analysis", "report", resume_text="# Jane Doe\nPython", jd_text=JD, ats_score=81.0,
+                 model_id="m", latency=0.25)
+    assert store.flush()
+    rows, cursor = store.history()
+    assert cursor is None and len(rows) == 1
+    row = rows[0]
+    assert row["candidate"] == "Jane Doe" and row["jd_title"] == "Backend Engineer"
+    assert row["jd_hash"] == text_hash(JD) and row["latency_ms"] == 250.0
+    assert "result" not in row
+    assert store.get(row["id"])["result"] == "report"
+    assert store.stats()["written"] == 1
+
+
+def test_history_filters_and_paginates_newest_first(store):
+    for i in range(5):
+        store.record("analysis", f"r{i}", candidate="Jane" if i % 2 else "John", jd_text=JD, ats_score=50 + i * 10)
+    store.record("boost", "boosted", candidate="Jane")
+    store.flush()
+    pages, cursor = [], None
+    while True:
+        rows, cursor = store.history(kind="analysis", limit=2, cursor=cursor)
+        pages.append([store.get(row["id"])["result"] for row in rows])
+        if cursor is None:
+            break
+    assert pages == [["r4", "r3"], ["r2", "r1"], ["r0"]]
+    assert [row["candidate"] for row in store.history(candidate="Jane")[0]] == ["Jane"] * 3
+    scores = [row["ats_score"] for row in store.history(min_score=60, max_score=80)[0]]
+    assert sorted(scores) == [60, 70, 80]
+
+
+def test_top_for_jd_keeps_each_resumes_best_record(store):
+    for resume, score in (("A", 70), ("A", 90), ("B", 80), ("C", None)):
+        store.record("analysis", "r", resume_text=resume, candidate=resume, jd_text=JD, ats_score=score)
+    store.record("analysis", "r", resume_text="D", candidate="D", jd_text="Other job", ats_score=99)
+    store.flush()
+    top = store.top_for_jd(text_hash(JD))
+    assert [(row["candidate"], row["ats_score"]) for row in top] == [("A", 90), ("B", 80)]
+    assert {row["jd_title"]: row["records"] for row in store.requisitions()} == {
+        "Backend Engineer": 4, "Other job": 1}
+
+
+class FullQueue(queue.Queue):
+    def put_nowait(self, item):
+        raise queue.Full
+
+
+def test_a_full_queue_drops_records_instead_of_blocking(store):
+    store._queue = FullQueue()
+    store.record("analysis", "r")
+    assert store.stats()["dropped"] == 1
+
+
+def test_first_line_and_disabled_store(monkeypatch):
+    assert first_line("\n## **Jane Doe**\nDetails") == "Jane Doe"
+    assert first_line("a b c d e f g h i") is None
+    assert text_hash("") is None
+    monkeypatch.setattr(history, "HISTORY_DISABLED", True)
+    assert history.get_history_store() is None
+    history.record("analysis", "ignored")
@@ -0,0 +1,85 @@
+import threading
+
+from jobs import CANCELLED, DONE, FAILED, JobManager, job_key
+
+
+def wait(job):
+    job.future.result(timeout=5)
+    return job
+
+
+def blocking(release):
+    def fn(job):
+        job.set_progress("waiting")
+        release.wait(5)
+        job.check_cancelled()
+        return "result"
+    return fn
+
+
+def test_job_key_is_stable_for_equal_inputs():
+    assert job_key("analyze", "resume", {"b": 1, "a": 2}) == job_key("analyze", "resume", {"a": 2, "b": 1})
+    assert job_key("analyze", "resume") != job_key("boost", "resume")
+
+
+def test_in_flight_jobs_are_deduplicated():
+    manager = JobManager(max_workers=2)
+    release = threading.Event()
+    first = manager.submit("analyze", "key", blocking(release), subscriber="a")
+    second = manager.submit("analyze", "key", blocking(release), subscriber="b")
+    other = manager.submit("analyze", "other", blocking(release))
+    assert second is first
+    assert other is not first
+    release.set()
+    assert wait(first).status == DONE and first.result == "result"
+    assert manager.stats()["deduplicated"] == 1
+    # A finished job is not joined; the same inputs start a new job.
+    assert manager.submit("analyze", "key", lambda job: "again") is not first
+
+
+def test_shared_job_is_cancelled_only_by_its_last_subscriber():
+    manager = JobManager(max_workers=1)
+    release = threading.Event()
+    job = manager.submit("analyze", "key", blocking(release), subscriber="a")
+    manager.submit("analyze", "key", blocking(release), subscriber="b")
+    assert not job.cancel("a")
+    assert not job.cancelled
+    assert job.cancel("b")
+    release.set()
+    assert wait(job).status == CANCELLED
+
+
+def test_a_job_being_cancelled_is_not_joined():
+    manager = JobManager(max_workers=1)
+    release = threading.Event()
+    job = manager.submit("analyze", "key", blocking(release), subscriber="a")
+    job.cancel("a")
+    replacement = manager.submit("analyze", "key", lambda job: "fresh", subscriber="b")
+    assert replacement is not job
+    release.set()
+    assert wait(job).status == CANCELLED
+    assert wait(replacement).result == "fresh"
+
+
+def test_queued_job_cancelled_before_it_starts():
+    manager = JobManager(max_workers=1)
+    release = threading.Event()
+    running = manager.submit("analyze", "first", blocking(release))
+    queued = manager.submit("analyze", "second", lambda job: "never")
+    assert queued.cancel()
+    assert queued.status == CANCELLED
+    release.set()
+    wait(running)
+    assert queued.result is None
+
+
+def test_streamed_text_and_failures_are_reported():
+    manager = JobManager(max_workers=1)
+    streamed = wait(manager.submit("stream", "key", lambda job: job.stream(iter(["a", "b", "c"]))))
+    assert streamed.result == "abc" and streamed.snapshot()["text"] == "abc"
+
+    def broken(job):
+        raise ValueError("bad input")
+
+    failed = wait(manager.submit("broken", "key", broken))
+    assert failed.status == FAILED and failed.error == "bad input"
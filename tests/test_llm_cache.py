@@ -0,0 +1,37 @@
+import time
+
+from llm_cache import ResponseCache, make_cache_key
+
+
+def test_cache_key_depends_on_model_instructions_and_prompt():
+    key = make_cache_key("model", ["a", "b"], "prompt")
+    assert key == make_cache_key("model", "a\nb", "prompt")
+    assert key != make_cache_key("other", ["a", "b"], "prompt")
+    assert key != make_cache_key("model", ["a", "b"], "prompt 2")
+
+
+def test_response_cache_evicts_least_recently_used(tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache.sqlite3"), max_bytes=25, max_age=0)
+    cache.set("a", "x" * 10)
+    time.sleep(0.01)
+    cache.set("b", "y" * 10)
+    time.sleep(0.01)
+    assert cache.get("a") == "x" * 10
+    time.sleep(0.01)
+    cache.set("c", "z" * 10)
+    assert cache.get("b") is None
+    assert cache.get("a") == "x" * 10
+    assert cache.get("c") == "z" * 10
+    stats = cache.stats()
+    assert stats["evictions"] == 1
+    assert stats["entries"] == 2
+    assert stats["bytes"] == 20
+
+
+def test_response_cache_expires_old_entries(tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache.sqlite3"), max_age=0.05)
+    cache.set("a", "value")
+    assert cache.get("a") == "value"
+    time.sleep(0.1)
+    assert cache.get("a") is None
+    assert cache.stats()["entries"] == 0
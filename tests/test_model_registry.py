@@ -0,0 +1,95 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+import pytest
+
+from model_registry import ModelRegistry, connection_stats
+
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"ok")
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), KeepAliveHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_connection_reuse_is_read_from_the_transport_pools(server):
+    requests = pytest.importorskip("requests")
+    session = requests.Session()
+    for _ in range(3):
+        assert session.get(server).text == "ok"
+    transports = [SimpleNamespace(_session=session), SimpleNamespace(_session=session),
+                  SimpleNamespace(_grpc_channel=object())]
+    assert connection_stats(transports) == {"http_requests": 3, "http_connections": 1, "connection_reuses": 2,
+                                             "grpc_channels": 1}
+    assert connection_stats([]) == {"http_requests": 0, "http_connections": 0, "connection_reuses": 0,
+                                    "grpc_channels": 0}
+
+
+def test_models_are_built_once_and_reused():
+    registry = ModelRegistry()
+    built = []
+
+    def factory(model_id, system_instruction):
+        built.append(model_id)
+        time.sleep(0.05)
+        return object()
+
+    registry.set_model_factory(factory)
+    models = []
+    threads = [threading.Thread(target=lambda: models.append(registry.get_model("m", "instructions")))
+               for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    assert built == ["m"] and len({id(model) for model in models}) == 1
+    assert registry.get_model("m", "other") is not models[0]
+    stats = registry.stats()
+    assert stats["models_created"] == 2
+    assert stats["model_reuses"] + stats["coalesced_builds"] == 3
+
+
+def test_concurrency_slots_are_capped():
+    registry = ModelRegistry(max_concurrency=2)
+    release = threading.Event()
+
+    def call():
+        with registry.slot("m"):
+            release.wait(5)
+
+    threads = [threading.Thread(target=call) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.1)
+    assert registry.stats()["in_flight"] == 2
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    stats = registry.stats()
+    assert stats["calls"] == 4 and stats["max_in_flight"] == 2 and stats["in_flight"] == 0
+
+
+def test_resources_are_memoized():
+    registry = ModelRegistry()
+    first = registry.get_resource("agent", object)
+    assert registry.get_resource("agent", object) is first
+    assert registry.stats()["resource_reuses"] == 1
@@ -0,0 +1,110 @@
+import re
+
+import pytest
+
+from multi_jd import analyze_many, pack_batches, parse_batch
+
+RESUME = "Python developer with Django, PostgreSQL and Docker experience building REST APIs."
+JDS = [
+    {"text": "Backend Engineer\nPython, Django and PostgreSQL required."},
+    {"text": "Data Engineer\nSpark, Airflow and Python pipelines."},
+    {"text": "Frontend Engineer\nReact, TypeScript and CSS."},
+]
+
+
+def parse_score(text):
+    match = re.search(r"ATS Score\W*:?\s*(\d+)", text or "")
+    return float(match.group(1)) if match else None
+
+
+def build_prompt(resume, labelled):
+    return "\n".join(f"JD {label}: {text}" for label, text in labelled)
+
+
+def answer(labels, score=80):
+    return "\n".join(f"JD {label}\nATS Score: {score - label}\nMatched: Python\nSummary: fit {label}" for label in labels)
+
+
+def run(call_model, analyze_single=None, **kwargs):
+    def single(resume, jd_text):
+        raise AssertionError("unexpected single-JD analysis")
+
+    return analyze_many(RESUME, JDS, build_prompt, call_model, analyze_single or single, parse_score, **kwargs)
+
+
+def test_parse_batch_keeps_scored_blocks_in_range():
+    text = answer([1, 2]) + "\nJD 3\nSummary: no score\nJD 9\nATS Score: 50"
+    parsed = parse_batch(text, 3, parse_score)
+    assert sorted(parsed) == [1, 2]
+    assert parsed[1]["score"] == 79 and parsed[1]["summary"] == "fit 1"
+
+
+def test_pack_batches_respects_capacity_and_count():
+    assert pack_batches([100, 100, 100], capacity=500, max_per_prompt=8) == [[0, 1], [2]]
+    assert pack_batches([10] * 5, capacity=10000, max_per_prompt=2) == [[0, 1], [2, 3], [4]]
+    assert pack_batches([5000], capacity=100) == [[0]]
+
+
+def test_one_prompt_ranks_every_job_description():
+    prompts = []
+
+    def call_model(prompt):
+        prompts.append(prompt)
+        return answer([1, 2, 3])
+
+    result = run(call_model)
+    assert len(prompts) == 1 and result["prompts"] == 1 and result["fallbacks"] == 0
+    assert [row["ats_score"] for row in result["rows"]] == [79, 78, 77]
+    assert [row["rank"] for row in result["rows"]] == [1, 2, 3]
+    assert all(row["error"] == "" for row in result["rows"])
+    assert result["tokens_batched"] < result["tokens_separate"]
+
+
+def test_missing_blocks_are_split_down_to_single_analyses():
+    def call_model(prompt):
+        # Never answers for the frontend job description.
+        labels = [int(label) for label, text in re.findall(r"JD (\d+): (\S+)", prompt) if text != "Frontend"]
+        return answer(labels)
+
+    result = run(call_model, analyze_single=lambda resume, jd: "ATS Score: 42\nDetailed Report: weak match")
+    rows = {row["title"]: row for row in result["rows"]}
+    assert rows["Frontend Engineer"]["ats_score"] == 42
+    assert rows["Frontend Engineer"]["summary"] == "weak match"
+    assert result["fallbacks"] == 1
+
+
+@pytest.mark.parametrize("single_fails", [False, True])
+def test_failing_single_batch_falls_back_then_reports_a_row_error(single_fails):
+    def call_model(prompt):
+        if "Frontend" in prompt:
+            raise ConnectionError("model unavailable")
+        return answer(range(1, prompt.count("JD ") + 1))
+
+    def analyze_single(resume, jd_text):
+        if single_fails:
+            raise TimeoutError("deadline")
+        return "ATS Score: 30"
+
+    result = run(call_model, analyze_single=analyze_single, max_per_prompt=1)
+    rows = {row["title"]: row for row in result["rows"]}
+    assert rows["Backend Engineer"]["ats_score"] == 79 and rows["Data Engineer"]["ats_score"] == 79
+    frontend = rows["Frontend Engineer"]
+    assert result["fallbacks"] == 1
+    if single_fails:
+        assert frontend["ats_score"] is None and frontend["error"] == "TimeoutError: deadline"
+        assert frontend["rank"] == 3
+    else:
+        assert frontend["ats_score"] == 30 and frontend["error"] == ""
+
+
+def test_prefilter_sends_only_the_best_overlaps():
+    prompts = []
+
+    def call_model(prompt):
+        prompts.append(prompt)
+        return answer([1])
+
+    result = run(call_model, max_analyzed=1)
+    assert result["prefiltered"] == 2 and len(prompts) == 1
+    assert "Backend" in prompts[0]
+    assert [row["ats_score"] is not None for row in result["rows"]] == [True, False, False]
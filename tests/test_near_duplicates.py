@@ -0,0 +1,80 @@
+import sqlite3
+
+from near_duplicates import AnalysisReuse, LSHIndex, MinHasher, duplicate_clusters, shingles, similarity
+
+JD = ("Backend engineer. We need Python, PostgreSQL, Docker and Kubernetes experience, REST API design "
+      "and AWS. Terraform and Kafka are a plus.")
+RESUME = ("Jane Doe\nSummary\nBackend engineer with six years of experience building REST APIs in Python.\n"
+          "Experience\nAcme Corp, Senior Engineer, 2019-2024\n- Built payment services in Python and PostgreSQL\n"
+          "- Designed REST APIs serving ten million requests a day\n- Led the migration to Docker containers\n"
+          "- Mentored four junior engineers and ran code reviews\nInitech, Engineer, 2016-2019\n"
+          "- Maintained billing jobs and reporting dashboards\n- Wrote integration tests for the billing system\n"
+          "Education\nBSc Computer Science, State University\n")
+OTHER = ("John Smith\nSummary\nRegistered nurse with ten years of acute care experience.\nExperience\n"
+         "General Hospital, Charge Nurse\n- Supervised a team of twelve nurses\n- Administered medications\n")
+
+
+def test_shingles_ignore_case_punctuation_and_layout():
+    assert shingles("Python, Docker  and\nKubernetes!") == shingles("python docker and kubernetes")
+    assert shingles("") == set()
+
+
+def test_lsh_query_finds_near_duplicates_only():
+    hasher = MinHasher(64)
+    index = LSHIndex(64, bands=16)
+    index.add("resume", hasher.signature(RESUME))
+    index.add("other", hasher.signature(OTHER))
+    edited = RESUME.replace("four junior", "five junior")
+    matches = index.query(hasher.signature(edited), threshold=0.8)
+    assert [key for key, _ in matches] == ["resume"]
+    assert 0.8 <= matches[0][1] < 1.0
+    assert index.query(hasher.signature(RESUME), threshold=0.8, namespace="elsewhere") == []
+    index.remove("resume")
+    assert index.query(hasher.signature(edited), threshold=0.8) == []
+
+
+def test_similarity_estimates_jaccard():
+    hasher = MinHasher(128)
+    assert similarity(hasher.signature(RESUME), hasher.signature(RESUME.upper())) == 1.0
+    assert similarity(hasher.signature(RESUME), hasher.signature(OTHER)) < 0.2
+
+
+def test_duplicate_clusters_keep_input_order():
+    texts = {"a": RESUME, "b": OTHER, "c": RESUME.replace("\n", "  \n"), "d": ""}
+    assert duplicate_clusters(texts, hasher=MinHasher(64)) == [["a", "c"]]
+
+
+def test_reuse_exact_and_trivially_edited_resumes():
+    reuse = AnalysisReuse(num_perm=64)
+    assert reuse.find(RESUME, JD) is None
+    reuse.remember(RESUME, JD, "report")
+    assert reuse.find(RESUME, JD) == {"result": "report", "similarity": 1.0, "exact": True}
+    near = reuse.find(RESUME.replace("\n", " \n") + " .", " ".join(JD.upper().split()))
+    assert near["result"] == "report" and not near["exact"]
+    assert reuse.find(RESUME, JD, kind="structured") is None
+    assert reuse.find(RESUME, "A different job description for a nurse") is None
+    assert reuse.stats()["hits"] == 2
+
+
+def test_reuse_skips_resumes_that_added_missing_skills():
+    reuse = AnalysisReuse(num_perm=64, threshold=0.8)
+    reuse.remember(RESUME, JD, "report")
+    edited = RESUME + "Skills\nKubernetes, Terraform, Kafka, AWS\n"
+    assert reuse.find(edited, JD) is None
+    assert reuse.stats()["lookups"] == 1 and reuse.stats()["hits"] == 0
+
+
+def test_reuse_store_is_bounded_in_memory_and_on_disk(tmp_path):
+    path = str(tmp_path / "reuse.sqlite3")
+    reuse = AnalysisReuse(num_perm=64, max_entries=3, path=path)
+    for i in range(5):
+        reuse.remember(RESUME, f"{JD} {i}", f"report {i}")
+    assert reuse.stats()["entries"] == 3
+    assert reuse.find(RESUME, f"{JD} 0") is None
+    assert reuse.find(RESUME, f"{JD} 4")["result"] == "report 4"
+
+    reopened = AnalysisReuse(num_perm=64, max_entries=2, path=path)
+    assert reopened.stats()["entries"] == 2
+    assert sqlite3.connect(path).execute("SELECT COUNT(*) FROM analyses").fetchone()[0] == 2
+    assert reopened.find(RESUME, f"{JD} 4")["result"] == "report 4"
+    assert reopened.find(RESUME, f"{JD} 2") is None
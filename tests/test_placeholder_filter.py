@@ -0,0 +1,33 @@
+import pytest
+
+from app import PLACEHOLDER_PATTERNS, PlaceholderFilter, clean_placeholder_text, stream_clean
+
+TEXT = ("Experience: add relevant experience\nProjects: Placeholder project. Add your experience here!\n"
+        "Summary: placeholders are not placeholder words.")
+
+
+def chunked(text, size):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+def test_clean_placeholder_text_removes_every_pattern():
+    cleaned = clean_placeholder_text(TEXT)
+    for pattern in PLACEHOLDER_PATTERNS:
+        assert pattern not in cleaned.lower().replace("placeholders", "")
+    assert "placeholders are not" in cleaned
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 5, 7, 11, 64, 1000])
+def test_streamed_cleaning_matches_whole_text_cleaning(size):
+    assert "".join(stream_clean(chunked(TEXT, size))) == clean_placeholder_text(TEXT)
+
+
+def test_filter_holds_back_a_placeholder_split_across_chunks():
+    placeholder_filter = PlaceholderFilter()
+    out = placeholder_filter.feed("Some words then add relevant exp")
+    assert "add relevant" not in out
+    out += placeholder_filter.feed("erience and more text follows here, long enough to flush it all out")
+    out += placeholder_filter.flush()
+    assert out == clean_placeholder_text("Some words then add relevant experience and more text follows here, "
+                                         "long enough to flush it all out")
+    assert "relevant" not in out
@@ -0,0 +1,57 @@
+from prompt_budget import (actionable_report, count_tokens, fit_prompt_inputs, normalize_whitespace,
+                           strip_boilerplate, trim_to_budget)
+
+JD = """Backend Engineer
+Requirements: Python, PostgreSQL, Kubernetes and Terraform.
+
+Benefits
+Health insurance, dental and vision, 401(k).
+
+We are an equal opportunity employer.
+Our dental plans are great.
+"""
+
+
+def test_normalize_whitespace_keeps_indentation_and_hard_breaks():
+    text = "Jane   Doe  \nSummary\t \n\n\n\n  - nested    item\n"
+    assert normalize_whitespace(text) == "Jane Doe  \nSummary\n\n  - nested item"
+
+
+def test_boilerplate_sections_and_lines_are_dropped():
+    stripped = strip_boilerplate(JD)
+    assert "Requirements: Python" in stripped
+    assert "Health insurance" not in stripped
+    assert "equal opportunity" not in stripped
+    assert "dental plans" not in stripped
+    # A dental practice's own requirements are not boilerplate.
+    assert strip_boilerplate("Dental hygienist license required") == "Dental hygienist license required"
+
+
+def test_actionable_report_keeps_score_and_recommendations():
+    report = "ATS Score : 70\nThe resume is long.\n- Add Kubernetes\nAdditionally it reads well.\nInclude metrics"
+    assert actionable_report(report) == "ATS Score : 70\n- Add Kubernetes\nInclude metrics"
+
+
+def test_trim_keeps_keyword_lines_and_headings():
+    text = "# Experience\n" + "\n".join(f"filler line number {i}" for i in range(50)) + "\nkubernetes operator\n"
+    trimmed = trim_to_budget(text, 20, {"kubernetes"})
+    assert count_tokens(trimmed) < count_tokens(text)
+    assert trimmed.startswith("# Experience") and "kubernetes operator" in trimmed
+
+
+def test_inputs_within_budget_are_only_normalized():
+    resume = "Jane Doe  \nPython developer"
+    fitted_resume, fitted_jd, report, usage = fit_prompt_inputs(resume, JD, budget=10_000)
+    assert fitted_resume == resume
+    assert fitted_jd == normalize_whitespace(JD)
+    assert report is None
+    assert usage["resume"]["before"] == usage["resume"]["after"]
+
+
+def test_over_budget_resumes_are_kept_when_requested():
+    resume = "\n".join(f"Responsibility {i} unrelated to the role" for i in range(200))
+    trimmed, _, _, _ = fit_prompt_inputs(resume, JD, budget=300)
+    kept, jd, _, _ = fit_prompt_inputs(resume, JD, budget=300, keep_resume=True)
+    assert len(trimmed) < len(resume)
+    assert kept == normalize_whitespace(resume)
+    assert "Health insurance" not in jd
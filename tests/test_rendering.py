@@ -0,0 +1,71 @@
+from io import BytesIO
+
+import pytest
+
+import rendering
+from rendering import RenderCache, markdown_to_docx, markdown_to_html, render, render_key
+
+docx = pytest.importorskip("docx")
+
+
+def paragraphs(content):
+    document = docx.Document(BytesIO(content))
+    return [(p.style.name, p.text) for p in document.paragraphs]
+
+
+def test_docx_maps_headings_lists_and_blank_runs():
+    content = markdown_to_docx(
+        "# Jane Doe\n\n\n## Experience\n- Built APIs\n  - Nested detail\n1. First\n---\nPlain \\*text\\*")
+    assert paragraphs(content) == [
+        ("Heading 1", "Jane Doe"),
+        ("Normal", ""),
+        ("Heading 2", "Experience"),
+        ("List Bullet", "Built APIs"),
+        ("List Bullet 2", "Nested detail"),
+        ("List Number", "First"),
+        ("Normal", ""),
+        ("Normal", "Plain *text*"),
+    ]
+
+
+def test_docx_inline_formatting_and_links():
+    document = docx.Document(BytesIO(markdown_to_docx("**Bold** and *italic* with `code` at [site](https://x.io)")))
+    paragraph = document.paragraphs[0]
+    runs = {run.text: run for run in paragraph.runs}
+    assert runs["Bold"].bold and runs["italic"].italic
+    assert runs["code"].font.name == "Courier New"
+    assert "https://x.io" in [rel.target_ref for rel in document.part.rels.values() if rel.is_external]
+    assert "site" in paragraph._p.xml
+
+
+def test_html_rendering():
+    assert "<h1>Jane</h1>" in markdown_to_html("# Jane")
+    assert markdown_to_html(None) == ""
+
+
+def test_render_cache_evicts_by_entries_and_bytes():
+    cache = RenderCache(max_entries=2, max_bytes=10)
+    cache.set("a", b"1234")
+    cache.set("b", b"1234")
+    assert cache.get("a") == b"1234"
+    cache.set("c", b"1")
+    assert cache.get("b") is None
+    cache.set("d", b"123456789")
+    assert cache.get("a") is None and cache.get("d") == b"123456789"
+    assert cache.stats()["bytes"] <= 10
+
+
+def test_render_memoizes_by_content_and_format(monkeypatch):
+    monkeypatch.setattr(rendering, "render_cache", RenderCache())
+    calls = []
+
+    def renderer(text):
+        calls.append(text)
+        return f"<{text}>"
+
+    assert render("# A", "html", renderer) == "<# A>"
+    assert render("# A", "html", renderer) == "<# A>"
+    assert render("# B", "html", renderer) == "<# B>"
+    assert calls == ["# A", "# B"]
+    assert render_key("# A", "html") != render_key("# A", "docx")
+    assert rendering.render_cache.stats()["hits"] == 1
@@ -0,0 +1,138 @@
+import time
+
+import pytest
+
+from scheduler import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpen, RequestScheduler, TokenBucket
+
+
+class ServiceError(Exception):
+    def __init__(self, code):
+        super().__init__(f"status {code}")
+        self.code = code
+
+
+def failing(code):
+    def fn(timeout):
+        raise ServiceError(code)
+    return fn
+
+
+def test_breaker_opens_after_repeated_failures_and_probes_once():
+    breaker = CircuitBreaker(failures=2, reset_after=10)
+    breaker.failure(0.0)
+    assert breaker.state == CLOSED and breaker.allow(0.0)
+    breaker.failure(0.0)
+    assert breaker.state == OPEN
+    assert not breaker.allow(5.0)
+    assert breaker.allow(10.0)
+    assert breaker.state == HALF_OPEN
+    assert not breaker.allow(10.0)
+    breaker.failure(11.0)
+    assert breaker.state == OPEN and breaker.trips == 2
+    assert breaker.allow(21.0)
+    breaker.success()
+    assert breaker.state == CLOSED and breaker.allow(21.0)
+
+
+def test_scheduler_fails_fast_while_the_circuit_is_open():
+    scheduler = RequestScheduler(max_retries=0, breaker_failures=2, breaker_reset=0.1)
+    for _ in range(2):
+        with pytest.raises(ServiceError):
+            scheduler.call("model", failing(503))
+    calls = []
+    with pytest.raises(CircuitOpen):
+        scheduler.call("model", lambda timeout: calls.append(timeout))
+    assert not calls
+    assert scheduler.describe("model")["state"] == OPEN
+    # Other models are unaffected.
+    assert scheduler.call("other", lambda timeout: "ok") == "ok"
+
+    time.sleep(0.15)
+    assert scheduler.call("model", lambda timeout: "ok") == "ok"
+    assert scheduler.describe("model")["state"] == CLOSED
+    stats = scheduler.stats()
+    assert stats["rejected"] == 1
+    assert stats["breaker_trips"] == 1
+
+
+def open_breaker(scheduler):
+    with pytest.raises(ServiceError):
+        scheduler.call("model", failing(503))
+    assert scheduler.describe("model")["state"] == OPEN
+    time.sleep(0.06)
+
+
+def test_probe_throttled_while_half_open_keeps_its_slot_across_retries():
+    scheduler = RequestScheduler(max_retries=1, backoff_base=0.001, breaker_failures=1, breaker_reset=0.05)
+    open_breaker(scheduler)
+    attempts = []
+
+    def throttled_once(timeout):
+        attempts.append(timeout)
+        if len(attempts) == 1:
+            raise ServiceError(429)
+        return "ok"
+
+    assert scheduler.call("model", throttled_once) == "ok"
+    assert len(attempts) == 2
+    assert scheduler.describe("model")["state"] == CLOSED
+
+
+def test_probe_that_gives_up_on_429_lets_the_next_call_probe():
+    scheduler = RequestScheduler(max_retries=0, breaker_failures=1, breaker_reset=0.05)
+    open_breaker(scheduler)
+    with pytest.raises(ServiceError):
+        scheduler.call("model", failing(429))
+    assert scheduler.describe("model")["state"] == HALF_OPEN
+    assert scheduler.call("model", lambda timeout: "ok") == "ok"
+    assert scheduler.describe("model")["state"] == CLOSED
+
+
+def test_client_errors_do_not_trip_the_breaker():
+    scheduler = RequestScheduler(max_retries=3, breaker_failures=1)
+    for _ in range(3):
+        with pytest.raises(ServiceError):
+            scheduler.call("model", failing(400))
+    assert scheduler.describe("model")["state"] == CLOSED
+    assert scheduler.stats()["retries"] == 0
+
+
+def test_transient_failures_are_retried():
+    scheduler = RequestScheduler(max_retries=2, backoff_base=0.001, breaker_failures=0)
+    attempts = []
+
+    def flaky(timeout):
+        attempts.append(timeout)
+        if len(attempts) < 3:
+            raise ServiceError(503)
+        return "ok"
+
+    assert scheduler.call("model", flaky) == "ok"
+    assert len(attempts) == 3
+    assert scheduler.stats()["retries"] == 2
+
+
+def test_streams_are_not_retried_after_the_first_chunk():
+    scheduler = RequestScheduler(max_retries=2, backoff_base=0.001)
+    factories = []
+
+    def factory(timeout):
+        factories.append(timeout)
+        yield "a"
+        raise ServiceError(503)
+
+    chunks = []
+    with pytest.raises(ServiceError):
+        for chunk in scheduler.stream("model", factory):
+            chunks.append(chunk)
+    assert chunks == ["a"]
+    assert len(factories) == 1
+
+
+def test_token_bucket_waits_for_refill():
+    bucket = TokenBucket(per_minute=60, burst_seconds=2)
+    now = bucket.updated
+    assert bucket.wait_time(2, now) == 0.0
+    bucket.take(2, now)
+    assert bucket.wait_time(1, now) == pytest.approx(1.0)
+    assert bucket.wait_time(1, now + 1.0) == 0.0
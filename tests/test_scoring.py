@@ -0,0 +1,37 @@
+from scoring import extract_keywords, get_background_idf, score_resume, split_sections
+
+JD = ("Senior backend engineer. Requirements: Python, PostgreSQL, Docker, Kubernetes, REST APIs and AWS. "
+      "Experience with Terraform and Kafka is a plus. Strong communication skills.")
+STRONG = ("Jane Doe\njane@example.com | +1 555 123 4567\nSummary\nBackend engineer building REST APIs in Python.\n"
+          "Skills\nPython, PostgreSQL, Docker, Kubernetes, AWS, Terraform, Kafka\nExperience\n"
+          "- Built REST APIs in Python on PostgreSQL\n- Deployed services with Docker and Kubernetes on AWS\n"
+          "- Managed infrastructure with Terraform and streamed events through Kafka\n"
+          "Education\nBSc Computer Science\n")
+WEAK = ("John Smith\nSummary\nRegistered nurse.\nExperience\n- Administered medications\n- Supervised nurses\n"
+        "Education\nBSN Nursing\n")
+
+
+def test_split_sections_recognizes_headings():
+    names = [name for name, _ in split_sections(STRONG)]
+    assert names[:1] == ["header"]
+    assert {"summary", "skills", "experience", "education"} <= set(names)
+
+
+def test_keywords_come_from_the_job_description():
+    keywords, weights, counts = extract_keywords(JD)
+    assert "kubernetes" in keywords and "postgresql" in keywords
+    assert len(keywords) == len(weights) == len(counts)
+
+
+def test_a_matching_resume_scores_higher():
+    strong, weak = score_resume(STRONG, JD), score_resume(WEAK, JD)
+    assert 0 <= weak["score"] < strong["score"] <= 100
+    assert "kubernetes" in strong["matched_keywords"]
+    assert "kubernetes" in weak["missing_keywords"]
+    assert "Kubernetes" in strong["matched_skills"] and "Kubernetes" in weak["missing_skills"]
+
+
+def test_background_idf_discounts_common_terms():
+    idf = get_background_idf()
+    assert idf.idf("kubernetes") > idf.idf("experience")
+
@@ -0,0 +1,73 @@
+import threading
+import time
+
+import pytest
+
+from singleflight import SingleFlight
+
+
+def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def fn():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return "value"
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(flight.do("key", fn)))
+    leader.start()
+    started.wait(5)
+    followers = [threading.Thread(target=lambda: results.append(flight.do("key", fn))) for _ in range(3)]
+    for thread in followers:
+        thread.start()
+    time.sleep(0.05)
+    release.set()
+    for thread in [leader] + followers:
+        thread.join(5)
+    assert results == ["value"] * 4
+    assert len(calls) == 1
+    assert flight.stats() == {"leaders": 1, "coalesced": 3, "failures": 0, "in_flight": 0}
+
+
+def test_errors_are_shared_and_not_cached():
+    flight = SingleFlight()
+
+    def fail():
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        flight.do("key", fail)
+    assert flight.do("key", lambda: "ok") == "ok"
+    assert flight.stats()["failures"] == 1
+
+
+def test_stream_followers_receive_every_chunk():
+    flight = SingleFlight()
+    first_chunk = threading.Event()
+    release = threading.Event()
+
+    def factory():
+        yield "a"
+        first_chunk.set()
+        release.wait(5)
+        yield "b"
+        yield "c"
+
+    leader_chunks = []
+    follower_text = []
+    leader = threading.Thread(target=lambda: leader_chunks.extend(flight.stream("key", factory)))
+    leader.start()
+    first_chunk.wait(5)
+    follower = threading.Thread(target=lambda: follower_text.append(flight.do("key", lambda: "not called")))
+    follower.start()
+    time.sleep(0.05)
+    release.set()
+    leader.join(5)
+    follower.join(5)
+    assert leader_chunks == ["a", "b", "c"]
+    assert follower_text == ["abc"]
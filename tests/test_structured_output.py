@@ -0,0 +1,53 @@
+import pytest
+
+from structured_output import (StructuredOutputError, is_valid_analysis, parse_analysis, parse_json,
+                               report_from_analysis, validate_analysis)
+
+VALID = ('{"overall_score": "78%", "section_scores": [{"section": " Skills ", "score": 80}], '
+         '"missing_keywords": ["Kafka", "kafka", " "], "recommendations": ["Add metrics"]}')
+
+
+def test_valid_answers_are_normalized():
+    analysis = validate_analysis(parse_json(f"```json\n{VALID}\n```"))
+    assert analysis == {
+        "overall_score": 78.0,
+        "section_scores": [{"section": "Skills", "score": 80.0, "notes": ""}],
+        "missing_keywords": ["Kafka"],
+        "recommendations": ["Add metrics"],
+    }
+    assert is_valid_analysis(VALID)
+
+
+@pytest.mark.parametrize("text", [
+    "not json",
+    "[]",
+    '{"overall_score": 50}',
+    '{"overall_score": 150, "section_scores": [], "missing_keywords": [], "recommendations": []}',
+    '{"overall_score": true, "section_scores": [], "missing_keywords": [], "recommendations": []}',
+    '{"overall_score": 50, "section_scores": [{"score": 1}], "missing_keywords": [], "recommendations": []}',
+])
+def test_invalid_answers_are_rejected(text):
+    assert not is_valid_analysis(text)
+    with pytest.raises(StructuredOutputError):
+        parse_analysis(text)
+
+
+def test_invalid_answers_are_repaired_a_bounded_number_of_times():
+    prompts = []
+
+    def repair(prompt):
+        prompts.append(prompt)
+        return VALID
+
+    assert parse_analysis('{"overall_score": 50}', repair=repair)["overall_score"] == 78.0
+    assert len(prompts) == 1 and "missing field(s)" in prompts[0]
+
+    with pytest.raises(StructuredOutputError):
+        parse_analysis("nope", repair=lambda prompt: "still nope", attempts=2)
+
+
+def test_report_starts_with_the_score_line():
+    report = report_from_analysis(validate_analysis(parse_json(VALID)))
+    assert report.startswith("ATS Score : 78.0\nDetailed Report:")
+    assert "- Skills: 80.0" in report
+    assert "**Missing keywords:** Kafka" in report
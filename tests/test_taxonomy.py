@@ -0,0 +1,14 @@
+from taxonomy import PhraseMatcher, compare_skills
+
+
+
+
+def test_compare_skills_and_phrase_matcher():
+    skills = compare_skills("Python and Docker, kubernetes", "Need Python, Kubernetes and Terraform")
+    assert skills["matched"] == ["Python", "Kubernetes"]
+    assert skills["missing"] == ["Terraform"]
+    assert skills["extra"] == ["Docker"]
+    matcher = PhraseMatcher(["add your experience here"])
+    assert matcher.remove("x Add your experience here y") == "x  y"
+    # A match touching the end of the text is held back until more text arrives.
+    assert list(matcher.finditer("x add your experience here", final=False)) == []
@@ -0,0 +1,91 @@
+import json
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+import telemetry
+from telemetry import (increment, recent_traces, record_usage, register_gauges, render_prometheus, request,
+                       snapshot, span, traced, write_metrics)
+
+
+def test_spans_feed_stage_histograms_and_errors():
+    with span("test_stage"):
+        pass
+    with pytest.raises(ValueError):
+        with span("test_stage"):
+            raise ValueError("bad")
+    stage = snapshot()["stages"]["test_stage"]
+    assert stage["count"] == 2 and stage["errors"] == 1
+    assert stage["buckets"][telemetry.LATENCY_BUCKETS[-1]] == 2
+
+
+def test_traced_functions_are_timed():
+    @traced("test_traced")
+    def add(a, b):
+        return a + b
+
+    assert add(1, 2) == 3 and add.__name__ == "add"
+    assert snapshot()["stages"]["test_traced"]["count"] == 1
+
+
+def test_requests_group_spans_and_tokens_into_traces():
+    with request("test_request") as trace:
+        with span("test_inner"):
+            record_usage("model", SimpleNamespace(usage_metadata=SimpleNamespace(
+                prompt_token_count=12, candidates_token_count=3)))
+    latest = recent_traces()[0]
+    assert latest["name"] == "test_request" and latest["error"] is None
+    spans = {s["name"]: s for s in latest["spans"]}
+    # Both spans can start within the same microsecond, so their order is not asserted.
+    assert set(spans) == {"request.test_request", "test_inner"}
+    assert latest["tokens"] == {"prompt": 12, "output": 3}
+    assert trace.duration >= spans["test_inner"]["duration"]
+    counters = snapshot()["counters"]
+    assert counters["tokens_prompt_total|model=model"] >= 12
+
+    with pytest.raises(RuntimeError):
+        with request("test_failed"):
+            raise RuntimeError("down")
+    assert recent_traces()[0]["error"] == "RuntimeError: down"
+
+
+def test_spans_in_other_threads_do_not_join_the_trace():
+    with request("test_threads"):
+        thread = threading.Thread(target=traced("test_thread_span")(lambda: None))
+        thread.start()
+        thread.join()
+    assert [s["name"] for s in recent_traces()[0]["spans"]] == ["request.test_threads"]
+
+
+def test_prometheus_export_includes_counters_and_gauges():
+    increment("test_events_total|outcome=hit", 2)
+    register_gauges("test_gauges", lambda: {"entries": 3, "enabled": True, "name": "x"})
+    register_gauges("test_broken", lambda: 1 / 0)
+    with span("test_export"):
+        pass
+    text = render_prometheus()
+    assert 'ats_test_events_total{outcome="hit"} 2' in text
+    assert "ats_test_gauges_entries 3" in text
+    assert "test_gauges_enabled" not in text and "test_gauges_name" not in text
+    assert 'ats_stage_seconds_count{stage="test_export"} 1' in text
+    assert 'ats_stage_seconds_bucket{stage="test_export",le="+Inf"} 1' in text
+
+
+def test_metrics_files_are_written_as_json_or_text(tmp_path):
+    increment("test_file_total")
+    json_path = tmp_path / "metrics" / "out.json"
+    write_metrics(str(json_path))
+    assert json.loads(json_path.read_text())["counters"]["test_file_total"] == 1
+    prom_path = tmp_path / "out.prom"
+    write_metrics(str(prom_path))
+    assert "ats_test_file_total 1" in prom_path.read_text()
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["metrics", "out.prom"]
+
+
+def test_metrics_file_is_refreshed_after_each_request(tmp_path, monkeypatch):
+    path = tmp_path / "metrics.prom"
+    monkeypatch.setattr(telemetry, "METRICS_FILE", str(path))
+    with request("test_refresh"):
+        pass
+    assert 'stage="request.test_refresh"' in path.read_text()